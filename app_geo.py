@@ -100,6 +100,33 @@ with st.sidebar:
         help="Cacheia resultados de CEP e geocoding para acelerar"
     )
     
+    global_plan = st.checkbox(
+        "Plano global (2 passadas)",
+        value=False,
+        help="Coleta CEPs e endereços distintos do arquivo inteiro e consulta cada um uma única vez antes de processar"
+    )
+    
+    row_time_budget = st.number_input(
+        "Tempo máximo de geocodificação por linha (s)",
+        min_value=0,
+        max_value=300,
+        value=0,
+        step=5,
+        help="0 = sem limite. Esgotado o tempo, a linha sai com a precisão obtida e marcada em FL_REFINAR"
+    )
+    
+    cep_db = st.text_input(
+        "Base local de CEPs (opcional)",
+        value="",
+        help="Caminho do banco criado com import_ceps.py; CEPs presentes nele não são consultados no ViaCEP"
+    )
+    
+    gazetteer_db = st.text_input(
+        "Base local de municípios (opcional)",
+        value="",
+        help="Caminho do banco criado com import_municipios.py; o centro da cidade sai dele sem consultar o Nominatim"
+    )
+    
     st.markdown("---")
     
     # Cache stats
@@ -231,6 +258,13 @@ with tab1:
                 </div>
                 """, unsafe_allow_html=True)
                 
+                # Arquivo já processado: refaz só as linhas marcadas
+                refine_only = 'FL_REFINAR' in df_preview.columns and st.checkbox(
+                    "🔁 Refazer apenas as linhas marcadas em FL_REFINAR",
+                    value=True,
+                    help="Consulta de novo as chaves que falharam (timeout, erro 5xx ou API fora do ar) e corrige só as linhas marcadas, sem reprocessar o arquivo inteiro"
+                )
+                
                 # Botão de processamento
                 if st.button("🚀 Iniciar Processamento", type="primary", width="stretch"):
                     
@@ -245,7 +279,10 @@ with tab1:
                             chunk_size=chunk_size,
                             max_workers=max_workers,
                             use_cache=use_cache,
-                            col_mapping=col_mapping
+                            col_mapping=col_mapping,
+                            row_time_budget=row_time_budget or None,
+                            cep_db=cep_db.strip() or None,
+                            gazetteer_db=gazetteer_db.strip() or None
                         )
                         
                         # Barra de progresso
@@ -261,10 +298,14 @@ with tab1:
                         status_text.text("⏳ Iniciando processamento...")
                         start_time = time.time()
                         
-                        result = processor.process_file(
-                            tmp_path,
-                            progress_callback=update_progress
-                        )
+                        if refine_only:
+                            result = processor.refine_file(tmp_path, progress_callback=update_progress)
+                        else:
+                            result = processor.process_file(
+                                tmp_path,
+                                progress_callback=update_progress,
+                                plan="global" if global_plan else "chunk"
+                            )
                         
                         elapsed_time = time.time() - start_time
                         progress_bar.progress(1.0)
@@ -292,6 +333,20 @@ with tab1:
                             </div>
                             """, unsafe_allow_html=True)
                         
+                        if stats['refined_rows']:
+                            st.markdown(f"""
+                            <div class="success-box">
+                                <strong>🔁 Linhas refeitas:</strong> {stats['refined_rows']}
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        if stats['rows_to_refine']:
+                            st.markdown(f"""
+                            <div class="error-box">
+                                <strong>⏱️ Linhas com precisão parcial (FL_REFINAR):</strong> {stats['rows_to_refine']}
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
                         # Preview dos resultados
                         st.markdown("### 📊 Preview dos Resultados")
                         st.dataframe(df_result.head(10), width="stretch")
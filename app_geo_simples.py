@@ -14,6 +14,8 @@ import logging
 from typing import Optional, Dict, Tuple
 import gc  # Garbage collection para arquivos grandes
 
+from modules.gazetteer import MunicipalityGazetteer
+
 # Configuração de logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -151,10 +153,12 @@ class Geocoder:
 class CSVProcessor:
     """Processa arquivo CSV com enriquecimento de dados"""
     
-    def __init__(self, chunk_size: int = 1000, col_mapping: dict = None, sep: str = None):
+    def __init__(self, chunk_size: int = 1000, col_mapping: dict = None, sep: str = None,
+                 gazetteer: Optional[MunicipalityGazetteer] = None):
         self.chunk_size = chunk_size
         self.cep_validator = CEPValidator()
         self.geocoder = Geocoder()
+        self.gazetteer = gazetteer  # Centroides de municípios sem rede (opcional)
         self.col_mapping = col_mapping or {}
         self.sep = sep  # Delimitador (detectado automaticamente)
         self.stats = {
@@ -466,6 +470,12 @@ class CSVProcessor:
             city = str(row.get('NM_MUNICIPIO', '')).strip()
             state = str(row.get('NM_UF', '')).strip()
             
+            # Gazetteer local (por CD_MUNICIPIO ou nome + UF) antes do Nominatim
+            if self.gazetteer:
+                coords = self.gazetteer.lookup(city, state, row.get('CD_MUNICIPIO', ''))
+                if coords:
+                    return coords
+            
             if not city:
                 return None
             
@@ -493,6 +503,7 @@ with st.sidebar:
     st.markdown("### Para arquivos grandes (>500MB)")
     chunk_size = st.slider("Tamanho do chunk", 500, 10000, 5000, 500, help="Maior = mais memória, mais rápido")
     use_cache = st.checkbox("Usar cache", True)
+    gazetteer_db = st.text_input("Base local de municípios (opcional)", "", help="Banco criado com import_municipios.py")
 
 # Abas
 tab1, tab2, tab3 = st.tabs(["📤 Processar", "📋 Informações", "❓ Ajuda"])
@@ -594,7 +605,10 @@ with tab1:
                         tmp_path = tmp.name
                     
                     try:
-                        processor = CSVProcessor(chunk_size=chunk_size, col_mapping=col_mapping, sep=detected_sep)
+                        processor = CSVProcessor(
+                            chunk_size=chunk_size, col_mapping=col_mapping, sep=detected_sep,
+                            gazetteer=MunicipalityGazetteer(gazetteer_db.strip()) if gazetteer_db.strip() else None
+                        )
                         
                         progress_bar = st.progress(0)
                         status = st.empty()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do CacheManager
+
+Compara o custo por chave do modelo antigo (uma conexão e um commit por
+CEP) com a conexão persistente em WAL, gravações individuais e em lote.
+
+Uso:
+    python benchmark_cache.py [quantidade_de_chaves]
+"""
+import sqlite3
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from modules.cache_manager import CacheManager
+
+
+def sample_data(n: int):
+    """Gera CEPs e payloads no formato do ViaCEP"""
+    return [
+        (f"{i:08d}", {
+            'cep': f"{i:05d}-000",
+            'logradouro': f"Rua {i}",
+            'bairro': 'Centro',
+            'localidade': 'São Paulo',
+            'uf': 'SP'
+        })
+        for i in range(n)
+    ]
+
+
+def bench_legacy(db_path: Path, items) -> float:
+    """Modelo anterior: sqlite3.connect + commit a cada chave"""
+    CacheManager(db_path).close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    
+    start = time.perf_counter()
+    for cep, data in items:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cep_cache (cep, data) VALUES (?, ?)",
+                (cep, json.dumps(data))
+            )
+            conn.commit()
+    for cep, _ in items:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("SELECT data FROM cep_cache WHERE cep = ?", (cep,)).fetchone()
+    return time.perf_counter() - start
+
+
+def bench_persistent(db_path: Path, items) -> float:
+    """Conexão persistente em WAL, um commit por chave"""
+    cache = CacheManager(db_path)
+    
+    start = time.perf_counter()
+    for cep, data in items:
+        cache.save_cep(cep, data)
+    for cep, _ in items:
+        cache.get_cep(cep)
+    elapsed = time.perf_counter() - start
+    
+    cache.close()
+    return elapsed
+
+
+def bench_bulk(db_path: Path, items) -> float:
+    """Conexão persistente em WAL, gravação em lote com executemany"""
+    cache = CacheManager(db_path)
+    
+    start = time.perf_counter()
+    cache.save_ceps_bulk(items)
+    for cep, _ in items:
+        cache.get_cep(cep)
+    elapsed = time.perf_counter() - start
+    
+    cache.close()
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    items = sample_data(n)
+    
+    print("=" * 60)
+    print(f"📊 BENCHMARK DO CACHE ({n} CEPs: gravação + leitura)")
+    print("=" * 60)
+    
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, bench in [
+            ("Antes (connect/commit por chave)", bench_legacy),
+            ("Conexão persistente (WAL)", bench_persistent),
+            ("Conexão persistente + lote", bench_bulk),
+        ]:
+            elapsed = bench(Path(tmp) / f"{bench.__name__}.db", items)
+            results.append((name, elapsed))
+    
+    baseline = results[0][1]
+    for name, elapsed in results:
+        per_key_us = elapsed / n * 1_000_000
+        print(f"{name:36} {per_key_us:10.1f} µs/chave  ({baseline / elapsed:5.1f}x)")
+    
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
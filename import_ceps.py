@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Importa um CSV de CEPs para a base local usada pelo CEPValidator
+
+Aceita dumps no estilo DNE dos Correios ou bases comunitárias com uma
+coluna de CEP e, opcionalmente, logradouro, bairro, cidade/localidade e UF.
+Se a importação for interrompida, rodar o mesmo comando continua de onde
+parou.
+
+Uso:
+    python import_ceps.py arquivo.csv [ceps.db] [encoding]
+"""
+import sys
+import time
+
+from modules.cep_database import CEPDatabase
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    file_path = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "ceps.db"
+    encoding = sys.argv[3] if len(sys.argv) > 3 else "utf-8"
+    
+    database = CEPDatabase(db_path)
+    start = time.perf_counter()
+    
+    def report(rows_done):
+        print(f"\r⏳ {rows_done:,} registros lidos", end="", flush=True)
+    
+    imported = database.import_csv(file_path, encoding=encoding, progress_callback=report)
+    print()
+    print(f"✅ {imported:,} CEPs gravados em {time.perf_counter() - start:.1f}s; "
+          f"{database.count():,} CEPs em {db_path}")
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Importa a tabela de municípios (código IBGE, nome, UF e centroide)
+
+Aceita o municipios.csv do projeto kelvins/municipios-brasileiros ou
+qualquer CSV com colunas de código IBGE, nome, latitude e longitude (a UF
+é deduzida do código quando não houver coluna própria). Reimportar
+atualiza os municípios já presentes.
+
+Uso:
+    python import_municipios.py municipios.csv [municipios.db] [encoding]
+"""
+import sys
+
+from modules.gazetteer import MunicipalityGazetteer
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    file_path = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "municipios.db"
+    encoding = sys.argv[3] if len(sys.argv) > 3 else "utf-8"
+    
+    gazetteer = MunicipalityGazetteer(db_path)
+    imported = gazetteer.import_csv(file_path, encoding=encoding)
+    print(f"✅ {imported:,} municípios gravados; {len(gazetteer):,} municípios em {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
 """
 Módulos de processamento de geolocalização
 """
-from .cep_validator import CEPValidator
-from .geocoder import Geocoder
+from .cep_validator import CEPValidator, AsyncCEPValidator
+from .geocoder import Geocoder, AsyncGeocoder
 from .csv_processor import CSVProcessor
 from .cache_manager import CacheManager
+from .cep_database import CEPDatabase
+from .gazetteer import MunicipalityGazetteer
+from .cep_interpolator import CEPInterpolator
+from .rate_limiter import TokenBucket, SharedRateLimiter, AdaptiveRateController
+from .concurrency_limiter import AdaptiveConcurrencyLimiter
+from .retry_policy import RetryPolicy, RetryExhaustedError
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .transport import HTTPTransport
 
-__all__ = ['CEPValidator', 'Geocoder', 'CSVProcessor', 'CacheManager']
+__all__ = [
+    'CEPValidator', 'AsyncCEPValidator', 'Geocoder', 'AsyncGeocoder', 'CSVProcessor', 'CacheManager',
+    'CEPDatabase', 'MunicipalityGazetteer', 'CEPInterpolator', 'TokenBucket', 'SharedRateLimiter', 'AdaptiveRateController',
+    'AdaptiveConcurrencyLimiter', 'RetryPolicy', 'RetryExhaustedError', 'CircuitBreaker', 'CircuitOpenError',
+    'HTTPTransport'
+]
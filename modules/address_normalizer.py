@@ -0,0 +1,111 @@
+"""
+Normalização de endereços e geração de chaves canônicas para cache
+"""
+import re
+import hashlib
+import unicodedata
+import pandas as pd
+
+# Padroniza abreviações comuns de logradouro
+ABBREVIATIONS = {
+    r'\bR\b\.?': 'Rua',
+    r'\bRUA\b': 'Rua',
+    r'\bAV\b\.?': 'Avenida',
+    r'\bAVENIDA\b': 'Avenida',
+    r'\bAVDA\b\.?': 'Avenida',
+    r'\bALM\b\.?': 'Alameda',
+    r'\bALAMEDA\b': 'Alameda',
+    r'\bTRAV\b\.?': 'Travessa',
+    r'\bTRAVESSA\b': 'Travessa',
+    r'\bPÇ\b\.?': 'Praça',
+    r'\bPC\b\.?': 'Praça',
+    r'\bPRACA\b': 'Praça',
+    r'\bPRAÇA\b': 'Praça',
+    r'\bROD\b\.?': 'Rodovia',
+    r'\bRODOVIA\b': 'Rodovia',
+    r'\bEST\b\.?': 'Estrada',
+    r'\bESTRADA\b': 'Estrada',
+    r'\bLARGO\b': 'Largo',
+    r'\bLGO\b\.?': 'Largo',
+    r'\bVIA\b': 'Via',
+    r'\bBECO\b': 'Beco',
+    r'\bVILA\b': 'Vila',
+    r'\bPARQUE\b': 'Parque',
+    r'\bJARDIM\b': 'Jardim',
+    r'\bCONJ\b\.?': 'Conjunto',
+    r'\bCONJUNTO\b': 'Conjunto',
+}
+
+_ABBREVIATION_PATTERNS = [
+    (re.compile(pattern, flags=re.IGNORECASE), replacement)
+    for pattern, replacement in ABBREVIATIONS.items()
+]
+
+LOWERCASE_WORDS = {'de', 'da', 'do', 'das', 'dos', 'e', 'a', 'o'}
+
+
+def expand_abbreviations(text: str) -> str:
+    """Expande abreviações de tipo de logradouro (R. -> Rua, AV -> Avenida...)"""
+    for pattern, replacement in _ABBREVIATION_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def normalize_address(text: str) -> str:
+    """Normaliza e padroniza endereços para exibição"""
+    if not text or pd.isna(text):
+        return ''
+    
+    # Converte para string e remove espaços extras
+    text = str(text).strip()
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Remove caracteres especiais no início/fim
+    text = re.sub(r'^[^\w\s]+|[^\w\s]+$', '', text)
+    
+    text = expand_abbreviations(text)
+    
+    # Capitaliza corretamente (Title Case), mas mantém algumas palavras em minúsculo
+    words = text.split()
+    
+    formatted_words = []
+    for i, word in enumerate(words):
+        # Primeira palavra sempre em maiúscula
+        if i == 0 or word.lower() not in LOWERCASE_WORDS:
+            formatted_words.append(word.capitalize())
+        else:
+            formatted_words.append(word.lower())
+    
+    text = ' '.join(formatted_words)
+    
+    return text.strip()
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos (São Paulo -> Sao Paulo)"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def canonical_address(text: str) -> str:
+    """
+    Forma canônica de um endereço usada como chave de cache
+    
+    Remove acentos, expande abreviações, ignora maiúsculas/minúsculas e
+    colapsa espaços, de modo que variações de grafia do mesmo endereço
+    ("R. São Bento, Centro" e "rua sao  bento , centro") gerem a mesma chave.
+    """
+    if not text:
+        return ''
+    
+    text = fold_accents(str(text))
+    text = expand_abbreviations(text)
+    text = text.casefold()
+    text = re.sub(r'\s*,\s*', ', ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' ,')
+
+
+def address_key(text: str) -> str:
+    """Chave determinística (SHA-1) do endereço canônico, estável entre execuções"""
+    return hashlib.sha1(canonical_address(text).encode('utf-8')).hexdigest()
@@ -3,11 +3,15 @@ Cache manager para armazenar resultados localmente
 """
 import sqlite3
 import json
+import queue
+import threading
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List, Iterable, Tuple
 import logging
 from datetime import datetime, timedelta
 
+from .address_normalizer import address_key, canonical_address
+
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logger.setLevel(logging.INFO)
@@ -15,19 +19,130 @@ if not logger.handlers:
 class CacheManager:
     """Gerencia cache local em SQLite"""
     
-    def __init__(self, db_path: str = "cache.db"):
+    # Versão do esquema gravada em PRAGMA user_version
+    # 1: chaves de geocode_cache passam a ser SHA-1 do endereço canônico
+    # 2: bairro_centroids preenchida a partir dos endereços já em geocode_cache
+    # 3: cep_coordinates preenchida a partir de cep_cache + geocode_cache
+    # 4: pending_lookups ganha a coluna context (ex.: bairro de um geocode adiado)
+    SCHEMA_VERSION = 4
+    
+    # Validade padrão das respostas "não encontrado" (bem menor que a dos acertos:
+    # um CEP novo ou um endereço recém-mapeado deixam de faltar)
+    NEGATIVE_TTL_DAYS = 7
+    
+    # Geocodes de logradouro necessários para usar o centroide de um bairro
+    BAIRRO_MIN_POINTS = 3
+    
+    # Máximo de parâmetros por consulta IN (...) (limite do SQLite: 999 em versões antigas)
+    BULK_BATCH_SIZE = 500
+    
+    # Comandos reutilizados (o sqlite3 mantém o statement preparado em cache por conexão)
+    SQL_GET_CEP = "SELECT data FROM cep_cache WHERE cep = ?"
+    SQL_SAVE_CEP = "INSERT OR REPLACE INTO cep_cache (cep, data) VALUES (?, ?)"
+    SQL_GET_COORDS = "SELECT latitude, longitude FROM geocode_cache WHERE address_hash = ?"
+    SQL_SAVE_COORDS = "INSERT OR REPLACE INTO geocode_cache (address_hash, address, latitude, longitude) VALUES (?, ?, ?, ?)"
+    SQL_IS_NEGATIVE = """
+        SELECT 1 FROM negative_cache
+        WHERE kind = ? AND key = ? AND created_at >= datetime('now', ?)
+    """
+    SQL_SAVE_NEGATIVE = "INSERT OR REPLACE INTO negative_cache (kind, key) VALUES (?, ?)"
+    SQL_GET_BAIRRO = """
+        SELECT lat_sum / points, lon_sum / points FROM bairro_centroids
+        WHERE key = ? AND points >= ?
+    """
+    SQL_ADD_BAIRRO_POINT = """
+        INSERT INTO bairro_centroids (key, bairro, municipio, uf, lat_sum, lon_sum, points)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            lat_sum = lat_sum + excluded.lat_sum,
+            lon_sum = lon_sum + excluded.lon_sum,
+            points = points + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """
+    SQL_SAVE_CEP_COORDS = "INSERT OR REPLACE INTO cep_coordinates (cep, latitude, longitude) VALUES (?, ?, ?)"
+    SQL_SAVE_PENDING = """
+        INSERT INTO pending_lookups (kind, key, reason, context) VALUES (?, ?, ?, ?)
+        ON CONFLICT(kind, key) DO UPDATE SET
+            reason = excluded.reason,
+            context = COALESCE(excluded.context, context),
+            attempts = attempts + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """
+    
+    def __init__(self, db_path: str = "cache.db", negative_ttl_days: Optional[float] = None,
+                 bairro_min_points: Optional[int] = None):
         """
         Inicializa o gerenciador de cache
         
         Args:
             db_path: Caminho do banco de dados SQLite
+            negative_ttl_days: Dias em que um "não encontrado" continua valendo
+                (padrão NEGATIVE_TTL_DAYS)
+            bairro_min_points: Geocodes de logradouro exigidos para usar o
+                centroide de um bairro (padrão BAIRRO_MIN_POINTS)
         """
         self.db_path = Path(db_path)
+        self.negative_ttl_days = self.NEGATIVE_TTL_DAYS if negative_ttl_days is None else negative_ttl_days
+        self.bairro_min_points = self.BAIRRO_MIN_POINTS if bairro_min_points is None else bairro_min_points
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._write_queue = queue.Queue()
+        self._writer_thread = None
+        self._writer_lock = threading.Lock()
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão persistente da thread atual
+        
+        Cada thread mantém uma única conexão aberta (WAL permite leitores
+        concorrentes com um escritor), evitando reabrir o arquivo a cada
+        consulta.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                check_same_thread=False,
+                cached_statements=64
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Persiste gravações pendentes e fecha todas as conexões abertas"""
+        self.flush()
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
     def _init_db(self):
-        """Inicializa banco de dados se não existir"""
-        with sqlite3.connect(self.db_path) as conn:
+        """
+        Cria as tabelas e aplica as migrações pendentes
+        
+        Tudo roda numa única transação BEGIN IMMEDIATE: a versão é relida já
+        com o lock de escrita e gravada no mesmo commit das migrações, então
+        processos que abrem o mesmo cache.db ao mesmo tempo não aplicam a
+        mesma migração duas vezes, e uma migração interrompida não deixa a
+        versão adiantada.
+        """
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] == self.SCHEMA_VERSION:
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
             cursor = conn.cursor()
             
             # Tabela de cache de CEP
@@ -50,6 +165,58 @@ class CacheManager:
                 )
             """)
             
+            # Cache negativo: chaves que o upstream respondeu como inexistentes
+            # (CEP com 'erro', endereço sem resultado), com validade própria
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS negative_cache (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            
+            # Centroide de cada bairro (bairro, município, UF) derivado dos geocodes
+            # de logradouro: somas das coordenadas e quantidade de pontos
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bairro_centroids (
+                    key TEXT PRIMARY KEY,
+                    bairro TEXT,
+                    municipio TEXT,
+                    uf TEXT,
+                    lat_sum REAL NOT NULL,
+                    lon_sum REAL NOT NULL,
+                    points INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Coordenadas de logradouro de cada CEP já resolvido (base da
+            # interpolação de CEPs vizinhos)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS cep_coordinates (
+                    cep TEXT PRIMARY KEY,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Consultas adiadas (ex.: circuito do upstream aberto) para refazer depois;
+            # context (JSON) guarda o que a consulta precisa além da chave
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pending_lookups (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    reason TEXT,
+                    context TEXT,
+                    attempts INTEGER DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            
             # Tabela de processamentos
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS processing_log (
@@ -66,104 +233,560 @@ class CacheManager:
                 )
             """)
             
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._migrate_geocode_keys(conn)
+            if version < 2:
+                self._backfill_bairro_centroids(conn)
+            if version < 3:
+                self._backfill_cep_coordinates(conn)
+            if version < 4:
+                self._add_pending_context(conn)
+            if version < self.SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
             conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    
+    def _migrate_geocode_keys(self, conn: sqlite3.Connection):
+        """
+        Regrava as chaves de geocode_cache usando a coluna address
+        
+        Versões antigas usavam hash() do Python, que muda a cada execução
+        do interpretador. Entradas equivalentes após a canonicalização são
+        fundidas, mantendo a mais recente. Roda na transação de _init_db.
+        """
+        cursor = conn.cursor()
+        rows = cursor.execute(
+            "SELECT address, latitude, longitude, created_at FROM geocode_cache "
+            "WHERE address IS NOT NULL ORDER BY created_at"
+        ).fetchall()
+        
+        cursor.execute("DELETE FROM geocode_cache")
+        cursor.executemany(
+            "INSERT OR REPLACE INTO geocode_cache (address_hash, address, latitude, longitude, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(address_key(address), address, lat, lon, created_at) for address, lat, lon, created_at in rows]
+        )
+        
+        if rows:
+            logger.info(f"Migradas {len(rows)} entradas de geocode_cache para chaves canônicas")
+    
+    def _backfill_bairro_centroids(self, conn: sqlite3.Connection):
+        """
+        Alimenta bairro_centroids com os endereços de logradouro já em geocode_cache
+        
+        Só entram queries no formato "logradouro, bairro, município, UF" de
+        Geocoder.build_address_query (quatro partes e UF com duas letras).
+        Cada bairro é gravado com o total recalculado (INSERT OR REPLACE), não
+        somado ao existente: rodar de novo não duplica pontos. Roda na
+        transação de _init_db, antes de qualquer ponto novo.
+        """
+        centroids = {}
+        for address, lat, lon in conn.execute(
+            "SELECT address, latitude, longitude FROM geocode_cache WHERE address IS NOT NULL"
+        ):
+            parts = [part.strip() for part in address.split(',')]
+            if len(parts) == 4 and all(parts) and len(parts[3]) == 2:
+                key = self._bairro_key(*parts[1:])
+                bairro, municipio, uf, lat_sum, lon_sum, points = centroids.get(key, (*parts[1:], 0.0, 0.0, 0))
+                centroids[key] = (bairro, municipio, uf, lat_sum + lat, lon_sum + lon, points + 1)
+        
+        conn.executemany(
+            "INSERT OR REPLACE INTO bairro_centroids (key, bairro, municipio, uf, lat_sum, lon_sum, points) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(key, *values) for key, values in centroids.items()]
+        )
+        
+        if centroids:
+            points = sum(values[5] for values in centroids.values())
+            logger.info(f"{points} geocodes de logradouro agregados em {len(centroids)} bairro(s) de bairro_centroids")
+    
+    def _backfill_cep_coordinates(self, conn: sqlite3.Connection):
+        """
+        Alimenta cep_coordinates com os CEPs cujas coordenadas já estão em geocode_cache
+        
+        Entram os CEPs de logradouro de cep_cache cuja query de endereço
+        (formato de Geocoder.build_address_query) tem coordenadas e as queries
+        "CEP, município, UF" de Geocoder.build_cep_query. Roda na transação de
+        _init_db.
+        """
+        queries = {}
+        for cep, data in conn.execute("SELECT cep, data FROM cep_cache"):
+            try:
+                cep_data = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if not cep_data.get('logradouro'):
+                continue
+            parts = [cep_data['logradouro']] + [
+                cep_data.get(field) for field in ('bairro', 'localidade', 'uf') if cep_data.get(field)
+            ]
+            queries.setdefault(address_key(", ".join(parts)), []).append(cep)
+        
+        coords = {}
+        keys = list(queries)
+        for start in range(0, len(keys), self.BULK_BATCH_SIZE):
+            batch = keys[start:start + self.BULK_BATCH_SIZE]
+            for address_hash, lat, lon in conn.execute(
+                f"SELECT address_hash, latitude, longitude FROM geocode_cache "
+                f"WHERE address_hash IN ({', '.join('?' * len(batch))})",
+                batch
+            ):
+                for cep in queries[address_hash]:
+                    coords[cep] = (lat, lon)
+        
+        for address, lat, lon in conn.execute(
+            "SELECT address, latitude, longitude FROM geocode_cache WHERE address GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9],*'"
+        ):
+            coords[address[:8]] = (lat, lon)
+        
+        conn.executemany(self.SQL_SAVE_CEP_COORDS, [(cep, lat, lon) for cep, (lat, lon) in coords.items()])
+        
+        if coords:
+            logger.info(f"{len(coords)} CEPs com coordenadas copiados para cep_coordinates")
+    
+    def _add_pending_context(self, conn: sqlite3.Connection):
+        """Acrescenta a coluna context a pending_lookups criada antes da versão 4"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pending_lookups)")}
+        if 'context' not in columns:
+            conn.execute("ALTER TABLE pending_lookups ADD COLUMN context TEXT")
     
     def get_cep(self, cep: str) -> Optional[Dict]:
         """Recupera CEP do cache"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT data FROM cep_cache WHERE cep = ?",
-                (cep,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                try:
-                    return json.loads(result[0])
-                except json.JSONDecodeError:
-                    return None
+        result = self._connect().execute(self.SQL_GET_CEP, (cep,)).fetchone()
+        
+        if result:
+            try:
+                return json.loads(result[0])
+            except json.JSONDecodeError:
+                return None
         
         return None
     
+    def get_ceps_bulk(self, ceps: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Recupera vários CEPs do cache em poucas consultas IN (...)
+        
+        Args:
+            ceps: CEPs limpos (8 dígitos)
+            
+        Returns:
+            Dict {cep: dados} apenas com os CEPs encontrados
+        """
+        found = {}
+        for cep, data in self._select_in("SELECT cep, data FROM cep_cache WHERE cep IN ({})", list(set(ceps))):
+            try:
+                found[cep] = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+        return found
+    
     def save_cep(self, cep: str, data: Dict):
         """Salva CEP no cache"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT OR REPLACE INTO cep_cache (cep, data) VALUES (?, ?)",
-                (cep, json.dumps(data))
-            )
-            conn.commit()
+        self.save_ceps_bulk([(cep, data)])
+    
+    def save_ceps_bulk(self, items: Iterable[Tuple[str, Dict]]):
+        """
+        Salva vários CEPs em uma única transação
+        
+        Args:
+            items: Pares (cep, dados do ViaCEP)
+        """
+        rows = [(cep, json.dumps(data)) for cep, data in items]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_SAVE_CEP, rows)
     
     def get_coordinates(self, address: str) -> Optional[tuple]:
         """Recupera coordenadas do cache"""
-        # Cria hash do endereço para usar como chave
-        address_hash = hash(address)
+        # Cria hash estável do endereço canônico para usar como chave
+        address_hash = address_key(address)
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT latitude, longitude FROM geocode_cache WHERE address_hash = ?",
-                (address_hash,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                return (float(result[0]), float(result[1]))
+        result = self._connect().execute(self.SQL_GET_COORDS, (address_hash,)).fetchone()
+        
+        if result:
+            return (float(result[0]), float(result[1]))
         
         return None
     
+    def get_coordinates_bulk(self, addresses: Iterable[str]) -> Dict[str, tuple]:
+        """
+        Recupera coordenadas de vários endereços em poucas consultas IN (...)
+        
+        Args:
+            addresses: Endereços (a chave canônica é calculada internamente)
+            
+        Returns:
+            Dict {endereço: (latitude, longitude)} apenas com os encontrados
+        """
+        by_hash = {}
+        for address in set(addresses):
+            by_hash.setdefault(address_key(address), []).append(address)
+        
+        found = {}
+        for address_hash, lat, lon in self._select_in(
+            "SELECT address_hash, latitude, longitude FROM geocode_cache WHERE address_hash IN ({})",
+            list(by_hash)
+        ):
+            for address in by_hash[address_hash]:
+                found[address] = (float(lat), float(lon))
+        return found
+    
+    def _select_in(self, sql: str, keys: List[str], params: tuple = ()) -> List[tuple]:
+        """Executa SELECT ... IN (...) em lotes de BULK_BATCH_SIZE chaves (params vêm antes das chaves)"""
+        conn = self._connect()
+        rows = []
+        for start in range(0, len(keys), self.BULK_BATCH_SIZE):
+            batch = keys[start:start + self.BULK_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            rows.extend(conn.execute(sql.format(placeholders), (*params, *batch)).fetchall())
+        return rows
+    
     def save_coordinates(self, address: str, latitude: float, longitude: float):
         """Salva coordenadas no cache"""
-        address_hash = hash(address)
+        self.save_coordinates_bulk([(address, latitude, longitude)])
+    
+    def save_coordinates_bulk(self, items: Iterable[Tuple[str, float, float]]):
+        """
+        Salva várias coordenadas em uma única transação
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT OR REPLACE INTO geocode_cache (address_hash, address, latitude, longitude) VALUES (?, ?, ?, ?)",
-                (address_hash, address, latitude, longitude)
-            )
-            conn.commit()
+        Args:
+            items: Tuplas (endereço, latitude, longitude)
+        """
+        rows = [
+            (address_key(address), address, latitude, longitude)
+            for address, latitude, longitude in items
+        ]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_SAVE_COORDS, rows)
+    
+    @staticmethod
+    def _negative_key(kind: str, key: str) -> str:
+        """Chave gravada no cache negativo (endereços usam a mesma chave canônica do geocode_cache)"""
+        return address_key(key) if kind == 'geocode' else key
+    
+    def _negative_cutoff(self) -> str:
+        """Modificador de datetime('now', ...) que marca o início da validade do cache negativo"""
+        return f"-{int(self.negative_ttl_days * 86400)} seconds"
+    
+    def is_negative(self, kind: str, key: str) -> bool:
+        """
+        Indica se a chave foi respondida como inexistente dentro da validade
+        
+        Args:
+            kind: Tipo da consulta ('cep' ou 'geocode')
+            key: CEP limpo ou query de geocoding
+        """
+        return self._connect().execute(
+            self.SQL_IS_NEGATIVE, (kind, self._negative_key(kind, key), self._negative_cutoff())
+        ).fetchone() is not None
+    
+    def get_negative_bulk(self, kind: str, keys: Iterable[str]) -> set:
+        """
+        Versão em lote de is_negative
+        
+        Returns:
+            Subconjunto de keys respondido como inexistente dentro da validade
+        """
+        by_key = {}
+        for key in set(keys):
+            by_key.setdefault(self._negative_key(kind, key), []).append(key)
+        
+        found = set()
+        for (key,) in self._select_in(
+            "SELECT key FROM negative_cache WHERE kind = ? AND created_at >= datetime('now', ?) AND key IN ({})",
+            list(by_key), (kind, self._negative_cutoff())
+        ):
+            found.update(by_key[key])
+        return found
+    
+    def save_negative_bulk(self, items: Iterable[Tuple[str, str]]):
+        """
+        Registra várias respostas "não encontrado" em uma única transação
+        
+        Args:
+            items: Pares (tipo, chave); a validade de chaves já registradas recomeça
+        """
+        rows = [(kind, self._negative_key(kind, key)) for kind, key in items]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_SAVE_NEGATIVE, rows)
+    
+    @staticmethod
+    def _bairro_key(bairro: str, municipio: str, uf: str) -> str:
+        """Chave canônica do bairro (sem acentos, abreviações e maiúsculas)"""
+        return canonical_address(f"{bairro}, {municipio}, {uf}")
+    
+    def get_bairro_centroid(self, bairro: str, municipio: str, uf: str) -> Optional[tuple]:
+        """
+        Centroide dos geocodes de logradouro do bairro
+        
+        Returns:
+            (latitude, longitude) ou None se o bairro tem menos de
+            bairro_min_points pontos
+        """
+        if not bairro or not municipio or not uf:
+            return None
+        result = self._connect().execute(
+            self.SQL_GET_BAIRRO, (self._bairro_key(bairro, municipio, uf), self.bairro_min_points)
+        ).fetchone()
+        return (float(result[0]), float(result[1])) if result else None
+    
+    def add_bairro_points_bulk(self, items: Iterable[Tuple[str, str, str, float, float]]):
+        """
+        Soma geocodes de logradouro aos centroides dos bairros em uma única transação
+        
+        Args:
+            items: Tuplas (bairro, município, UF, latitude, longitude)
+        """
+        rows = [
+            (self._bairro_key(bairro, municipio, uf), bairro, municipio, uf, lat, lon)
+            for bairro, municipio, uf, lat, lon in items
+        ]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_ADD_BAIRRO_POINT, rows)
+    
+    def load_cep_coordinates(self) -> List[Tuple[str, float, float]]:
+        """Todos os CEPs com coordenadas de logradouro (cep, latitude, longitude)"""
+        return self._connect().execute("SELECT cep, latitude, longitude FROM cep_coordinates").fetchall()
+    
+    def save_cep_coordinates_bulk(self, items: Iterable[Tuple[str, float, float]]):
+        """
+        Salva coordenadas de vários CEPs em uma única transação
+        
+        Args:
+            items: Tuplas (CEP limpo, latitude, longitude)
+        """
+        rows = list(items)
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_SAVE_CEP_COORDS, rows)
+    
+    def save_pending_bulk(self, items: Iterable[Tuple[str, str, str, Any]]):
+        """
+        Registra várias consultas adiadas em uma única transação
+        
+        Args:
+            items: Tuplas (tipo, chave, motivo, contexto); chaves já pendentes
+                têm o motivo atualizado e o número de tentativas incrementado.
+                O contexto (serializável em JSON ou None) volta em
+                get_pending_entries; None mantém o já gravado
+        """
+        rows = [
+            (kind, key, reason, None if context is None else json.dumps(context, ensure_ascii=False))
+            for kind, key, reason, context in items
+        ]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.SQL_SAVE_PENDING, rows)
+    
+    def get_pending(self, kind: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Retorna as chaves pendentes de um tipo, das mais antigas para as mais novas
+        
+        Args:
+            kind: Tipo da consulta ('cep' ou 'geocode')
+            limit: Máximo de chaves (None = todas)
+        """
+        return [key for key, _ in self.get_pending_entries(kind, limit)]
+    
+    def get_pending_entries(self, kind: str, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """
+        Como get_pending, mas devolve tuplas (chave, contexto)
+        
+        O contexto é o gravado com a consulta (decodificado do JSON) ou None.
+        """
+        rows = self._connect().execute(
+            "SELECT key, context FROM pending_lookups WHERE kind = ? ORDER BY created_at LIMIT ?",
+            (kind, -1 if limit is None else limit)
+        ).fetchall()
+        return [(key, None if context is None else json.loads(context)) for key, context in rows]
+    
+    def remove_pending(self, kind: str, keys: Iterable[str]):
+        """Remove chaves da fila de pendentes (já refeitas)"""
+        rows = [(kind, key) for key in keys]
+        if not rows:
+            return
+        
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM pending_lookups WHERE kind = ? AND key = ?", rows)
+    
+    def count_pending(self, kind: Optional[str] = None) -> int:
+        """Quantidade de consultas pendentes (de um tipo ou de todos)"""
+        if kind is None:
+            return self._connect().execute("SELECT COUNT(*) FROM pending_lookups").fetchone()[0]
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM pending_lookups WHERE kind = ?", (kind,)
+        ).fetchone()[0]
+    
+    def save_cep_async(self, cep: str, data: Dict):
+        """Enfileira CEP para gravação em segundo plano (write-behind)"""
+        self._enqueue(('cep', cep, data))
+    
+    def save_coordinates_async(self, address: str, latitude: float, longitude: float):
+        """Enfileira coordenadas para gravação em segundo plano (write-behind)"""
+        self._enqueue(('coords', address, (latitude, longitude)))
+    
+    def add_bairro_point_async(self, bairro: str, municipio: str, uf: str, latitude: float, longitude: float):
+        """Enfileira um geocode de logradouro para o centroide do bairro (write-behind)"""
+        self._enqueue(('bairro', (bairro, municipio, uf), (latitude, longitude)))
+    
+    def save_cep_coordinates_async(self, cep: str, latitude: float, longitude: float):
+        """Enfileira as coordenadas de logradouro de um CEP (write-behind)"""
+        self._enqueue(('cep_coords', cep, (latitude, longitude)))
+    
+    def add_negative_async(self, kind: str, key: str):
+        """Enfileira uma resposta "não encontrado" para gravação em segundo plano (write-behind)"""
+        self._enqueue(('negative', (kind, key), None))
+    
+    def add_pending_async(self, kind: str, key: str, reason: str, context: Any = None):
+        """
+        Enfileira uma consulta adiada para gravação em segundo plano (write-behind)
+        
+        Args:
+            context: Dados extras serializáveis em JSON para refazer a consulta
+                (ex.: bairro de um geocode de logradouro)
+        """
+        self._enqueue(('pending', (kind, key), (reason, context)))
+    
+    def flush(self):
+        """Aguarda até que todas as gravações pendentes sejam persistidas"""
+        if self._writer_thread is not None:
+            self._write_queue.join()
+    
+    def _enqueue(self, item: tuple):
+        """Coloca item na fila e garante que o writer esteja rodando"""
+        self._write_queue.put(item)
+        if self._writer_thread is None:
+            with self._writer_lock:
+                if self._writer_thread is None:
+                    self._writer_thread = threading.Thread(
+                        target=self._writer_loop,
+                        name="CacheManagerWriter",
+                        daemon=True
+                    )
+                    self._writer_thread.start()
+    
+    def _writer_loop(self):
+        """Drena a fila de gravação agrupando itens em uma única transação"""
+        while True:
+            batch = [self._write_queue.get()]
+            while True:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                self.save_ceps_bulk(
+                    (key, value) for kind, key, value in batch if kind == 'cep'
+                )
+                self.save_coordinates_bulk(
+                    (key, value[0], value[1]) for kind, key, value in batch if kind == 'coords'
+                )
+                self.save_negative_bulk(
+                    key for kind, key, value in batch if kind == 'negative'
+                )
+                self.add_bairro_points_bulk(
+                    (*key, *value) for kind, key, value in batch if kind == 'bairro'
+                )
+                self.save_pending_bulk(
+                    (*key, *value) for kind, key, value in batch if kind == 'pending'
+                )
+                self.save_cep_coordinates_bulk(
+                    (key, value[0], value[1]) for kind, key, value in batch if kind == 'cep_coords'
+                )
+            except Exception as e:
+                # Qualquer erro descarta só o lote: o writer segue vivo e flush() não trava
+                logger.error(f"Erro ao gravar {len(batch)} itens no cache: {e}")
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
     
     def get_stats(self) -> Dict:
         """Retorna estatísticas do cache"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM cep_cache")
-            cep_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM geocode_cache")
-            geocode_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM processing_log WHERE status = 'completed'")
-            completed_jobs = cursor.fetchone()[0]
+        cursor = self._connect().cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM cep_cache")
+        cep_count = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM geocode_cache")
+        geocode_count = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM processing_log WHERE status = 'completed'")
+        completed_jobs = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM pending_lookups")
+        pending_count = cursor.fetchone()[0]
+        
+        cursor.execute(
+            "SELECT COUNT(*) FROM negative_cache WHERE created_at >= datetime('now', ?)",
+            (self._negative_cutoff(),)
+        )
+        negative_count = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM bairro_centroids WHERE points >= ?", (self.bairro_min_points,))
+        bairro_count = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT COUNT(*) FROM cep_coordinates")
+        cep_coords_count = cursor.fetchone()[0]
         
         return {
             'cep_cache_entries': cep_count,
             'geocode_cache_entries': geocode_count,
-            'completed_jobs': completed_jobs
+            'negative_cache_entries': negative_count,
+            'bairro_centroids': bairro_count,
+            'cep_coordinates': cep_coords_count,
+            'completed_jobs': completed_jobs,
+            'pending_lookups': pending_count
         }
     
     def clear_old_cache(self, days: int = 30):
-        """Remove entradas de cache antigas"""
+        """Remove entradas de cache antigas (e as do cache negativo fora da validade)"""
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        with sqlite3.connect(self.db_path) as conn:
+        conn = self._connect()
+        with conn:
             cursor = conn.cursor()
             
             cursor.execute(
                 "DELETE FROM cep_cache WHERE created_at < ?",
                 (cutoff_date,)
             )
+            deleted = cursor.rowcount
             
             cursor.execute(
                 "DELETE FROM geocode_cache WHERE created_at < ?",
                 (cutoff_date,)
             )
+            deleted += cursor.rowcount
             
-            deleted = cursor.rowcount
-            conn.commit()
+            cursor.execute(
+                "DELETE FROM negative_cache WHERE created_at < datetime('now', ?)",
+                (self._negative_cutoff(),)
+            )
+            deleted += cursor.rowcount
         
         logger.info(f"Removidas {deleted} entradas de cache antigas")
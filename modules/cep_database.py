@@ -0,0 +1,321 @@
+"""
+Base local de CEPs (dump dos Correios/DNE ou base comunitária em CSV)
+"""
+import csv
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class CEPDatabase:
+    """
+    Base de CEPs em SQLite consultada antes do ViaCEP
+    
+    Os registros ficam numa tabela WITHOUT ROWID com o CEP como inteiro na
+    chave primária: o índice é a própria tabela, e uma consulta é uma busca
+    na árvore B de poucos microssegundos. get/get_bulk devolvem o mesmo
+    formato de dict do ViaCEP (cep, logradouro, complemento, bairro,
+    localidade, uf, ibge), então quem consome não distingue as origens.
+    
+    A importação (import_csv) lê o arquivo em chunks e grava cada chunk numa
+    transação junto com o progresso (posição em bytes no arquivo); se for
+    interrompida, a próxima chamada com o mesmo arquivo continua do primeiro
+    registro ainda não gravado.
+    """
+    
+    # Nomes aceitos para cada campo no arquivo importado (comparados em minúsculas)
+    COLUMN_ALIASES = {
+        'cep': ['cep', 'cd_cep', 'nr_cep'],
+        'logradouro': ['logradouro', 'nm_logradouro', 'endereco', 'ds_endereco'],
+        'complemento': ['complemento'],
+        'bairro': ['bairro', 'nm_bairro', 'ds_bairro'],
+        'localidade': ['localidade', 'cidade', 'municipio', 'nm_municipio', 'nm_cidade'],
+        'uf': ['uf', 'estado', 'nm_uf', 'ds_uf'],
+        'ibge': ['ibge', 'cd_ibge', 'cd_municipio']
+    }
+    FIELDS = ['logradouro', 'complemento', 'bairro', 'localidade', 'uf', 'ibge']
+    
+    BULK_BATCH_SIZE = 500
+    
+    SQL_GET = "SELECT cep, logradouro, complemento, bairro, localidade, uf, ibge FROM ceps WHERE cep = ?"
+    SQL_SAVE = """
+        INSERT OR REPLACE INTO ceps (cep, logradouro, complemento, bairro, localidade, uf, ibge)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    def __init__(self, db_path: str = "ceps.db"):
+        """
+        Inicializa a base
+        
+        Args:
+            db_path: Caminho do banco SQLite (criado se não existir)
+        """
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão persistente da thread atual (WAL: leituras concorrentes à importação)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, cached_statements=16)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Fecha todas as conexões abertas"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _init_db(self):
+        """Cria as tabelas se não existirem"""
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ceps (
+                    cep INTEGER PRIMARY KEY,
+                    logradouro TEXT,
+                    complemento TEXT,
+                    bairro TEXT,
+                    localidade TEXT,
+                    uf TEXT,
+                    ibge TEXT
+                ) WITHOUT ROWID
+            """)
+            
+            # Progresso de cada importação (arquivo identificado por caminho, tamanho e mtime):
+            # registros lidos e posição em bytes do próximo registro
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS import_progress (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    rows_done INTEGER DEFAULT 0,
+                    byte_offset INTEGER,
+                    finished INTEGER DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Bases criadas antes de byte_offset: progresso sem posição recomeça do início
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(import_progress)")}
+            if 'byte_offset' not in columns:
+                conn.execute("ALTER TABLE import_progress ADD COLUMN byte_offset INTEGER")
+    
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        """Linha da tabela no formato de resposta do ViaCEP"""
+        cep = f"{row[0]:08d}"
+        data = {'cep': f"{cep[:5]}-{cep[5:]}"}
+        data.update(zip(CEPDatabase.FIELDS, (value or '' for value in row[1:])))
+        return data
+    
+    def get(self, cep: str) -> Optional[Dict]:
+        """
+        Busca um CEP na base
+        
+        Args:
+            cep: CEP limpo (8 dígitos)
+            
+        Returns:
+            Dict no formato do ViaCEP ou None se a base não tiver o CEP
+        """
+        if not cep or not cep.isdigit():
+            return None
+        row = self._connect().execute(self.SQL_GET, (int(cep),)).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def get_bulk(self, ceps: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Busca vários CEPs com consultas IN (...) em lotes
+        
+        Returns:
+            Dict {cep: dados} apenas com os CEPs presentes na base
+        """
+        keys = sorted({int(cep) for cep in ceps if cep and cep.isdigit()})
+        conn = self._connect()
+        found = {}
+        for i in range(0, len(keys), self.BULK_BATCH_SIZE):
+            batch = keys[i:i + self.BULK_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT cep, logradouro, complemento, bairro, localidade, uf, ibge FROM ceps WHERE cep IN ({placeholders})",
+                batch
+            )
+            for row in rows:
+                found[f"{row[0]:08d}"] = self._to_dict(row)
+        return found
+    
+    def count(self) -> int:
+        """Quantidade de CEPs na base"""
+        return self._connect().execute("SELECT COUNT(*) FROM ceps").fetchone()[0]
+    
+    @staticmethod
+    def _detect_delimiter(file_path: Path, encoding: str) -> str:
+        """Delimitador mais frequente no cabeçalho"""
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            header = f.readline()
+        return max([';', ',', '|', '\t'], key=header.count)
+    
+    @staticmethod
+    def _read_chunks(path: Path, encoding: str, sep: str, offset: Optional[int],
+                     chunk_size: int) -> Iterator[Tuple[pd.DataFrame, int, int]]:
+        """
+        Lê o CSV em chunks acompanhando a posição em bytes no arquivo
+        
+        O csv.reader consome exatamente as linhas de cada registro (inclusive
+        campos entre aspas com quebra de linha), então a posição ao fim de um
+        chunk é o início do próximo registro, seja qual for a quantidade de
+        linhas descartadas. Como no on_bad_lines='skip' do pandas, registros
+        com mais campos que o cabeçalho são ignorados; os com menos são
+        completados com ''.
+        
+        Args:
+            offset: Posição em bytes do primeiro registro a ler (None = logo após o cabeçalho)
+            
+        Yields:
+            (chunk com as colunas do cabeçalho, registros lidos no chunk,
+            posição em bytes após o chunk)
+        """
+        with open(path, 'rb') as f:
+            position = 0
+            
+            def lines():
+                nonlocal position
+                for line in f:
+                    position += len(line)
+                    yield line.decode(encoding)
+            
+            header = next(csv.reader(lines(), delimiter=sep), None)
+            if not header:
+                return
+            header[0] = header[0].lstrip('\ufeff')
+            if offset is not None and offset > position:
+                f.seek(offset)
+                position = offset
+            
+            rows, read, skipped = [], 0, 0
+            for record in csv.reader(lines(), delimiter=sep):
+                if not record:
+                    continue
+                read += 1
+                if len(record) > len(header):
+                    skipped += 1
+                else:
+                    rows.append(record + [''] * (len(header) - len(record)))
+                if read == chunk_size:
+                    yield pd.DataFrame(rows, columns=header, dtype=str), read, position
+                    rows, read = [], 0
+            if read:
+                yield pd.DataFrame(rows, columns=header, dtype=str), read, position
+        
+        if skipped:
+            logger.warning(f"{skipped} registro(s) mal formado(s) ignorado(s) em {path.name}")
+    
+    @classmethod
+    def _map_columns(cls, columns) -> Dict[str, str]:
+        """Mapeia as colunas do arquivo para os campos da base ({coluna: campo})"""
+        by_name = {str(col).strip().lower(): col for col in columns}
+        mapping = {}
+        for field, aliases in cls.COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in by_name:
+                    mapping[by_name[alias]] = field
+                    break
+        return mapping
+    
+    def import_csv(self, file_path: str, encoding: str = 'utf-8', sep: Optional[str] = None,
+                   chunk_size: int = 100_000,
+                   progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Importa um CSV de CEPs em streaming, retomando importações interrompidas
+        
+        O arquivo precisa de uma coluna de CEP (cep, CD_CEP ou NR_CEP); as
+        demais colunas reconhecidas (COLUMN_ALIASES) são opcionais. CEPs já
+        presentes são substituídos.
+        
+        Args:
+            file_path: Caminho do CSV
+            encoding: Encoding do arquivo
+            sep: Delimitador (detectado pelo cabeçalho se None)
+            chunk_size: Registros lidos e gravados por transação
+            progress_callback: Recebe o total de registros do arquivo já importados
+                (inclusive os descartados por CEP inválido ou linha mal formada)
+            
+        Returns:
+            Quantidade de CEPs gravados nesta chamada
+        """
+        path = Path(file_path)
+        stat = os.stat(path)
+        source = str(path.resolve())
+        conn = self._connect()
+        
+        progress = conn.execute(
+            "SELECT size, mtime, rows_done, byte_offset, finished FROM import_progress WHERE source = ?", (source,)
+        ).fetchone()
+        rows_done, offset = 0, None
+        if progress and progress[0] == stat.st_size and progress[1] == stat.st_mtime:
+            if progress[4]:
+                logger.info(f"Importação de {path.name} já concluída ({progress[2]} registros)")
+                return 0
+            if progress[3] is not None:
+                rows_done, offset = progress[2], progress[3]
+                logger.info(f"Retomando importação de {path.name} a partir do registro {rows_done}")
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO import_progress (source, size, mtime, rows_done, byte_offset, finished) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (source, stat.st_size, stat.st_mtime, rows_done, offset)
+            )
+        
+        chunks = self._read_chunks(path, encoding, sep or self._detect_delimiter(path, encoding), offset, chunk_size)
+        
+        imported = 0
+        for chunk, read, offset in chunks:
+            mapping = self._map_columns(chunk.columns)
+            if 'cep' not in mapping.values():
+                raise ValueError(f"Coluna de CEP não encontrada em {path.name}: {list(chunk.columns)}")
+            chunk = chunk[list(mapping)].rename(columns=mapping).reindex(columns=['cep'] + self.FIELDS, fill_value='')
+            
+            # 8 dígitos depois de remover a formatação; 7 quando o zero à esquerda se perdeu no dump
+            ceps = chunk['cep'].str.replace(r'\D', '', regex=True)
+            valid = ceps.str.len().between(7, 8)
+            chunk = chunk.loc[valid].assign(cep=ceps[valid].astype('int64'))
+            
+            rows_done += read
+            with conn:
+                conn.executemany(self.SQL_SAVE, chunk.itertuples(index=False, name=None))
+                conn.execute(
+                    "UPDATE import_progress SET rows_done = ?, byte_offset = ?, updated_at = CURRENT_TIMESTAMP "
+                    "WHERE source = ?",
+                    (rows_done, offset, source)
+                )
+            imported += len(chunk)
+            if progress_callback:
+                progress_callback(rows_done)
+        
+        with conn:
+            conn.execute(
+                "UPDATE import_progress SET finished = 1, updated_at = CURRENT_TIMESTAMP WHERE source = ?", (source,)
+            )
+        logger.info(f"Importação de {path.name} concluída: {imported} CEPs gravados ({rows_done} registros)")
+        return imported
@@ -0,0 +1,131 @@
+"""
+Estimativa de coordenadas de um CEP a partir de CEPs vizinhos já resolvidos
+"""
+import bisect
+import threading
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class CEPInterpolator:
+    """
+    Índice ordenado de CEPs com coordenadas para interpolação por prefixo
+    
+    O CEP é hierárquico: os 5 primeiros dígitos identificam o setor e os
+    seguintes estreitam a região até o logradouro. Para um CEP sem
+    coordenadas, estimate procura o maior prefixo (de 7 dígitos até
+    min_prefix) compartilhado com CEPs já resolvidos; dentro da faixa numérica
+    desse prefixo, os até `neighbours` CEPs mais próximos entram na média das
+    coordenadas com peso 1 / (1 + distância numérica).
+    
+    Os CEPs ficam numa lista ordenada de inteiros: cada faixa de prefixo é
+    localizada com bisect em O(log n), sem consulta ao SQLite.
+    """
+    
+    def __init__(self, min_prefix: int = 5, neighbours: int = 8):
+        """
+        Inicializa o índice vazio
+        
+        Args:
+            min_prefix: Menor prefixo compartilhado aceito (5 = setor)
+            neighbours: Máximo de CEPs vizinhos na média ponderada
+        """
+        self.min_prefix = min_prefix
+        self.neighbours = max(1, neighbours)
+        self._ceps: List[int] = []
+        self._coords: List[Tuple[float, float]] = []
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._ceps)
+    
+    def add_many(self, items: Iterable[Tuple[str, float, float]]):
+        """
+        Adiciona vários CEPs de uma vez (reordena o índice uma única vez)
+        
+        Args:
+            items: Tuplas (CEP limpo, latitude, longitude); CEPs repetidos
+                ficam com as últimas coordenadas
+        """
+        with self._lock:
+            merged = dict(zip(self._ceps, self._coords))
+            merged.update((int(cep), (float(lat), float(lon))) for cep, lat, lon in items if str(cep).isdigit())
+            self._ceps = sorted(merged)
+            self._coords = [merged[cep] for cep in self._ceps]
+        logger.info(f"Índice de interpolação de CEPs: {len(self._ceps)} CEPs com coordenadas")
+    
+    def add(self, cep: str, latitude: float, longitude: float) -> bool:
+        """
+        Adiciona (ou atualiza) um CEP resolvido mantendo o índice ordenado
+        
+        Returns:
+            False se o CEP já estava no índice com as mesmas coordenadas
+        """
+        if not cep or not str(cep).isdigit():
+            return False
+        value = int(cep)
+        coords = (latitude, longitude)
+        with self._lock:
+            i = bisect.bisect_left(self._ceps, value)
+            if i < len(self._ceps) and self._ceps[i] == value:
+                if self._coords[i] == coords:
+                    return False
+                self._coords[i] = coords
+            else:
+                self._ceps.insert(i, value)
+                self._coords.insert(i, coords)
+        return True
+    
+    def estimate(self, cep: str, min_prefix: Optional[int] = None) -> Optional[Tuple[float, float]]:
+        """
+        Estima as coordenadas de um CEP pelos vizinhos de maior prefixo comum
+        
+        Args:
+            cep: CEP limpo (8 dígitos)
+            min_prefix: Menor prefixo aceito nesta consulta (padrão self.min_prefix)
+            
+        Returns:
+            Tupla (latitude, longitude) ou None se nenhum CEP resolvido
+            compartilha ao menos min_prefix dígitos
+        """
+        if not cep or len(cep) != 8 or not cep.isdigit():
+            return None
+        target = int(cep)
+        min_prefix = self.min_prefix if min_prefix is None else min_prefix
+        
+        with self._lock:
+            # CEP já resolvido: as próprias coordenadas, sem média com os vizinhos
+            i = bisect.bisect_left(self._ceps, target)
+            if i < len(self._ceps) and self._ceps[i] == target:
+                return self._coords[i]
+            
+            for prefix in range(7, min_prefix - 1, -1):
+                span = 10 ** (8 - prefix)
+                low = target - target % span
+                start = bisect.bisect_left(self._ceps, low)
+                end = bisect.bisect_left(self._ceps, low + span)
+                if start == end:
+                    continue
+                
+                # Caminha a partir da posição do CEP para os dois lados, pegando os mais próximos
+                left = right = bisect.bisect_left(self._ceps, target, start, end)
+                chosen = []
+                while len(chosen) < self.neighbours and (left > start or right < end):
+                    if right < end and (left == start or self._ceps[right] - target <= target - self._ceps[left - 1]):
+                        chosen.append(right)
+                        right += 1
+                    else:
+                        left -= 1
+                        chosen.append(left)
+                break
+            else:
+                return None
+            
+            weights = [1.0 / (1 + abs(self._ceps[i] - target)) for i in chosen]
+            total = sum(weights)
+            latitude = sum(w * self._coords[i][0] for w, i in zip(weights, chosen)) / total
+            longitude = sum(w * self._coords[i][1] for w, i in zip(weights, chosen)) / total
+        return latitude, longitude
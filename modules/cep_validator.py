@@ -1,37 +1,86 @@
 """
 Validador e buscador de CEP usando ViaCEP
 """
+import asyncio
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import subprocess
-import json as json_lib
-import time
+import threading
 from typing import Optional, Dict, Tuple
 import logging
 
+from .cache_manager import CacheManager
+from .cep_database import CEPDatabase
+from .rate_limiter import TokenBucket
+from .retry_policy import RetryPolicy, RetryExhaustedError, DeadlineExceededError
+from .concurrency_limiter import AdaptiveConcurrencyLimiter
+from .lookup_budget import LookupBudget
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .single_flight import SingleFlight
+from .transport import HTTPTransport
+
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logger.setLevel(logging.INFO)
 
+def _clean_cep(cep) -> Optional[str]:
+    """Remove caracteres especiais e retorna o CEP com 8 dígitos ou None"""
+    if not cep:
+        return None
+    
+    cep_clean = ''.join(filter(str.isdigit, str(cep)))
+    
+    if len(cep_clean) != 8:
+        logger.warning(f"CEP inválido (tamanho): {cep}")
+        return None
+    return cep_clean
+
+def _defer_in_budget():
+    """Marca a consulta adiada no orçamento ativo (a linha fica para o refinamento)"""
+    budget = LookupBudget.current()
+    if budget is not None:
+        budget.defer()
+
 class CEPValidator:
     """Valida e busca informações de CEP"""
     
     BASE_URL = "https://viacep.com.br/ws"
-    TIMEOUT = 30  # Aumentado para 30s
+    TIMEOUT = 10  # Timeout de cada tentativa
     RETRY_ATTEMPTS = 3
-    RETRY_DELAY = 2  # Aumentado para 2s
+    RETRY_DELAY = 1  # Backoff base (exponencial com jitter)
+    DEADLINE = 20  # Tempo máximo de uma consulta, somando tentativas e backoff
+    MAX_RATE = 20.0  # ViaCEP não publica limite; teto da taxa adaptativa (req/s)
+    CACHE_KIND = 'cep'  # Tipo das chaves nas tabelas de pendentes e do cache negativo
     
-    def __init__(self, rate_limit_delay: float = 0.1):
+    def __init__(self, rate_limit_delay: float = 0.1, cache_manager: Optional[CacheManager] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_rate: Optional[float] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 cep_database: Optional[CEPDatabase] = None):
         """
         Inicializa o validador de CEP
         
         Args:
-            rate_limit_delay: Delay em segundos entre requisições
+            rate_limit_delay: Delay inicial em segundos entre requisições
+            cache_manager: Cache SQLite consultado antes da API (opcional)
+            rate_limiter: Limitador compartilhado (criado a partir de rate_limit_delay se None)
+            max_rate: Teto da taxa adaptativa em req/s (padrão MAX_RATE)
+            concurrency_limiter: Limite adaptativo de requisições simultâneas (opcional)
+            retry_policy: Política de retry do ViaCEP (padrão a partir de RETRY_ATTEMPTS,
+                RETRY_DELAY, TIMEOUT e DEADLINE)
+            circuit_breaker: Disjuntor do ViaCEP (um por host se None)
+            transport: Transporte HTTP compartilhado (um próprio se None). Se o
+                host do ViaCEP já estiver registrado nele, os limites, o retry e o
+                disjuntor registrados valem no lugar dos argumentos acima
+            cep_database: Base local de CEPs consultada antes do cache e do ViaCEP (opcional)
         """
         self.rate_limit_delay = rate_limit_delay
-        self.last_request_time = 0
+        self._cache_lock = threading.Lock()
         self.cache = {}
+        self.cache_manager = cache_manager
+        self.cep_database = cep_database
+        self._prefetched = {}
+        self.inflight = SingleFlight()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json',
@@ -39,133 +88,228 @@ class CEPValidator:
             'Connection': 'keep-alive'
         }
         
-        # Cria session com retry automático
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=10,
-            pool_maxsize=20
+        # Pool de conexões, rate limit, concorrência, retry e disjuntor ficam no transporte
+        self.transport = transport or HTTPTransport()
+        self.upstream = self.transport.register(
+            self.BASE_URL,
+            rate_limiter=rate_limiter or TokenBucket.from_interval(rate_limit_delay),
+            max_rate=max_rate if max_rate is not None else self.MAX_RATE,
+            concurrency_limiter=concurrency_limiter or AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32),
+            retry_policy=retry_policy or RetryPolicy(
+                max_attempts=self.RETRY_ATTEMPTS, base_delay=self.RETRY_DELAY,
+                timeout=self.TIMEOUT, deadline=self.DEADLINE
+            ),
+            circuit_breaker=circuit_breaker,
+            headers=self.headers
         )
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        self.session.headers.update(self.headers)
-    
-    def _apply_rate_limit(self):
-        """Aplica rate limiting"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_request_time = time.time()
-    
-    def _get_via_curl(self, url: str) -> Optional[Dict]:
-        """Fallback usando curl via subprocess"""
-        try:
-            cmd = [
-                'curl', '-s', '--connect-timeout', '10', '--max-time', '30',
-                '-H', 'User-Agent: GeoGrafi/1.0',
-                '-H', 'Accept: application/json',
-                url
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=35)
-            if result.returncode == 0 and result.stdout:
-                return json_lib.loads(result.stdout)
-        except Exception as e:
-            logger.warning(f"Curl fallback falhou: {e}")
-        return None
+        self.rate_limiter = self.upstream.rate_limiter
+        self.rate_controller = self.upstream.rate_controller
+        self.concurrency_limiter = self.upstream.concurrency_limiter
+        self.retry_policy = self.upstream.retry_policy
+        self.circuit_breaker = self.upstream.circuit_breaker
+    
+    def _request(self, url: str, description: str = "") -> requests.Response:
+        """
+        GET no ViaCEP pelo transporte (rate limit, concorrência, retry e disjuntor do host)
+        
+        Returns:
+            Resposta final (status não retentável)
+            
+        Raises:
+            CircuitOpenError: Circuito aberto; a consulta não foi feita
+            RetryExhaustedError: Timeouts ou 429/5xx até a política desistir
+        """
+        return self.transport.get(url, description=description or url)
     
     def search_cep(self, cep: str) -> Optional[Dict]:
         """
         Busca informações de um CEP
         
+        Com o ViaCEP fora do ar (circuito aberto) ou após falha transitória
+        (timeout, 429/5xx) a busca não levanta exceção: o CEP vai para a fila
+        de pendentes (refeito por drain_pending), a consulta é marcada como
+        adiada no orçamento ativo (LookupBudget.defer) e o retorno é None,
+        sem memorizar a ausência. O mesmo vale para AsyncCEPValidator.
+        
         Args:
             cep: CEP sem formatação (8 dígitos)
             
         Returns:
-            Dict com informações do CEP ou None se inválido
+            Dict com informações do CEP ou None se inválido, inexistente ou adiado
         """
-        if not cep:
+        try:
+            return self._search(cep)
+        except (CircuitOpenError, RetryExhaustedError):
+            # CEP já na fila de pendentes (_fetch): a linha fica como parcial
+            _defer_in_budget()
             return None
+    
+    def _search(self, cep: str) -> Optional[Dict]:
+        """
+        Busca um CEP no cache em memória, na base local, no cache SQLite e no ViaCEP
         
-        # Remove caracteres especiais
-        cep_clean = ''.join(filter(str.isdigit, str(cep)))
-        
-        if len(cep_clean) != 8:
-            logger.warning(f"CEP inválido (tamanho): {cep}")
+        Raises:
+            CircuitOpenError: ViaCEP fora do ar; o CEP fica na fila de pendentes
+            RetryExhaustedError: Falha transitória (timeout, 5xx); o CEP fica na
+                fila de pendentes com o motivo (DeadlineExceededError: prazo
+                esgotado antes da tentativa, sem ir para a fila)
+        """
+        cep_clean = _clean_cep(cep)
+        if not cep_clean:
             return None
         
-        # Verifica cache
+        # Verifica cache em memória
         if cep_clean in self.cache:
             return self.cache[cep_clean]
         
-        # Busca na API com retry
-        for attempt in range(self.RETRY_ATTEMPTS):
-            try:
-                self._apply_rate_limit()
-                
-                url = f"{self.BASE_URL}/{cep_clean}/json/"
-                
-                # Tenta com session primeiro
-                try:
-                    response = self.session.get(
-                        url, 
-                        timeout=(10, 30),  # (connect timeout, read timeout)
-                        allow_redirects=True,
-                        verify=True
-                    )
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as conn_err:
-                    # Se falhar, tenta com requests simples
-                    logger.warning(f"Tentativa {attempt + 1}/{self.RETRY_ATTEMPTS} - Session falhou, tentando requests direto: {type(conn_err).__name__}")
-                    response = requests.get(
-                        url,
-                        headers=self.headers,
-                        timeout=(10, 30),
-                        allow_redirects=True,
-                        verify=True
-                    )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Verifica se é um erro da API
-                    if data.get('erro'):
-                        logger.warning(f"CEP não encontrado: {cep}")
+        # Base local de CEPs: só os CEPs ausentes dela seguem para o cache e o ViaCEP
+        if self.cep_database:
+            data = self.cep_database.get(cep_clean)
+            if data:
+                with self._cache_lock:
+                    self.cache[cep_clean] = data
+                return data
+        
+        # Verifica cache SQLite (usa resultado do prefetch quando disponível)
+        if self.cache_manager:
+            with self._cache_lock:
+                prefetched = cep_clean in self._prefetched
+                data = self._prefetched.pop(cep_clean, None)
+            if not prefetched:
+                data = self.cache_manager.get_cep(cep_clean)
+                if not data and self.cache_manager.is_negative(self.CACHE_KIND, cep_clean):
+                    # "Não encontrado" ainda dentro da validade do cache negativo
+                    with self._cache_lock:
                         self.cache[cep_clean] = None
-                        return None
-                    
-                    # Cache o resultado
+                    return None
+            if data:
+                with self._cache_lock:
                     self.cache[cep_clean] = data
-                    return data
-                else:
-                    if attempt < self.RETRY_ATTEMPTS - 1:
-                        time.sleep(self.RETRY_DELAY)
-                        continue
-                    
-            except requests.exceptions.RequestException as e:
-                error_type = type(e).__name__
-                logger.warning(f"Tentativa {attempt + 1}/{self.RETRY_ATTEMPTS} - Erro ao buscar CEP {cep}: {error_type}: {str(e)[:100]}")
-                
-                # Tenta curl como último recurso na primeira tentativa
-                if attempt == 0:
-                    logger.info(f"🔄 Tentando curl fallback para CEP {cep}...")
-                    data = self._get_via_curl(url)
-                    if data and not data.get('erro'):
-                        self.cache[cep_clean] = data
-                        logger.info(f"✅ CEP {cep} obtido via curl")
-                        return data
-                
-                if attempt < self.RETRY_ATTEMPTS - 1:
-                    time.sleep(self.RETRY_DELAY)
+                return data
+        
+        # Busca na API; chamadas simultâneas ao mesmo CEP aguardam a mesma requisição
+        return self.inflight.do(cep_clean, self._fetch, cep, cep_clean)
+    
+    def _fetch(self, cep: str, cep_clean: str) -> Optional[Dict]:
+        """Consulta o ViaCEP seguindo a política de retry e guarda o resultado (ou a pendência)"""
+        # Um voo que terminou logo antes pode já ter preenchido o cache
+        if cep_clean in self.cache:
+            return self.cache[cep_clean]
+        
+        try:
+            response = self._request(f"{self.BASE_URL}/{cep_clean}/json/", f"CEP {cep}")
+        except DeadlineExceededError:
+            # Prazo da linha esgotado antes da tentativa: adiada sem ir para a fila
+            raise
+        except (CircuitOpenError, RetryExhaustedError) as e:
+            self._defer(cep_clean, e)
+            raise
+        if response.status_code != 200:
+            return None
+        
+        try:
+            data = response.json()
+        except ValueError:
+            logger.warning(f"Resposta inválida do ViaCEP para CEP {cep}")
+            return None
+        
+        # Verifica se é um erro da API
+        if data.get('erro'):
+            logger.warning(f"CEP não encontrado: {cep}")
+            with self._cache_lock:
+                self.cache[cep_clean] = None
+            if self.cache_manager:
+                self.cache_manager.add_negative_async(self.CACHE_KIND, cep_clean)
+            return None
+        
+        # Cache o resultado
+        self._store(cep_clean, data)
+        return data
+    
+    def _defer(self, cep_clean: str, error: Exception):
+        """Guarda o CEP na fila de pendentes do cache para ser refeito por drain_pending"""
+        if self.cache_manager:
+            self.cache_manager.add_pending_async(self.CACHE_KIND, cep_clean, str(error))
+    
+    def drain_pending(self, limit: Optional[int] = None) -> int:
+        """
+        Refaz os CEPs adiados (circuito aberto ou falha transitória)
+        
+        Não roda com o circuito aberto. No meio-aberto, a primeira chave que
+        vai à rede é a consulta de teste: se responder, o circuito fecha e a
+        fila continua; se falhar, ele reabre e a drenagem para. Os resultados
+        vão para o cache como numa busca normal. CEPs que
+        falham de novo continuam na fila com o novo motivo.
+        
+        Args:
+            limit: Máximo de CEPs refeitos nesta chamada (None = todos)
+            
+        Returns:
+            Quantidade de CEPs retirados da fila
+        """
+        if not self.cache_manager or self.circuit_breaker.state == CircuitBreaker.OPEN:
+            return 0
+        
+        self.cache_manager.flush()
+        done = []
+        try:
+            for cep in self.cache_manager.get_pending(self.CACHE_KIND, limit):
+                try:
+                    self._search(cep)
+                except CircuitOpenError:
+                    break
+                except RetryExhaustedError:
                     continue
-                else:
-                    logger.error(f"CEP {cep} falhou após {self.RETRY_ATTEMPTS} tentativas (requests + curl)")
+                done.append(cep)
+        finally:
+            self.cache_manager.remove_pending(self.CACHE_KIND, done)
         
-        return None
+        if done:
+            logger.info(f"{len(done)} CEP(s) pendente(s) refeito(s)")
+        return len(done)
+    
+    def prefetch(self, ceps) -> Dict[str, Dict]:
+        """
+        Consulta vários CEPs na base local e no cache SQLite de uma só vez
+        
+        Os CEPs da base local entram direto no cache em memória. Para os
+        demais, o resultado do cache SQLite (inclusive as ausências) fica
+        guardado para que search_cep não repita a consulta chave a chave;
+        CEPs do cache negativo já entram no cache em memória como inexistentes.
+        
+        Args:
+            ceps: CEPs limpos (8 dígitos)
+            
+        Returns:
+            Dict {cep: dados} com os CEPs encontrados na base local ou no cache
+        """
+        pending = {cep for cep in ceps if cep not in self.cache}
+        local = {}
+        if self.cep_database and pending:
+            local = self.cep_database.get_bulk(pending)
+            with self._cache_lock:
+                self.cache.update(local)
+            pending -= local.keys()
+        if not self.cache_manager or not pending:
+            return local
+        
+        found = self.cache_manager.get_ceps_bulk(pending)
+        missing = self.cache_manager.get_negative_bulk(self.CACHE_KIND, pending - found.keys())
+        with self._cache_lock:
+            for cep in pending:
+                if cep in missing:
+                    self.cache[cep] = None
+                else:
+                    self._prefetched[cep] = found.get(cep)
+        found.update(local)
+        return found
+    
+    def _store(self, cep_clean: str, data: Dict):
+        """Armazena resultado no cache em memória e agenda gravação no SQLite"""
+        with self._cache_lock:
+            self.cache[cep_clean] = data
+        if self.cache_manager:
+            self.cache_manager.save_cep_async(cep_clean, data)
     
     def validate_cep_format(self, cep: str) -> bool:
         """Valida formato do CEP"""
@@ -178,3 +322,221 @@ class CEPValidator:
         if len(cep_clean) == 8:
             return f"{cep_clean[:5]}-{cep_clean[5:]}"
         return cep
+
+
+class AsyncCEPValidator:
+    """
+    Busca de CEPs no ViaCEP com asyncio/aiohttp
+    
+    Mantém várias requisições em andamento sobre a ClientSession do
+    transporte, limitadas por um AdaptiveConcurrencyLimiter (até
+    max_concurrency), e faz o backoff com asyncio.sleep para não
+    bloquear o event loop. A validação de 8 dígitos e o tratamento de
+    respostas com 'erro' são os mesmos de CEPValidator.search_cep.
+    """
+    
+    BASE_URL = CEPValidator.BASE_URL
+    TIMEOUT = CEPValidator.TIMEOUT
+    RETRY_ATTEMPTS = CEPValidator.RETRY_ATTEMPTS
+    RETRY_DELAY = CEPValidator.RETRY_DELAY
+    DEADLINE = CEPValidator.DEADLINE
+    MAX_RATE = CEPValidator.MAX_RATE
+    CACHE_KIND = CEPValidator.CACHE_KIND
+    
+    def __init__(self, max_concurrency: int = 100, rate_limit_delay: float = 0.0,
+                 cache_manager: Optional[CacheManager] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_rate: Optional[float] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 cep_database: Optional[CEPDatabase] = None):
+        """
+        Inicializa o validador assíncrono
+        
+        Args:
+            max_concurrency: Teto de requisições simultâneas ao ViaCEP; o número
+                efetivo é ajustado pela latência observada
+            rate_limit_delay: Intervalo mínimo inicial em segundos entre inícios de requisição
+                (0 = sem limite, apenas Retry-After é respeitado)
+            cache_manager: Cache SQLite consultado antes da API (opcional)
+            rate_limiter: Limitador compartilhado (criado a partir de rate_limit_delay se None)
+            max_rate: Teto da taxa adaptativa em req/s (padrão MAX_RATE)
+            concurrency_limiter: Limite adaptativo de requisições simultâneas (opcional)
+            retry_policy: Política de retry do ViaCEP (pode ser a mesma do CEPValidator)
+            circuit_breaker: Disjuntor do ViaCEP (pode ser o mesmo do CEPValidator)
+            transport: Transporte HTTP compartilhado (um próprio se None); com o
+                mesmo transporte do CEPValidator os dois dividem o estado do host
+            cep_database: Base local de CEPs consultada antes do cache e do ViaCEP (opcional)
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate_limit_delay = rate_limit_delay
+        self.cache = {}
+        self.cache_manager = cache_manager
+        self.cep_database = cep_database
+        self.inflight = SingleFlight()
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json'
+        }
+        self._owns_transport = transport is None
+        self.transport = transport or HTTPTransport(pool_maxsize=self.max_concurrency)
+        self.upstream = self.transport.register(
+            self.BASE_URL,
+            rate_limiter=rate_limiter or TokenBucket.from_interval(rate_limit_delay),
+            max_rate=max_rate if max_rate is not None else self.MAX_RATE,
+            concurrency_limiter=concurrency_limiter or AdaptiveConcurrencyLimiter(
+                initial_limit=min(10, self.max_concurrency), max_limit=self.max_concurrency
+            ),
+            retry_policy=retry_policy or RetryPolicy(
+                max_attempts=self.RETRY_ATTEMPTS, base_delay=self.RETRY_DELAY,
+                timeout=self.TIMEOUT, deadline=self.DEADLINE
+            ),
+            circuit_breaker=circuit_breaker,
+            headers=self.headers
+        )
+        self.rate_limiter = self.upstream.rate_limiter
+        self.rate_controller = self.upstream.rate_controller
+        self.concurrency_limiter = self.upstream.concurrency_limiter
+        self.retry_policy = self.upstream.retry_policy
+        self.circuit_breaker = self.upstream.circuit_breaker
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Fecha a ClientSession do transporte (se for próprio) e aguarda gravações pendentes no cache"""
+        if self._owns_transport:
+            await self.transport.close_async()
+        if self.cache_manager:
+            await asyncio.to_thread(self.cache_manager.flush)
+    
+    async def search_cep(self, cep: str) -> Optional[Dict]:
+        """
+        Busca informações de um CEP
+        
+        Falhas do ViaCEP seguem o contrato de CEPValidator.search_cep: o CEP
+        vai para a fila de pendentes, a consulta é marcada como adiada no
+        orçamento ativo e o retorno é None, sem memorizar a ausência.
+        
+        Args:
+            cep: CEP sem formatação (8 dígitos)
+            
+        Returns:
+            Dict com informações do CEP ou None se inválido, inexistente ou adiado
+        """
+        cep_clean = _clean_cep(cep)
+        if not cep_clean:
+            return None
+        
+        if cep_clean in self.cache:
+            return self.cache[cep_clean]
+        
+        # Consulta à base local leva microssegundos: feita no próprio event loop
+        if self.cep_database:
+            data = self.cep_database.get(cep_clean)
+            if data:
+                self.cache[cep_clean] = data
+                return data
+        
+        if self.cache_manager:
+            data = await asyncio.to_thread(self.cache_manager.get_cep, cep_clean)
+            if data:
+                self.cache[cep_clean] = data
+                return data
+            if await asyncio.to_thread(self.cache_manager.is_negative, self.CACHE_KIND, cep_clean):
+                self.cache[cep_clean] = None
+                return None
+        
+        return await self._fetch_or_defer(cep, cep_clean)
+    
+    async def search_many(self, ceps) -> Dict[str, Optional[Dict]]:
+        """
+        Busca vários CEPs concorrentemente
+        
+        CEPs repetidos são consultados uma única vez; a base local e o cache
+        SQLite são lidos em lote antes de abrir as requisições.
+        
+        Args:
+            ceps: Iterável de CEPs (com ou sem formatação)
+            
+        Returns:
+            Dict {cep_limpo: dados ou None}; CEPs inválidos não aparecem
+        """
+        pending = []
+        for cep in ceps:
+            cep_clean = _clean_cep(cep)
+            if cep_clean and cep_clean not in pending:
+                pending.append(cep_clean)
+        
+        results = {cep: self.cache[cep] for cep in pending if cep in self.cache}
+        pending = [cep for cep in pending if cep not in results]
+        
+        if self.cep_database and pending:
+            local = await asyncio.to_thread(self.cep_database.get_bulk, pending)
+            self.cache.update(local)
+            results.update(local)
+            pending = [cep for cep in pending if cep not in local]
+        
+        if self.cache_manager and pending:
+            found = await asyncio.to_thread(self.cache_manager.get_ceps_bulk, pending)
+            pending = [cep for cep in pending if cep not in found]
+            # CEPs do cache negativo contam como inexistentes sem ir à rede
+            found.update(dict.fromkeys(
+                await asyncio.to_thread(self.cache_manager.get_negative_bulk, self.CACHE_KIND, pending)
+            ))
+            self.cache.update(found)
+            results.update(found)
+            pending = [cep for cep in pending if cep not in found]
+        
+        if pending:
+            fetched = await asyncio.gather(*(self._fetch_or_defer(cep, cep) for cep in pending))
+            results.update(zip(pending, fetched))
+        
+        return results
+    
+    async def _fetch_or_defer(self, cep: str, cep_clean: str) -> Optional[Dict]:
+        """Consulta o ViaCEP (uma tarefa por CEP via inflight); falha vira None e consulta adiada"""
+        try:
+            return await self.inflight.do_async(cep_clean, self._fetch, cep, cep_clean)
+        except (CircuitOpenError, RetryExhaustedError):
+            _defer_in_budget()
+            return None
+    
+    async def _fetch(self, cep: str, cep_clean: str) -> Optional[Dict]:
+        """Consulta o ViaCEP pelo transporte (backoff com asyncio.sleep) e guarda o resultado ou a pendência"""
+        url = f"{self.BASE_URL}/{cep_clean}/json/"
+        try:
+            status, data = await self.transport.get_async(url, description=f"CEP {cep}")
+        except DeadlineExceededError:
+            # Prazo da linha esgotado antes da tentativa: adiada sem ir para a fila
+            raise
+        except (CircuitOpenError, RetryExhaustedError) as e:
+            # Fila de pendentes, sem memorizar: o CEP volta a ser consultado depois
+            if self.cache_manager:
+                self.cache_manager.add_pending_async(self.CACHE_KIND, cep_clean, str(e))
+            raise
+        
+        if not isinstance(data, dict):
+            logger.warning(f"CEP {cep}: resposta inválida do ViaCEP (HTTP {status})")
+            return None
+        
+        # Verifica se é um erro da API
+        if data.get('erro'):
+            logger.warning(f"CEP não encontrado: {cep}")
+            self.cache[cep_clean] = None
+            if self.cache_manager:
+                self.cache_manager.add_negative_async(self.CACHE_KIND, cep_clean)
+            return None
+        
+        self._store(cep_clean, data)
+        return data
+    
+    def _store(self, cep_clean: str, data: Dict):
+        """Armazena resultado no cache em memória e agenda gravação no SQLite"""
+        self.cache[cep_clean] = data
+        if self.cache_manager:
+            self.cache_manager.save_cep_async(cep_clean, data)
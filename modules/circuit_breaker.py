@@ -0,0 +1,179 @@
+"""
+Disjuntor (circuit breaker) por upstream
+"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+import logging
+
+import aiohttp
+import requests
+
+from .retry_policy import RetryExhaustedError, DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+T = TypeVar('T')
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem ir à rede porque o circuito do upstream está aberto"""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um upstream: fechado, aberto e meio-aberto
+    
+    Fechado, as consultas passam normalmente. Depois de failure_threshold
+    consultas seguidas que falharam (tentativas ou prazo da RetryPolicy
+    esgotados) o circuito abre e as consultas falham na hora com
+    CircuitOpenError, sem timeouts nem retries. Passados reset_timeout
+    segundos, uma única consulta de teste é liberada (meio-aberto): se der
+    certo o circuito fecha; se falhar ele reabre com o dobro da espera, até
+    max_reset_timeout.
+    """
+    
+    CLOSED = 'fechado'
+    OPEN = 'aberto'
+    HALF_OPEN = 'meio-aberto'
+    
+    # Exceções que indicam falha do upstream; as demais (cancelamento, prazo da
+    # linha esgotado, erro de programação) atravessam o disjuntor sem alterá-lo
+    FAILURE_EXCEPTIONS = (
+        RetryExhaustedError,
+        requests.exceptions.RequestException,
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+    )
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 300.0):
+        """
+        Inicializa o disjuntor
+        
+        Args:
+            name: Identificação do upstream nos logs (ex.: o host)
+            failure_threshold: Falhas seguidas que abrem o circuito
+            reset_timeout: Segundos aberto antes da consulta de teste
+            max_reset_timeout: Teto da espera após testes que falharam
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.opened = 0
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_timeout = reset_timeout
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """Estado atual (aberto vira meio-aberto quando a espera termina)"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def before_call(self) -> bool:
+        """
+        Levanta CircuitOpenError se a consulta não pode ir à rede agora
+        
+        Returns:
+            True se esta consulta é a de teste do meio-aberto
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._open_timeout:
+                    raise CircuitOpenError(f"Circuito {self.name} aberto")
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                raise CircuitOpenError(f"Circuito {self.name} meio-aberto (teste em andamento)")
+            self._probing = True
+        logger.info(f"Circuito {self.name} meio-aberto: testando o upstream")
+        return True
+    
+    def release_probe(self):
+        """Libera a vaga de teste do meio-aberto sem registrar resultado (a próxima consulta testa)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probing = False
+    
+    def _is_failure(self, error: BaseException) -> bool:
+        return isinstance(error, self.FAILURE_EXCEPTIONS) and not isinstance(error, DeadlineExceededError)
+    
+    def record_success(self):
+        """Registra uma consulta bem-sucedida (fecha o circuito se estava em teste)"""
+        with self._lock:
+            self._failures = 0
+            if self._state == self.CLOSED:
+                return
+            self._state = self.CLOSED
+            self._probing = False
+            self._open_timeout = self.reset_timeout
+        logger.info(f"Circuito {self.name} fechado: upstream respondendo de novo")
+    
+    def record_failure(self):
+        """Registra uma consulta que falhou (pode abrir ou reabrir o circuito)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open_timeout = min(self.max_reset_timeout, self._open_timeout * 2)
+            elif self._state == self.CLOSED:
+                self._failures += 1
+                if self._failures < self.failure_threshold:
+                    return
+            else:
+                return
+            self._state = self.OPEN
+            self._probing = False
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            timeout = self._open_timeout
+        logger.warning(f"Circuito {self.name} aberto: consultas falham na hora pelos próximos {timeout:.1f}s")
+    
+    def call(self, func: Callable[..., Optional[T]], *args, **kwargs) -> Optional[T]:
+        """
+        Executa func pelo disjuntor
+        
+        Returns:
+            Retorno de func; FAILURE_EXCEPTIONS (ex.: RetryExhaustedError) ou
+            None contam como falha, outras exceções só são repassadas
+        """
+        probe = self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            if self._is_failure(e):
+                self.record_failure()
+            elif probe:
+                self.release_probe()
+            raise
+        if result is None:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+    
+    async def call_async(self, func: Callable[..., Awaitable[Optional[T]]], *args, **kwargs) -> Optional[T]:
+        """Versão assíncrona de call"""
+        probe = self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            if self._is_failure(e):
+                self.record_failure()
+            elif probe:
+                self.release_probe()
+            raise
+        if result is None:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
@@ -0,0 +1,218 @@
+"""
+Limite adaptativo de requisições simultâneas guiado por latência
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class _Sample:
+    """Resultado de uma requisição medida por AdaptiveConcurrencyLimiter.slot"""
+    
+    def __init__(self):
+        self.ok = True
+        # False se a requisição não chegou a ser enviada (a vaga volta sem amostra)
+        self.sent = True
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite de requisições em andamento ajustado por gradiente de latência
+    
+    Compara a latência sem fila (menor tempo de resposta das últimas janelas
+    de amostras, que acompanha a variação do upstream ao longo do dia) com
+    uma média móvel da latência atual. Pela lei de Little, enquanto as duas
+    são próximas o servidor não está enfileirando e o limite cresce (mais
+    ~sqrt(limite) de fila tolerada); quando a latência atual sobe, o
+    gradiente sem_fila/atual fica abaixo de 1 e o limite encolhe na mesma
+    proporção. Erros (exceções, 429, 5xx) reduzem o limite em 10%.
+    
+    Serve tanto para threads (slot) quanto para asyncio (slot_async); a
+    espera por vaga no modo assíncrono não bloqueia o event loop.
+    """
+    
+    WINDOW_SECONDS = 30.0  # Duração de cada janela da latência sem fila
+    
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 smoothing: float = 0.2, tolerance: float = 1.5):
+        """
+        Inicializa o limitador
+        
+        Args:
+            initial_limit: Requisições simultâneas permitidas no início
+            min_limit: Piso do limite
+            max_limit: Teto do limite
+            smoothing: Peso de cada novo cálculo na média do limite (0-1)
+            tolerance: Aumento de latência tolerado antes de reduzir o limite
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.short_rtt = None
+        self.noload_rtt = None
+        self._window_min = float('inf')
+        self._previous_min = float('inf')
+        self._window_start = time.monotonic()
+        self._samples_since_update = 0
+        self._cond = threading.Condition()
+        self._async_waiters = deque()
+    
+    @staticmethod
+    def is_overload(status: int) -> bool:
+        """Indica se o status HTTP sinaliza sobrecarga do servidor (429 ou 5xx)"""
+        return status == 429 or status >= 500
+    
+    @property
+    def current_limit(self) -> int:
+        """Limite inteiro em vigor"""
+        return max(self.min_limit, int(self.limit))
+    
+    def acquire(self):
+        """Aguarda (bloqueando a thread) até haver vaga"""
+        with self._cond:
+            while self.in_flight >= self.current_limit:
+                self._cond.wait()
+            self.in_flight += 1
+    
+    async def acquire_async(self):
+        """
+        Aguarda (sem bloquear o event loop) até haver vaga
+        
+        A vaga é entregue já contabilizada a quem está na fila, em ordem de
+        chegada, para que tarefas recém-chegadas não passem na frente.
+        """
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self.in_flight < self.current_limit and not self._async_waiters:
+                self.in_flight += 1
+                return
+            waiter = loop.create_future()
+            self._async_waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Recebeu a vaga mas foi cancelada: devolve para o próximo da fila
+            if waiter.done() and not waiter.cancelled():
+                self._give_back()
+            raise
+    
+    def release(self, rtt: float = None, ok: bool = True):
+        """
+        Libera a vaga e atualiza o limite
+        
+        Args:
+            rtt: Tempo de resposta em segundos (None para não amostrar)
+            ok: False se a requisição falhou ou foi limitada pelo servidor
+        """
+        with self._cond:
+            busy = self.in_flight
+            self.in_flight -= 1
+            if not ok:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            elif rtt is not None:
+                self._update(rtt, busy)
+            self._cond.notify_all()
+            self._wake_async_waiters()
+    
+    def _give_back(self):
+        """Devolve uma vaga entregue a uma tarefa que não vai usá-la"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+            self._wake_async_waiters()
+    
+    def _wake_async_waiters(self):
+        """Entrega as vagas livres às tarefas da fila, em ordem de chegada (com o lock)"""
+        while self._async_waiters and self.in_flight < self.current_limit:
+            loop, waiter = self._async_waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._wake, waiter)
+    
+    def _wake(self, waiter):
+        if waiter.done():
+            # Cancelada antes de acordar: a vaga já contabilizada volta
+            self._give_back()
+        else:
+            waiter.set_result(None)
+    
+    def _update(self, rtt: float, busy: int):
+        """Recalcula o limite a partir de uma amostra de latência (com o lock)"""
+        self.short_rtt = rtt if self.short_rtt is None else self.short_rtt + (rtt - self.short_rtt) * 0.1
+        
+        # Mínimo das duas últimas janelas: se a latência de base do upstream
+        # subir (ou cair) ao longo do dia, a estimativa acompanha em até duas janelas
+        now = time.monotonic()
+        if now - self._window_start >= self.WINDOW_SECONDS:
+            self._previous_min, self._window_min = self._window_min, float('inf')
+            self._window_start = now
+        self._window_min = min(self._window_min, rtt)
+        self.noload_rtt = min(self._window_min, self._previous_min)
+        
+        # Recalcula cerca de uma vez por "volta" (limite amostras), como um
+        # ajuste por RTT, para não crescer a cada resposta de uma rajada
+        self._samples_since_update += 1
+        if self._samples_since_update < self.current_limit:
+            return
+        self._samples_since_update = 0
+        
+        # Sem uso do limite atual não há informação para aumentá-lo
+        if busy < self.limit / 2:
+            return
+        
+        gradient = max(0.5, min(1.0, self.tolerance * self.noload_rtt / self.short_rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+    
+    @contextmanager
+    def slot(self):
+        """
+        Ocupa uma vaga durante o bloco e mede a latência
+        
+        O bloco pode marcar sample.ok = False (ex.: status 429/5xx); exceções
+        também contam como falha. Com sample.sent = False (requisição
+        desistida antes do envio) a vaga é só devolvida, sem amostra.
+        """
+        self.acquire()
+        sample = _Sample()
+        start = time.monotonic()
+        try:
+            yield sample
+        except BaseException:
+            sample.ok = False
+            raise
+        finally:
+            self._release_sample(sample, start)
+    
+    @asynccontextmanager
+    async def slot_async(self):
+        """Versão assíncrona de slot"""
+        await self.acquire_async()
+        sample = _Sample()
+        start = time.monotonic()
+        try:
+            yield sample
+        except BaseException:
+            sample.ok = False
+            raise
+        finally:
+            self._release_sample(sample, start)
+    
+    def _release_sample(self, sample: _Sample, start: float):
+        """Libera a vaga de slot/slot_async (amostrando só requisições enviadas)"""
+        if sample.sent:
+            self.release(time.monotonic() - start, sample.ok)
+        else:
+            self.release()
@@ -2,16 +2,27 @@
 Processador de CSV em chunks para dados de alta volume
 """
 import pandas as pd
-from typing import Iterator, Callable, Optional, Dict, List
+from typing import Iterator, Callable, Optional, Dict, List, Tuple
 import logging
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import io
 import chardet
 
 from .cep_validator import CEPValidator
 from .geocoder import Geocoder
 from .cache_manager import CacheManager
+from .cep_database import CEPDatabase
+from .gazetteer import MunicipalityGazetteer
+from .cep_interpolator import CEPInterpolator
+from .address_normalizer import normalize_address
+from .disk_set import DiskBackedSet
+from .rate_limiter import SharedRateLimiter
+from .lookup_budget import LookupBudget
+from .circuit_breaker import CircuitOpenError
+from .retry_policy import RetryExhaustedError
+from .transport import HTTPTransport
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
@@ -20,13 +31,43 @@ if not logger.handlers:
 class CSVProcessor:
     """Processa arquivos CSV em chunks com enriquecimento de dados geográficos"""
     
+    # Colunas de endereço usadas como chave de deduplicação
+    ADDRESS_KEY_COLUMNS = ['NM_LOGRADOURO', 'NM_BAIRRO', 'NM_MUNICIPIO', 'NM_UF']
+    
+    # Colunas de CEP (com os aliases e o CEP corrigido de arquivos a refinar)
+    # lidas como texto: inferidas como número, perdem o zero à esquerda dos
+    # CEPs de SP ('01310100' -> 1310100 ou 1310100.0)
+    CEP_COLUMNS = ['CD_CEP', 'NR_CEP', 'CEP', 'CD_CEP_CORRETO']
+    
+    # Colunas das tabelas de chaves resolvidas
+    RESOLVED_COLUMNS = ['encontrado', 'logradouro', 'bairro', 'municipio', 'uf',
+                        'latitude', 'longitude', 'precisao', 'refinar']
+    
+    # Precisões (DS_PRECISAO) que dispensam refinamento mesmo com o orçamento
+    # esgotado; as demais são logradouro, bairro, interpolado e municipio
+    # ('original' indica coordenadas que já vieram no arquivo)
+    FULL_PRECISION = ['original', 'cep', 'endereco']
+    
+    # Prefixo comum com CEPs resolvidos tentado primeiro na interpolação do
+    # fallback (6 dígitos: vizinhos a poucas quadras); sem vizinhos assim, vale
+    # o setor (5 dígitos)
+    INTERPOLATION_STREET_PREFIX = 6
+    
     def __init__(
         self,
         chunk_size: int = 1000,
         max_workers: int = 3,
         use_cache: bool = True,
         cache_db: str = "cache.db",
-        col_mapping: Optional[Dict[str, str]] = None
+        col_mapping: Optional[Dict[str, str]] = None,
+        max_memory_keys: int = 1_000_000,
+        rate_limit_db: Optional[str] = None,
+        row_time_budget: Optional[float] = None,
+        row_call_budget: Optional[int] = None,
+        chunk_time_budget: Optional[float] = None,
+        chunk_call_budget: Optional[int] = None,
+        cep_db: Optional[str] = None,
+        gazetteer_db: Optional[str] = None
     ):
         """
         Inicializa o processador
@@ -37,23 +78,69 @@ class CSVProcessor:
             use_cache: Usar cache local
             cache_db: Caminho do banco de cache
             col_mapping: Mapeamento de colunas alternativas -> nomes esperados
+            max_memory_keys: Chaves distintas mantidas em memória no plano global
+                antes de transbordar para disco
+            rate_limit_db: Banco do limitador de taxa compartilhado por host entre
+                processos (padrão: diretório temporário do sistema)
+            row_time_budget: Segundos para geocodificar cada chave distinta de uma
+                linha em cada etapa (None = sem limite)
+            row_call_budget: Consultas ao Nominatim por chave distinta em cada etapa
+            chunk_time_budget: Segundos de consultas ao Nominatim por chunk
+            chunk_call_budget: Consultas ao Nominatim por chunk. Esgotado um orçamento,
+                as consultas restantes são adiadas: a linha sai com a melhor precisão
+                obtida (DS_PRECISAO) e FL_REFINAR = True
+            cep_db: Base local de CEPs criada com CEPDatabase.import_csv; os CEPs
+                presentes nela não vão ao ViaCEP (None = só cache e ViaCEP)
+            gazetteer_db: Tabela de municípios criada com MunicipalityGazetteer.import_csv;
+                o fallback por município usa o centroide dela sem ir ao Nominatim
         """
         self.chunk_size = chunk_size
         self.max_workers = max_workers
-        self.cep_validator = CEPValidator(rate_limit_delay=0.15)
-        self.geocoder = Geocoder(rate_limit_delay=1.5)
         self.cache_manager = CacheManager(cache_db) if use_cache else None
+        self.cep_database = CEPDatabase(cep_db) if cep_db else None
+        self.gazetteer = MunicipalityGazetteer(gazetteer_db) if gazetteer_db else None
+        # CEPs com coordenadas de logradouro, para estimar CEPs sem geocode
+        self.cep_interpolator = CEPInterpolator()
+        if self.cache_manager:
+            self.cep_interpolator.add_many(self.cache_manager.load_cep_coordinates())
+        # Um único transporte: ViaCEP (por CEP e por endereço) e Nominatim reaproveitam conexões
+        self.transport = HTTPTransport()
+        self.cep_validator = CEPValidator(
+            rate_limit_delay=0.15,
+            cache_manager=self.cache_manager,
+            rate_limiter=SharedRateLimiter.for_url(CEPValidator.BASE_URL, 0.15, db_path=rate_limit_db),
+            transport=self.transport,
+            cep_database=self.cep_database
+        )
+        self.geocoder = Geocoder(
+            rate_limit_delay=1.5,
+            cache_manager=self.cache_manager,
+            rate_limiter=SharedRateLimiter.for_url(Geocoder.BASE_URL, 1.5, db_path=rate_limit_db),
+            transport=self.transport
+        )
         self.col_mapping = col_mapping or {}
+        self.max_memory_keys = max_memory_keys
+        self.row_time_budget = row_time_budget
+        self.row_call_budget = row_call_budget
+        self.chunk_time_budget = chunk_time_budget
+        self.chunk_call_budget = chunk_call_budget
+        self._chunk_budget = None
+        self.cep_by_address_cache = {}
         self.detected_encoding = None
         self.detected_delimiter = None
         
+        self._stats_lock = threading.Lock()
         self.stats = {
             'total_rows': 0,
             'processed_rows': 0,
             'fixed_ceps': 0,
             'found_coordinates': 0,
+            'rows_to_refine': 0,
+            'refined_rows': 0,
+            'pending_lookups': 0,
             'errors': []
         }
+        self._update_rate_stats()
     
     def _detect_encoding(self, file_path: str, sample_size: int = 100000) -> str:
         """Detecta o encoding do arquivo automaticamente"""
@@ -91,72 +178,14 @@ class CSVProcessor:
     
     def _normalize_address(self, text: str) -> str:
         """Normaliza e padroniza endereços"""
-        if not text or pd.isna(text):
-            return ''
-        
-        import re
-        
-        # Converte para string e remove espaços extras
-        text = str(text).strip()
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove caracteres especiais no início/fim
-        text = re.sub(r'^[^\w\s]+|[^\w\s]+$', '', text)
-        
-        # Padroniza abreviações comuns de logradouro
-        abbreviations = {
-            r'\bR\b\.?': 'Rua',
-            r'\bRUA\b': 'Rua',
-            r'\bAV\b\.?': 'Avenida',
-            r'\bAVENIDA\b': 'Avenida',
-            r'\bAVDA\b\.?': 'Avenida',
-            r'\bALM\b\.?': 'Alameda',
-            r'\bALAMEDA\b': 'Alameda',
-            r'\bTRAV\b\.?': 'Travessa',
-            r'\bTRAVESSA\b': 'Travessa',
-            r'\bPÇ\b\.?': 'Praça',
-            r'\bPC\b\.?': 'Praça',
-            r'\bPRACA\b': 'Praça',
-            r'\bPRAÇA\b': 'Praça',
-            r'\bROD\b\.?': 'Rodovia',
-            r'\bRODOVIA\b': 'Rodovia',
-            r'\bEST\b\.?': 'Estrada',
-            r'\bESTRADA\b': 'Estrada',
-            r'\bLARGO\b': 'Largo',
-            r'\bLGO\b\.?': 'Largo',
-            r'\bVIA\b': 'Via',
-            r'\bBECO\b': 'Beco',
-            r'\bVILA\b': 'Vila',
-            r'\bPARQUE\b': 'Parque',
-            r'\bJARDIM\b': 'Jardim',
-            r'\bCONJ\b\.?': 'Conjunto',
-            r'\bCONJUNTO\b': 'Conjunto',
-        }
-        
-        for pattern, replacement in abbreviations.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        
-        # Capitaliza corretamente (Title Case), mas mantém algumas palavras em minúsculo
-        words = text.split()
-        lowercase_words = {'de', 'da', 'do', 'das', 'dos', 'e', 'a', 'o'}
-        
-        formatted_words = []
-        for i, word in enumerate(words):
-            # Primeira palavra sempre em maiúscula
-            if i == 0 or word.lower() not in lowercase_words:
-                formatted_words.append(word.capitalize())
-            else:
-                formatted_words.append(word.lower())
-        
-        text = ' '.join(formatted_words)
-        
-        return text.strip()
+        return normalize_address(text)
     
     def process_file(
         self,
         file_path: str,
         output_path: Optional[str] = None,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        plan: str = "chunk"
     ) -> Dict:
         """
         Processa arquivo CSV completo
@@ -165,10 +194,23 @@ class CSVProcessor:
             file_path: Caminho do arquivo CSV
             output_path: Caminho para salvar arquivo processado
             progress_callback: Função para reportar progresso
+            plan: "chunk" resolve as chaves chunk a chunk; "global" faz uma
+                primeira passada coletando as chaves distintas do arquivo
+                inteiro, resolve cada uma uma única vez e só então processa
+                os chunks
             
         Returns:
             Dicionário com estatísticas
         """
+        if plan not in ("chunk", "global"):
+            raise ValueError(f"Plano de resolução desconhecido: {plan}")
+        
+        # Consultas adiadas numa execução anterior (API fora do ar)
+        self._drain_pending()
+        
+        if plan == "global":
+            self._resolve_global_plan(file_path)
+        
         # Lê arquivo em chunks
         chunks = self._read_csv_chunks(file_path)
         
@@ -180,11 +222,17 @@ class CSVProcessor:
             results.append(processed_chunk)
             
             self.stats['processed_rows'] += len(chunk)
+            self._update_rate_stats()
+            self._drain_pending()
             
             if progress_callback:
                 progress = (self.stats['processed_rows'] / self.stats['total_rows']) * 100
                 progress_callback(progress)
         
+        # Garante que resultados da rede foram persistidos no cache
+        if self.cache_manager:
+            self.cache_manager.flush()
+        
         # Combina resultados
         final_df = pd.concat(results, ignore_index=True)
         
@@ -198,6 +246,84 @@ class CSVProcessor:
             'stats': self.stats
         }
     
+    def refine_file(
+        self,
+        file_path: str,
+        output_path: Optional[str] = None,
+        progress_callback: Optional[Callable] = None
+    ) -> Dict:
+        """
+        Refaz apenas as linhas marcadas em FL_REFINAR de um arquivo já processado
+        
+        Primeiro toda a fila de pendentes do cache (chaves que falharam por
+        circuito aberto, timeout ou 5xx) é consultada de novo; em seguida só
+        as linhas marcadas passam outra vez pelo processamento, que encontra
+        em cache o que já foi resolvido e só vai à rede pelo que falta. As
+        demais linhas são copiadas sem alteração.
+        
+        Args:
+            file_path: CSV gerado por process_file (com FL_REFINAR)
+            output_path: Caminho para salvar o arquivo corrigido
+            progress_callback: Função para reportar progresso
+            
+        Returns:
+            Dicionário com estatísticas (refined_rows: linhas que deixaram de
+            estar marcadas; rows_to_refine: linhas que continuam marcadas)
+        """
+        self._drain_pending(drain_all=True)
+        
+        results = []
+        for i, chunk in enumerate(self._read_csv_chunks(file_path)):
+            logger.info(f"Refinando chunk {i+1}...")
+            results.append(self._refine_chunk(chunk))
+            
+            self.stats['processed_rows'] += len(chunk)
+            self._update_rate_stats()
+            
+            if progress_callback:
+                progress = (self.stats['processed_rows'] / self.stats['total_rows']) * 100
+                progress_callback(progress)
+        
+        if self.cache_manager:
+            self.cache_manager.flush()
+            self.stats['pending_lookups'] = self.cache_manager.count_pending()
+        
+        final_df = pd.concat(results, ignore_index=True)
+        
+        if output_path:
+            final_df.to_csv(output_path, index=False, encoding='utf-8')
+            logger.info(f"Arquivo salvo em: {output_path}")
+        
+        return {
+            'dataframe': final_df,
+            'stats': self.stats
+        }
+    
+    def _refine_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Reprocessa as linhas de FL_REFINAR do chunk, mantendo as coordenadas anteriores quando não melhorarem"""
+        chunk = self._prepare_chunk(chunk)
+        flagged = chunk['FL_REFINAR'].astype(str).str.lower().eq('true')
+        if not flagged.any():
+            return chunk
+        
+        previous = chunk.loc[flagged]
+        retry = previous.copy()
+        retry['FL_REFINAR'] = False
+        # Coordenadas de precisão parcial são buscadas de novo
+        partial = ~retry['DS_PRECISAO'].isin(self.FULL_PRECISION)
+        retry[['DS_LATITUDE', 'DS_LONGITUDE', 'DS_PRECISAO']] = (
+            retry[['DS_LATITUDE', 'DS_LONGITUDE', 'DS_PRECISAO']].astype(object).where(~partial, axis=0)
+        )
+        refined = self._process_chunk(retry)
+        
+        # Sem resultado melhor, a linha fica com as coordenadas que já tinha
+        kept = refined['DS_LATITUDE'].isna() & previous['DS_LATITUDE'].notna()
+        for col in ['DS_LATITUDE', 'DS_LONGITUDE', 'DS_PRECISAO']:
+            refined[col] = refined[col].astype(object).mask(kept, previous[col])
+        
+        self._increment_stat('refined_rows', int((~refined['FL_REFINAR']).sum()))
+        return pd.concat([chunk.loc[~flagged], refined]).reindex(chunk.index)
+    
     def _read_csv_chunks(self, file_path: str) -> Iterator[pd.DataFrame]:
         """Lê arquivo CSV em chunks"""
         # Detecta encoding automaticamente
@@ -210,6 +336,9 @@ class CSVProcessor:
         
         logger.info(f"Lendo arquivo com encoding: {self.detected_encoding}, delimitador: '{self.detected_delimiter}'")
         
+        cep_columns = self.CEP_COLUMNS + [self.col_mapping['CD_CEP']] if 'CD_CEP' in self.col_mapping else self.CEP_COLUMNS
+        dtype = {col: str for col in cep_columns}
+        
         try:
             # Primeiro, obtém o número total de linhas
             with open(file_path, 'r', encoding=self.detected_encoding, errors='replace') as f:
@@ -224,7 +353,8 @@ class CSVProcessor:
                 on_bad_lines='warn',
                 delimiter=self.detected_delimiter,
                 quotechar='"',
-                skipinitialspace=True
+                skipinitialspace=True,
+                dtype=dtype
             ):
                 yield chunk
         
@@ -244,12 +374,104 @@ class CSVProcessor:
                 on_bad_lines='warn',
                 delimiter=self.detected_delimiter,
                 quotechar='"',
-                skipinitialspace=True
+                skipinitialspace=True,
+                dtype=dtype
             ):
                 yield chunk
     
-    def _process_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
-        """Processa um chunk do CSV"""
+    def _resolve_global_plan(self, file_path: str):
+        """
+        Primeira passada do plano global
+        
+        Lê o arquivo inteiro coletando as combinações distintas de CEP,
+        endereço e CD_MUNICIPIO, quando a coluna existe, já que o fallback do
+        gazetteer a usa (em disco quando excedem max_memory_keys), informa
+        quantas consultas à rede serão necessárias e resolve cada chave uma
+        única vez. Os resultados ficam nos caches, de modo que a segunda passada
+        apenas junta os valores às linhas.
+        """
+        key_cols = ['CD_CEP'] + self.ADDRESS_KEY_COLUMNS
+        row_keys = DiskBackedSet(max_items=self.max_memory_keys)
+        ceps = DiskBackedSet(max_items=self.max_memory_keys)
+        addresses = DiskBackedSet(max_items=self.max_memory_keys)
+        
+        try:
+            for chunk in self._read_csv_chunks(file_path):
+                chunk = self._prepare_chunk(chunk)
+                keys = self._chunk_keys(chunk)
+                if 'CD_MUNICIPIO' in chunk.columns:
+                    keys['CD_MUNICIPIO'] = self._text_column(chunk, 'CD_MUNICIPIO')
+                    key_cols = ['CD_CEP'] + self.ADDRESS_KEY_COLUMNS + ['CD_MUNICIPIO']
+                keys['needs_coords'] = chunk['DS_LATITUDE'].isna() | chunk['DS_LONGITUDE'].isna()
+                
+                row_keys.update(keys.drop_duplicates().itertuples(index=False, name=None))
+                ceps.update(
+                    (cep,) for cep in keys.loc[self._cep_status(keys['CD_CEP']), 'CD_CEP'].unique()
+                )
+                addresses.update(
+                    keys.loc[keys['needs_coords'], self.ADDRESS_KEY_COLUMNS]
+                    .drop_duplicates().itertuples(index=False, name=None)
+                )
+            
+            self._plan_lookups(ceps, addresses)
+            
+            # Resolve as combinações distintas sem alterar as estatísticas por linha
+            row_stats = {k: v for k, v in self.stats.items() if k != 'errors'}
+            for batch in row_keys.batches(self.chunk_size):
+                frame = pd.DataFrame(batch, columns=key_cols + ['needs_coords'])
+                frame['DS_LATITUDE'] = frame['DS_LONGITUDE'] = frame['needs_coords'].map({True: None, False: 0.0})
+                self._process_chunk(frame.drop(columns=['needs_coords']))
+            self.stats.update(row_stats)
+        finally:
+            row_keys.close()
+            ceps.close()
+            addresses.close()
+    
+    def _plan_lookups(self, ceps: DiskBackedSet, addresses: DiskBackedSet):
+        """
+        Conta as chaves distintas do arquivo e estima as consultas à rede
+        
+        As estimativas contam só os CEPs e os endereços originais que não
+        estão na base local de CEPs nem em cache (nem no cache negativo). As
+        consultas que dependem das respostas (correção de CEP por endereço,
+        geocoding do endereço do CEP e a cascata de fallback) não entram, então
+        o número real de chamadas pode ser maior.
+        """
+        cep_misses = 0
+        for batch in ceps.batches():
+            cleaned = {cep for (cep,) in batch}
+            cached = set()
+            if self.cep_database:
+                cached = set(self.cep_database.get_bulk(cleaned))
+            if self.cache_manager:
+                cached |= self.cache_manager.get_ceps_bulk(cleaned - cached).keys()
+                cached |= self.cache_manager.get_negative_bulk(CEPValidator.CACHE_KIND, cleaned - cached)
+            cep_misses += sum(1 for cep in cleaned if cep not in cached and cep not in self.cep_validator.cache)
+        
+        address_misses = 0
+        for batch in addresses.batches():
+            queries = {
+                self.geocoder.build_address_query(street, "", neighborhood, city, state)
+                for street, neighborhood, city, state in batch if street and city
+            }
+            cached = set()
+            if self.cache_manager:
+                cached = self.cache_manager.get_coordinates_bulk(queries).keys()
+                cached |= self.cache_manager.get_negative_bulk(Geocoder.CACHE_KIND, queries - cached)
+            address_misses += sum(1 for q in queries if q not in cached and f"address:{q}" not in self.geocoder.cache)
+        
+        self.stats['distinct_ceps'] = len(ceps)
+        self.stats['distinct_addresses'] = len(addresses)
+        self.stats['estimated_cep_lookups'] = cep_misses
+        self.stats['estimated_address_lookups'] = address_misses
+        
+        logger.info(
+            f"Plano global: {len(ceps)} CEPs distintos ({cep_misses} fora do cache), "
+            f"{len(addresses)} endereços distintos sem coordenadas ({address_misses} fora do cache)"
+        )
+    
+    def _prepare_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Aplica o mapeamento de colunas e cria as colunas de saída"""
         chunk = chunk.copy()
         
         # Aplicar mapeamento de colunas se existir
@@ -272,108 +494,425 @@ class CSVProcessor:
             chunk['DS_LATITUDE'] = None
         if 'DS_LONGITUDE' not in chunk.columns:
             chunk['DS_LONGITUDE'] = None
+        if 'DS_PRECISAO' not in chunk.columns:
+            chunk['DS_PRECISAO'] = None
+        if 'FL_REFINAR' not in chunk.columns:
+            chunk['FL_REFINAR'] = False
+        
+        return chunk
+    
+    def _chunk_keys(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Chaves de consulta do chunk como texto (valores ausentes viram '', CEPs limpos)"""
+        keys = pd.DataFrame(
+            {col: self._text_column(chunk, col) for col in ['CD_CEP'] + self.ADDRESS_KEY_COLUMNS},
+            index=chunk.index
+        )
+        keys['CD_CEP'] = self._clean_ceps(keys['CD_CEP'])
+        return keys
+    
+    @staticmethod
+    def _clean_ceps(ceps: pd.Series) -> pd.Series:
+        """
+        Limpa a coluna de CEPs de forma vetorizada
+        
+        Remove o '.0' de CEPs lidos como float e tudo o que não é dígito, e
+        devolve o zero à esquerda perdido por CEPs lidos como número
+        ('1310100.0' -> '01310100'). Nenhum CEP começa com '00', então só os
+        de 7 dígitos são completados.
+        """
+        digits = ceps.str.replace(r'\.0+$', '', regex=True).str.replace(r'\D', '', regex=True)
+        return digits.mask(digits.str.len().eq(7), digits.str.zfill(8))
+    
+    @staticmethod
+    def _cep_status(ceps: pd.Series) -> pd.Series:
+        """CEP_STATUS: máscara dos CEPs limpos com 8 dígitos, os únicos consultados"""
+        return ceps.str.len().eq(8)
+    
+    def _process_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Processa um chunk do CSV"""
+        chunk = self._prepare_chunk(chunk)
+        keys = self._chunk_keys(chunk)
+        keys['CEP_STATUS'] = self._cep_status(keys['CD_CEP'])
+        needs_coords = chunk['DS_LATITUDE'].isna() | chunk['DS_LONGITUDE'].isna()
+        chunk['DS_PRECISAO'] = chunk['DS_PRECISAO'].astype(object).mask(
+            ~needs_coords & chunk['DS_PRECISAO'].isna(), 'original'
+        )
+        self._chunk_budget = LookupBudget(self.chunk_time_budget, self.chunk_call_budget)
+        
+        # Resolve no cache SQLite, em lote, tudo o que for possível antes da rede
+        self._prefetch_chunk(keys)
+        
+        # Criterio 1: valida cada CEP distinto uma única vez
+        cep_status = keys['CEP_STATUS']
+        cep_table = self._resolve_ceps(keys.loc[cep_status, 'CD_CEP'], needs_coords[cep_status])
+        by_cep = self._merge_back(keys[['CD_CEP']], cep_table, on=['CD_CEP'])
+        cep_found = by_cep['encontrado'].eq(True)
+        
+        # Criterio 2: CEP com formato válido mas inexistente -> busca CEP por endereço
+        fix_cols = ['NM_LOGRADOURO', 'NM_MUNICIPIO', 'NM_UF']
+        fix_mask = by_cep['encontrado'].eq(False)
+        fix_table = self._resolve_cep_fixes(keys.loc[fix_mask, fix_cols])
+        by_fix = self._merge_back(keys[fix_cols], fix_table, on=fix_cols)
+        by_fix = by_fix.where(fix_mask, axis=0)
+        cep_fixed = by_fix['cep_corrigido'].notna()
+        fix_found = by_fix['encontrado'].eq(True)
+        
+        # Linhas que seguem sem coordenadas tentam o endereço original
+        has_step1_coords = (cep_found & by_cep['latitude'].notna()) | by_fix['latitude'].notna()
+        address_mask = needs_coords & ~has_step1_coords
+        address_table = self._resolve_addresses(keys.loc[address_mask, self.ADDRESS_KEY_COLUMNS])
+        by_address = self._merge_back(keys[self.ADDRESS_KEY_COLUMNS], address_table, on=self.ADDRESS_KEY_COLUMNS)
+        by_address = by_address.where(address_mask, axis=0)
+        
+        # CEP validado (critério 1) ou corrigido (critério 2)
+        chunk['CD_CEP_CORRETO'] = (
+            chunk['CD_CEP_CORRETO']
+            .mask(cep_found, keys['CD_CEP'])
+            .mask(cep_fixed, by_fix['cep_corrigido'])
+        )
+        self._increment_stat('fixed_ceps', int(cep_fixed.sum()))
+        
+        # Coordenadas do CEP validado (só onde faltavam), do CEP corrigido e do endereço original
+        self._apply_coordinates(chunk, cep_found & needs_coords, by_cep)
+        self._apply_coordinates(chunk, fix_found, by_fix)
+        self._apply_coordinates(chunk, address_mask, by_address)
+        
+        for col, field in zip(self.ADDRESS_KEY_COLUMNS, ['logradouro', 'bairro', 'municipio', 'uf']):
+            correct_col = f'{col}_CORRETO'
+            
+            # Endereço retornado pelo ViaCEP
+            values = (
+                chunk[correct_col]
+                .mask(cep_found, by_cep[field])
+                .mask(fix_found, by_fix[field])
+            )
+            
+            # Replica dados originais para colunas corretas se estiverem vazias
+            empty = values.isna() | values.eq('')
+            values = values.mask(empty & keys[col].ne(''), keys[col])
+            
+            # Padroniza formato dos endereços corretos (uma vez por valor distinto)
+            if col in ('NM_LOGRADOURO', 'NM_BAIRRO'):
+                filled = values.notna() & values.ne('')
+                normalized = {value: self._normalize_address(value) for value in values[filled].unique()}
+                values = values.mask(filled, values.map(normalized))
+            
+            chunk[correct_col] = values
+        
+        # Se ainda não tem coordenadas, tenta buscar usando dados corretos
+        # (CD_MUNICIPIO, quando existe, identifica o município no gazetteer; o
+        # CD_CEP original, inexistente ou sem geocode, ainda serve à interpolação)
+        fallback_cols = (['CD_CEP_CORRETO'] + [f'{col}_CORRETO' for col in self.ADDRESS_KEY_COLUMNS]
+                         + ['CD_MUNICIPIO', 'CD_CEP'])
+        fallback_mask = chunk['DS_LATITUDE'].isna() | chunk['DS_LONGITUDE'].isna()
+        fallback_keys = pd.DataFrame(
+            {col: keys[col] if col == 'CD_CEP' else self._text_column(chunk, col) for col in fallback_cols},
+            index=chunk.index
+        )
+        fallback_table = self._resolve_fallbacks(fallback_keys.loc[fallback_mask])
+        by_fallback = self._merge_back(fallback_keys, fallback_table, on=fallback_cols)
+        self._apply_coordinates(chunk, fallback_mask, by_fallback)
+        
+        # Linhas cujas consultas foram cortadas (orçamento esgotado, circuito
+        # aberto ou falha transitória) antes da precisão máxima
+        budget_cut = (
+            (cep_found & by_cep['refinar'].eq(True))
+            | by_fix['refinar'].eq(True)
+            | by_address['refinar'].eq(True)
+            | (fallback_mask & by_fallback['refinar'].eq(True))
+        )
+        # CEPs não validados/corrigidos porque o ViaCEP estava fora do ar ou falhou
+        cep_deferred = (
+            (by_cep['refinar'].eq(True) & by_cep['encontrado'].isna())
+            | (by_fix['refinar'].eq(True) & by_fix['cep_corrigido'].isna())
+        )
+        refine = (needs_coords & budget_cut & ~chunk['DS_PRECISAO'].isin(self.FULL_PRECISION)) | cep_deferred
+        chunk['FL_REFINAR'] = chunk['FL_REFINAR'].eq(True).mask(needs_coords, False) | refine
+        self._increment_stat('rows_to_refine', int(refine.sum()))
+        if refine.any():
+            logger.warning(
+                f"{int(refine.sum())} linha(s) com consultas adiadas ou precisão parcial "
+                f"marcada(s) em FL_REFINAR"
+            )
+        
+        return chunk
+    
+    @staticmethod
+    def _text_column(chunk: pd.DataFrame, col: str) -> pd.Series:
+        """Retorna a coluna como texto sem espaços nas pontas ('' se ausente)"""
+        if col not in chunk.columns:
+            return pd.Series('', index=chunk.index, dtype=object)
+        values = chunk[col]
+        return values.astype(object).where(values.notna(), '').astype(str).str.strip()
+    
+    @staticmethod
+    def _merge_back(keys: pd.DataFrame, table: pd.DataFrame, on: List[str]) -> pd.DataFrame:
+        """Junta a tabela de chaves resolvidas de volta às linhas, preservando o índice"""
+        merged = keys[on].merge(table, on=on, how='left', validate='many_to_one')
+        merged.index = keys.index
+        return merged
+    
+    def _apply_coordinates(self, chunk: pd.DataFrame, mask: pd.Series, table: pd.DataFrame):
+        """Copia latitude/longitude/precisão da tabela resolvida para as linhas da máscara que as obtiveram"""
+        mask = mask & table['latitude'].notna() & table['longitude'].notna()
+        chunk['DS_LATITUDE'] = chunk['DS_LATITUDE'].mask(mask, table['latitude'])
+        chunk['DS_LONGITUDE'] = chunk['DS_LONGITUDE'].mask(mask, table['longitude'])
+        chunk['DS_PRECISAO'] = chunk['DS_PRECISAO'].mask(mask, table['precisao'])
+        self._increment_stat('found_coordinates', int(mask.sum()))
+    
+    def _record_key_error(self, key, error: Exception):
+        """Registra erro na resolução de uma chave (afeta todas as linhas com ela)"""
+        logger.error(f"Erro ao resolver {key}: {str(error)}")
+        with self._stats_lock:
+            self.stats['errors'].append({
+                'key': key,
+                'error': str(error)
+            })
+    
+    def _search_cep(self, cep: str) -> Tuple[Optional[Dict], bool]:
+        """
+        Busca o CEP no validador indicando se a consulta foi adiada
+        
+        O ViaCEP não entra nos orçamentos de linha/chunk; o orçamento sem
+        limites só registra o adiamento (CEP na fila de pendentes), que
+        search_cep sinaliza com LookupBudget.defer.
+        
+        Returns:
+            (dados do CEP ou None, True se a consulta foi adiada)
+        """
+        with LookupBudget().activate() as lookup:
+            cep_data = self.cep_validator.search_cep(cep)
+        return cep_data, lookup.cut
+    
+    def _row_budget(self) -> LookupBudget:
+        """Orçamento de uma chave, debitado também no orçamento do chunk atual"""
+        return LookupBudget(self.row_time_budget, self.row_call_budget, parent=self._chunk_budget)
+    
+    def _increment_stat(self, name: str, amount: int = 1):
+        """Incrementa um contador de estatística de forma segura entre threads"""
+        with self._stats_lock:
+            self.stats[name] += amount
+    
+    def _update_rate_stats(self):
+        """Registra as métricas do transporte (tentativas, falhas, latência, taxa, 429/503, concorrência e circuito) e as consultas coalescidas de cada API"""
+        with self._stats_lock:
+            for name, client in (('viacep', self.cep_validator), ('nominatim', self.geocoder)):
+                for metric, value in client.upstream.metrics().items():
+                    self.stats[f'{name}_{metric}'] = value
+                self.stats[f'{name}_coalesced'] = client.inflight.shared
+    
+    def _drain_pending(self, drain_all: bool = False):
+        """
+        Refaz as consultas adiadas (circuito aberto, timeout ou 5xx)
+        
+        Cada API drena a fila com o circuito fechado ou meio-aberto (a
+        primeira chave é a consulta de teste), até chunk_size chaves por
+        chamada para não segurar o processamento (ou a fila inteira com
+        drain_all); os resultados vão para o cache.
+        """
+        if not self.cache_manager:
+            return
+        limit = None if drain_all else self.chunk_size
+        self.cep_validator.drain_pending(limit)
+        self.geocoder.drain_pending(limit)
+        self.cache_manager.flush()
+        self.stats['pending_lookups'] = self.cache_manager.count_pending()
+    
+    def _run_parallel(self, func: Callable, keys: List) -> List[Dict]:
+        """
+        Resolve cada chave com func usando até max_workers threads
+        
+        As consultas à rede passam a maior parte do tempo esperando resposta,
+        então várias chaves ficam em voo ao mesmo tempo; o rate limiting de
+        CEPValidator/Geocoder continua valendo entre as threads.
         
-        # Processa cada linha
-        for idx, row in chunk.iterrows():
+        Returns:
+            Registros retornados por func (chaves com erro são descartadas)
+        """
+        if self.max_workers <= 1 or len(keys) <= 1:
+            records = [func(key) for key in keys]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as executor:
+                records = list(executor.map(func, keys))
+        return [record for record in records if record is not None]
+    
+    def _resolve_ceps(self, ceps: pd.Series, needs_coords: pd.Series) -> pd.DataFrame:
+        """
+        Consulta cada CEP distinto do chunk uma única vez
+        
+        Args:
+            ceps: CEPs limpos das linhas com CEP_STATUS verdadeiro
+            needs_coords: Máscara das linhas sem coordenadas (mesmo índice de ceps)
+        
+        Returns:
+            DataFrame com CD_CEP, encontrado, logradouro, bairro, municipio, uf,
+            latitude, longitude, precisao e refinar (coordenadas só para CEPs de
+            linhas sem coordenadas)
+        """
+        wants_coords = set(ceps[needs_coords])
+        
+        def resolve(cep: str) -> Optional[Dict]:
             try:
-                cep = str(row.get('CD_CEP', '')).strip()
-                
-                # Criterio 1: Validar CEP existente
-                if cep and self.cep_validator.validate_cep_format(cep):
-                    cep_data = self.cep_validator.search_cep(cep)
-                    
+                cep_data, deferred = self._search_cep(cep)
+                if deferred:
+                    # CEP na fila de pendentes (circuito aberto, timeout ou 5xx): linha
+                    # sai sem validação e marcada para refinamento
+                    return {'CD_CEP': cep, 'refinar': True}
+                record = {'CD_CEP': cep, 'encontrado': bool(cep_data)}
+                if cep_data:
+                    record.update(self._address_from_cep_data(cep_data))
+                    if cep in wants_coords:
+                        with self._row_budget().activate() as budget:
+                            coords = self._get_coordinates_from_cep(cep_data)
+                        if coords:
+                            record['latitude'], record['longitude'] = coords
+                            record['precisao'] = self._cep_precision(cep_data)
+                            if record['precisao'] == 'cep':
+                                self._learn_cep_coordinates(cep, coords)
+                        record['refinar'] = budget.cut
+                return record
+            except Exception as e:
+                self._record_key_error(cep, e)
+                return None
+        
+        records = self._run_parallel(resolve, list(ceps.unique()))
+        return pd.DataFrame(records, columns=['CD_CEP'] + self.RESOLVED_COLUMNS)
+    
+    def _resolve_cep_fixes(self, addresses: pd.DataFrame) -> pd.DataFrame:
+        """
+        Busca o CEP correto uma única vez por (logradouro, município, UF)
+        
+        Returns:
+            DataFrame com as colunas de chave, cep_corrigido e os dados do
+            CEP corrigido (endereço, coordenadas, precisao e refinar)
+        """
+        key_cols = list(addresses.columns)
+        
+        def resolve(key: tuple) -> Optional[Dict]:
+            try:
+                record = dict(zip(key_cols, key))
+                cep_corrigido = self._search_cep_by_address(pd.Series(record))
+                if cep_corrigido:
+                    cep_data, deferred = self._search_cep(cep_corrigido)
+                    if deferred:
+                        return dict(zip(key_cols, key), refinar=True)
+                    record['cep_corrigido'] = cep_corrigido
+                    record['encontrado'] = bool(cep_data)
                     if cep_data:
-                        # CEP válido - marca como correto
-                        chunk.at[idx, 'CD_CEP_CORRETO'] = cep
-                        
-                        # Preenche dados do endereço correto
-                        chunk.at[idx, 'NM_LOGRADOURO_CORRETO'] = cep_data.get('logradouro', '')
-                        chunk.at[idx, 'NM_BAIRRO_CORRETO'] = cep_data.get('bairro', '')
-                        chunk.at[idx, 'NM_MUNICIPIO_CORRETO'] = cep_data.get('localidade', '')
-                        chunk.at[idx, 'NM_UF_CORRETO'] = cep_data.get('uf', '')
-                        
-                        # Busca coordenadas
-                        if pd.isna(row.get('DS_LATITUDE')) or pd.isna(row.get('DS_LONGITUDE')):
+                        record.update(self._address_from_cep_data(cep_data))
+                        with self._row_budget().activate() as budget:
                             coords = self._get_coordinates_from_cep(cep_data)
-                            if coords:
-                                chunk.at[idx, 'DS_LATITUDE'] = coords[0]
-                                chunk.at[idx, 'DS_LONGITUDE'] = coords[1]
-                                self.stats['found_coordinates'] += 1
-                    else:
-                        # CEP inválido - Criterio 2: Buscar CEP por endereço
-                        cep_corrigido = self._search_cep_by_address(row)
-                        if cep_corrigido:
-                            chunk.at[idx, 'CD_CEP_CORRETO'] = cep_corrigido
-                            self.stats['fixed_ceps'] += 1
-                            
-                            # Busca dados do CEP corrigido
-                            cep_data = self.cep_validator.search_cep(cep_corrigido)
-                            if cep_data:
-                                # Preenche dados do endereço correto
-                                chunk.at[idx, 'NM_LOGRADOURO_CORRETO'] = cep_data.get('logradouro', '')
-                                chunk.at[idx, 'NM_BAIRRO_CORRETO'] = cep_data.get('bairro', '')
-                                chunk.at[idx, 'NM_MUNICIPIO_CORRETO'] = cep_data.get('localidade', '')
-                                chunk.at[idx, 'NM_UF_CORRETO'] = cep_data.get('uf', '')
-                                
-                                # Busca coordenadas pelo CEP corrigido
-                                coords = self._get_coordinates_from_cep(cep_data)
-                                if coords:
-                                    chunk.at[idx, 'DS_LATITUDE'] = coords[0]
-                                    chunk.at[idx, 'DS_LONGITUDE'] = coords[1]
-                                    self.stats['found_coordinates'] += 1
-                
-                # Se ainda não tem coordenadas, tenta por endereço
-                if pd.isna(chunk.at[idx, 'DS_LATITUDE']) or pd.isna(chunk.at[idx, 'DS_LONGITUDE']):
-                    coords = self._get_coordinates_by_address(row)
-                    if coords:
-                        chunk.at[idx, 'DS_LATITUDE'] = coords[0]
-                        chunk.at[idx, 'DS_LONGITUDE'] = coords[1]
-                        self.stats['found_coordinates'] += 1
-                
-                # Replica dados originais para colunas corretas se estiverem vazias
-                if pd.isna(chunk.at[idx, 'NM_LOGRADOURO_CORRETO']) or chunk.at[idx, 'NM_LOGRADOURO_CORRETO'] == '':
-                    logradouro_original = row.get('NM_LOGRADOURO', '')
-                    if logradouro_original and str(logradouro_original).strip():
-                        chunk.at[idx, 'NM_LOGRADOURO_CORRETO'] = str(logradouro_original).strip()
-                
-                if pd.isna(chunk.at[idx, 'NM_BAIRRO_CORRETO']) or chunk.at[idx, 'NM_BAIRRO_CORRETO'] == '':
-                    bairro_original = row.get('NM_BAIRRO', '')
-                    if bairro_original and str(bairro_original).strip():
-                        chunk.at[idx, 'NM_BAIRRO_CORRETO'] = str(bairro_original).strip()
-                
-                if pd.isna(chunk.at[idx, 'NM_MUNICIPIO_CORRETO']) or chunk.at[idx, 'NM_MUNICIPIO_CORRETO'] == '':
-                    municipio_original = row.get('NM_MUNICIPIO', '')
-                    if municipio_original and str(municipio_original).strip():
-                        chunk.at[idx, 'NM_MUNICIPIO_CORRETO'] = str(municipio_original).strip()
-                
-                if pd.isna(chunk.at[idx, 'NM_UF_CORRETO']) or chunk.at[idx, 'NM_UF_CORRETO'] == '':
-                    uf_original = row.get('NM_UF', '')
-                    if uf_original and str(uf_original).strip():
-                        chunk.at[idx, 'NM_UF_CORRETO'] = str(uf_original).strip()
-                
-                # Padroniza formato dos endereços corretos
-                if chunk.at[idx, 'NM_LOGRADOURO_CORRETO']:
-                    chunk.at[idx, 'NM_LOGRADOURO_CORRETO'] = self._normalize_address(chunk.at[idx, 'NM_LOGRADOURO_CORRETO'])
-                
-                if chunk.at[idx, 'NM_BAIRRO_CORRETO']:
-                    chunk.at[idx, 'NM_BAIRRO_CORRETO'] = self._normalize_address(chunk.at[idx, 'NM_BAIRRO_CORRETO'])
-                
-                # Se ainda não tem coordenadas, tenta buscar usando dados corretos
-                if pd.isna(chunk.at[idx, 'DS_LATITUDE']) or pd.isna(chunk.at[idx, 'DS_LONGITUDE']):
-                    coords = self._get_coordinates_with_fallback(chunk.loc[idx])
-                    if coords:
-                        chunk.at[idx, 'DS_LATITUDE'] = coords[0]
-                        chunk.at[idx, 'DS_LONGITUDE'] = coords[1]
-                        self.stats['found_coordinates'] += 1
-            
+                        if coords:
+                            record['latitude'], record['longitude'] = coords
+                            record['precisao'] = self._cep_precision(cep_data)
+                            if record['precisao'] == 'cep':
+                                self._learn_cep_coordinates(cep_corrigido, coords)
+                        record['refinar'] = budget.cut
+                return record
+            except (CircuitOpenError, RetryExhaustedError):
+                return dict(zip(key_cols, key), refinar=True)
             except Exception as e:
-                logger.error(f"Erro ao processar linha {idx}: {str(e)}")
-                self.stats['errors'].append({
-                    'row': idx,
-                    'error': str(e)
-                })
+                self._record_key_error(key, e)
+                return None
         
-        return chunk
+        keys = list(addresses.drop_duplicates().itertuples(index=False, name=None))
+        records = self._run_parallel(resolve, keys)
+        return pd.DataFrame(records, columns=key_cols + ['cep_corrigido'] + self.RESOLVED_COLUMNS)
+    
+    def _resolve_addresses(self, addresses: pd.DataFrame) -> pd.DataFrame:
+        """Geocodifica uma única vez cada (logradouro, bairro, município, UF) distinto"""
+        def search(row: pd.Series) -> Optional[tuple]:
+            coords = self._get_coordinates_by_address(row)
+            return (coords, 'endereco') if coords else None
+        
+        return self._resolve_coordinates(addresses, search)
+    
+    def _resolve_fallbacks(self, addresses: pd.DataFrame) -> pd.DataFrame:
+        """Executa a cascata de fallback uma única vez por endereço corrigido distinto"""
+        return self._resolve_coordinates(addresses, self._get_coordinates_with_fallback)
+    
+    def _resolve_coordinates(self, addresses: pd.DataFrame, search: Callable) -> pd.DataFrame:
+        """
+        Aplica search a cada combinação distinta de addresses e tabela as coordenadas
+        
+        search recebe a linha e retorna ((latitude, longitude), precisão) ou None;
+        cada chave é resolvida dentro do seu orçamento (_row_budget).
+        """
+        key_cols = list(addresses.columns)
+        
+        def resolve(key: tuple) -> Optional[Dict]:
+            try:
+                record = dict(zip(key_cols, key))
+                with self._row_budget().activate() as budget:
+                    found = search(pd.Series(record))
+                if found:
+                    (record['latitude'], record['longitude']), record['precisao'] = found
+                record['refinar'] = budget.cut
+                return record
+            except Exception as e:
+                self._record_key_error(key, e)
+                return None
+        
+        keys = list(addresses.drop_duplicates().itertuples(index=False, name=None))
+        records = self._run_parallel(resolve, keys)
+        return pd.DataFrame(records, columns=key_cols + ['latitude', 'longitude', 'precisao', 'refinar'])
+    
+    @staticmethod
+    def _address_from_cep_data(cep_data: Dict) -> Dict:
+        """Extrai os campos de endereço de uma resposta do ViaCEP"""
+        return {
+            'logradouro': cep_data.get('logradouro', ''),
+            'bairro': cep_data.get('bairro', ''),
+            'municipio': cep_data.get('localidade', ''),
+            'uf': cep_data.get('uf', '')
+        }
+    
+    @staticmethod
+    def _cep_precision(cep_data: Dict) -> str:
+        """Precisão das coordenadas do endereço de um CEP (CEPs gerais de cidade não têm logradouro)"""
+        if cep_data.get('logradouro'):
+            return 'cep'
+        return 'bairro' if cep_data.get('bairro') else 'municipio'
+    
+    def _learn_cep_coordinates(self, cep: str, coords: tuple):
+        """Adiciona as coordenadas de logradouro de um CEP ao índice de interpolação e ao cache"""
+        cep_clean = ''.join(filter(str.isdigit, str(cep)))
+        if self.cep_interpolator.add(cep_clean, *coords) and self.cache_manager:
+            self.cache_manager.save_cep_coordinates_async(cep_clean, *coords)
+    
+    def _prefetch_chunk(self, keys: pd.DataFrame):
+        """
+        Consulta a base local de CEPs e o cache SQLite uma única vez por chunk
+        
+        Carrega de uma vez os CEPs do chunk e as queries de geocoding
+        derivadas deles e dos endereços originais, de forma que apenas as
+        chaves ausentes do cache cheguem ao CEPValidator/Geocoder.
+        
+        Args:
+            keys: Colunas CD_CEP (limpo), CEP_STATUS e ADDRESS_KEY_COLUMNS do chunk
+        """
+        if not self.cache_manager and not self.cep_database:
+            return
+        
+        ceps = set(keys.loc[keys['CEP_STATUS'], 'CD_CEP'].unique())
+        
+        cep_hits = self.cep_validator.prefetch(ceps)
+        
+        queries = set()
+        for cep in ceps:
+            cep_data = cep_hits.get(cep) or self.cep_validator.cache.get(cep)
+            if cep_data:
+                queries.add(self.geocoder.build_address_query(
+                    cep_data.get('logradouro', ''), "", cep_data.get('bairro', ''),
+                    cep_data.get('localidade', ''), cep_data.get('uf', '')
+                ))
+        
+        addresses = keys[self.ADDRESS_KEY_COLUMNS].drop_duplicates()
+        for street, neighborhood, city, state in addresses.itertuples(index=False):
+            if street and city:
+                queries.add(self.geocoder.build_address_query(street, "", neighborhood, city, state))
+        
+        self.geocoder.prefetch(queries)
     
     def _search_cep_by_address(self, row: pd.Series) -> Optional[str]:
         """Busca CEP correto usando endereço através de busca na ViaCEP"""
@@ -384,10 +923,13 @@ class CSVProcessor:
         if not street or not city or not state:
             return None
         
+        cache_key = (street, city, state)
+        if cache_key in self.cep_by_address_cache:
+            return self.cep_by_address_cache[cache_key]
+        
         try:
             # Usa API ViaCEP para buscar endereços (formato: UF/cidade/logradouro)
             # Exemplo: https://viacep.com.br/ws/SP/São Paulo/Paulista/json/
-            import requests
             
             # Normaliza strings para URL
             from urllib.parse import quote
@@ -397,19 +939,24 @@ class CSVProcessor:
             
             url = f"https://viacep.com.br/ws/{state_encoded}/{city_encoded}/{street_encoded}/json/"
             
-            self.cep_validator._apply_rate_limit()
-            response = requests.get(url, timeout=10)
+            # Mesmo host no transporte: retry, rate limit, concorrência e disjuntor das buscas por CEP
+            response = self.transport.get(url, description=f"CEP por endereço {street}, {city}/{state}")
             
             if response.status_code == 200:
                 data = response.json()
+                cep = None
                 
                 # ViaCEP retorna array de resultados
                 if isinstance(data, list) and len(data) > 0:
                     # Pega o primeiro resultado
-                    cep = data[0].get('cep', '').replace('-', '')
+                    cep = data[0].get('cep', '').replace('-', '') or None
                     if cep:
                         logger.info(f"CEP encontrado para {street}, {city}/{state}: {cep}")
-                        return cep
+                
+                self.cep_by_address_cache[cache_key] = cep
+                return cep
+        except (CircuitOpenError, RetryExhaustedError):
+            raise
         except Exception as e:
             logger.warning(f"Erro ao buscar CEP por endereço: {str(e)}")
         
@@ -425,6 +972,18 @@ class CSVProcessor:
             city = cep_data.get('localidade', '')
             state = cep_data.get('uf', '')
             
+            # CEP geral de cidade: centro da cidade pelo código IBGE do ViaCEP, sem rede
+            if self.gazetteer and not street and not neighborhood:
+                coords = self.gazetteer.lookup(city, state, cep_data.get('ibge', ''))
+                if coords:
+                    return coords
+            
+            # CEP de bairro: centroide aprendido, se houver pontos suficientes
+            if self.cache_manager and not street and neighborhood:
+                coords = self.cache_manager.get_bairro_centroid(neighborhood, city, state)
+                if coords:
+                    return coords
+            
             return self.geocoder.search_by_address(street, "", neighborhood, city, state)
         
         except Exception as e:
@@ -448,62 +1007,109 @@ class CSVProcessor:
             logger.warning(f"Erro ao buscar coordenadas por endereço: {str(e)}")
             return None
     
-    def _get_coordinates_with_fallback(self, row: pd.Series) -> Optional[tuple]:
+    def _geocode(self, search: Callable, *args) -> Optional[tuple]:
+        """
+        Executa uma busca do Geocoder dentro da cascata de fallback
+        
+        Um erro inesperado conta como consulta adiada (a linha sai marcada
+        em FL_REFINAR) e devolve None, sem interromper as estratégias seguintes.
+        """
+        try:
+            return search(*args)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar coordenadas no fallback: {str(e)}")
+            budget = LookupBudget.current()
+            if budget is not None:
+                budget.defer()
+            return None
+    
+    def _get_coordinates_with_fallback(self, row: pd.Series) -> Optional[Tuple[tuple, str]]:
         """
         Busca coordenadas usando múltiplas estratégias de fallback
         Prioriza dados corretos e tenta combinações mais específicas primeiro
+        
+        Com o orçamento da linha esgotado, as estratégias seguintes só
+        aproveitam o que já está em cache (precisão menor, linha a refinar);
+        uma busca no Nominatim que falha só pula a estratégia dela, e as que
+        não usam rede (interpolação, centroide do bairro, gazetteer) seguem.
+        
+        Returns:
+            ((latitude, longitude), precisão da estratégia que encontrou) ou None
         """
-        try:
-            # Pega campos corretos primeiro, depois originais como fallback
-            cep_correto = row.get('CD_CEP_CORRETO', '')
-            logradouro = str(row.get('NM_LOGRADOURO_CORRETO', '') or row.get('NM_LOGRADOURO', '')).strip()
-            bairro = str(row.get('NM_BAIRRO_CORRETO', '') or row.get('NM_BAIRRO', '')).strip()
-            municipio = str(row.get('NM_MUNICIPIO_CORRETO', '') or row.get('NM_MUNICIPIO', '')).strip()
-            uf = str(row.get('NM_UF_CORRETO', '') or row.get('NM_UF', '')).strip()
-            
-            # Estratégia 1: CEP correto + cidade
-            if cep_correto and municipio:
-                logger.info(f"Tentando: CEP {cep_correto} + {municipio}")
-                coords = self.geocoder.search_by_cep(cep_correto, municipio, "BR")
-                if coords:
-                    logger.info(f"✓ Encontrado por CEP + cidade")
-                    return coords
-            
-            # Estratégia 2: Endereço completo (logradouro + bairro + cidade + UF)
-            if logradouro and municipio:
-                logger.info(f"Tentando: {logradouro}, {bairro}, {municipio}/{uf}")
-                coords = self.geocoder.search_by_address(logradouro, "", bairro, municipio, uf)
-                if coords:
-                    logger.info(f"✓ Encontrado por endereço completo")
-                    return coords
-            
-            # Estratégia 3: Logradouro + cidade + UF (sem bairro)
-            if logradouro and municipio and uf:
-                logger.info(f"Tentando: {logradouro}, {municipio}/{uf}")
-                coords = self.geocoder.search_by_address(logradouro, "", "", municipio, uf)
-                if coords:
-                    logger.info(f"✓ Encontrado por logradouro + cidade")
-                    return coords
-            
-            # Estratégia 4: Apenas bairro + cidade + UF
-            if bairro and municipio and uf:
-                logger.info(f"Tentando: {bairro}, {municipio}/{uf}")
-                coords = self.geocoder.search_by_address("", "", bairro, municipio, uf)
-                if coords:
-                    logger.info(f"✓ Encontrado por bairro + cidade")
-                    return coords
-            
-            # Estratégia 5: Apenas cidade + UF (coordenadas do centro da cidade)
-            if municipio and uf:
-                logger.info(f"Tentando: {municipio}/{uf}")
-                coords = self.geocoder.search_by_address("", "", "", municipio, uf)
-                if coords:
-                    logger.info(f"✓ Encontrado centro da cidade")
-                    return coords
+        # Pega campos corretos primeiro, depois originais como fallback
+        cep_correto = row.get('CD_CEP_CORRETO', '')
+        logradouro = str(row.get('NM_LOGRADOURO_CORRETO', '') or row.get('NM_LOGRADOURO', '')).strip()
+        bairro = str(row.get('NM_BAIRRO_CORRETO', '') or row.get('NM_BAIRRO', '')).strip()
+        municipio = str(row.get('NM_MUNICIPIO_CORRETO', '') or row.get('NM_MUNICIPIO', '')).strip()
+        uf = str(row.get('NM_UF_CORRETO', '') or row.get('NM_UF', '')).strip()
+        cep = ''.join(filter(str.isdigit, str(cep_correto or row.get('CD_CEP', ''))))
+        
+        # Estratégia 1: CEP correto + cidade
+        if cep_correto and municipio:
+            logger.info(f"Tentando: CEP {cep_correto} + {municipio}")
+            coords = self._geocode(self.geocoder.search_by_cep, cep_correto, municipio, "BR")
+            if coords:
+                logger.info(f"✓ Encontrado por CEP + cidade")
+                self._learn_cep_coordinates(cep_correto, coords)
+                return coords, 'cep'
+        
+        # Estratégia 2: Endereço completo (logradouro + bairro + cidade + UF)
+        if logradouro and municipio:
+            logger.info(f"Tentando: {logradouro}, {bairro}, {municipio}/{uf}")
+            coords = self._geocode(self.geocoder.search_by_address, logradouro, "", bairro, municipio, uf)
+            if coords:
+                logger.info(f"✓ Encontrado por endereço completo")
+                return coords, 'endereco'
+        
+        # Estratégia 3: Logradouro + cidade + UF (sem bairro)
+        if logradouro and municipio and uf:
+            logger.info(f"Tentando: {logradouro}, {municipio}/{uf}")
+            coords = self._geocode(self.geocoder.search_by_address, logradouro, "", "", municipio, uf)
+            if coords:
+                logger.info(f"✓ Encontrado por logradouro + cidade")
+                return coords, 'logradouro'
+        
+        # Estratégia 4: Apenas bairro + cidade + UF, do centroide aprendido com
+        # os geocodes de logradouro quando há pontos suficientes
+        if bairro and municipio and uf:
+            coords = self.cache_manager.get_bairro_centroid(bairro, municipio, uf) if self.cache_manager else None
+            if coords:
+                logger.info(f"✓ Centroide do bairro no cache")
+                return coords, 'bairro'
             
-            logger.warning(f"Nenhuma coordenada encontrada para: {municipio}")
-            return None
+            logger.info(f"Tentando: {bairro}, {municipio}/{uf}")
+            coords = self._geocode(self.geocoder.search_by_address, "", "", bairro, municipio, uf)
+            if coords:
+                logger.info(f"✓ Encontrado por bairro + cidade")
+                return coords, 'bairro'
         
-        except Exception as e:
-            logger.warning(f"Erro ao buscar coordenadas com fallback: {str(e)}")
-            return None
+        # Estratégia 5: CEPs vizinhos já resolvidos, sem rede, só quando as buscas
+        # por endereço e bairro falham: primeiro os que dividem o logradouro
+        # (prefixo longo), depois os do setor
+        coords = self.cep_interpolator.estimate(cep, self.INTERPOLATION_STREET_PREFIX)
+        if coords:
+            logger.info(f"✓ Interpolado de CEPs vizinhos de {cep}")
+            return coords, 'interpolado'
+        
+        coords = self.cep_interpolator.estimate(cep)
+        if coords:
+            logger.info(f"✓ Interpolado de CEPs do setor de {cep}")
+            return coords, 'interpolado'
+        
+        # Estratégia 6: Apenas cidade + UF (coordenadas do centro da cidade),
+        # do gazetteer local quando o município está nele
+        if self.gazetteer:
+            coords = self.gazetteer.lookup(municipio, uf, row.get('CD_MUNICIPIO', ''))
+            if coords:
+                logger.info(f"✓ Centro da cidade no gazetteer")
+                return coords, 'municipio'
+        
+        if municipio and uf:
+            logger.info(f"Tentando: {municipio}/{uf}")
+            coords = self._geocode(self.geocoder.search_by_address, "", "", "", municipio, uf)
+            if coords:
+                logger.info(f"✓ Encontrado centro da cidade")
+                return coords, 'municipio'
+        
+        logger.warning(f"Nenhuma coordenada encontrada para: {municipio}")
+        return None
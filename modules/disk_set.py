@@ -0,0 +1,102 @@
+"""
+Conjunto de chaves que transborda para disco quando cresce demais
+"""
+import sqlite3
+import json
+import os
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class DiskBackedSet:
+    """
+    Conjunto de tuplas mantido em memória até max_items e depois em SQLite
+    
+    Usado para coletar chaves distintas de arquivos maiores que a memória
+    disponível. As tuplas são serializadas em JSON e deduplicadas pela
+    chave primária da tabela temporária.
+    """
+    
+    def __init__(self, max_items: int = 1_000_000, tmp_dir: Optional[str] = None):
+        """
+        Inicializa o conjunto
+        
+        Args:
+            max_items: Quantidade de itens mantidos em memória antes de transbordar
+            tmp_dir: Diretório do arquivo temporário (padrão do sistema se None)
+        """
+        self.max_items = max_items
+        self.tmp_dir = tmp_dir
+        self._memory = set()
+        self._conn = None
+        self._db_path = None
+    
+    def add(self, item: tuple):
+        """Adiciona uma tupla ao conjunto"""
+        self._memory.add(item)
+        if len(self._memory) >= self.max_items:
+            self._spill()
+    
+    def update(self, items: Iterable[tuple]):
+        """Adiciona várias tuplas ao conjunto"""
+        for item in items:
+            self.add(item)
+    
+    def _spill(self):
+        """Grava os itens em memória no arquivo temporário"""
+        if self._conn is None:
+            fd, self._db_path = tempfile.mkstemp(suffix='.db', prefix='geografi_keys_', dir=self.tmp_dir)
+            os.close(fd)
+            self._conn = sqlite3.connect(self._db_path)
+            self._conn.execute("PRAGMA journal_mode=OFF")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("CREATE TABLE keys (key TEXT PRIMARY KEY)")
+            logger.info(f"Conjunto de chaves excedeu {self.max_items} itens, usando disco: {self._db_path}")
+        
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO keys (key) VALUES (?)",
+                ((json.dumps(item, ensure_ascii=False),) for item in self._memory)
+            )
+        self._memory.clear()
+    
+    def __len__(self) -> int:
+        if self._conn is None:
+            return len(self._memory)
+        self._spill()
+        return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+    
+    def __iter__(self) -> Iterator[tuple]:
+        for batch in self.batches():
+            yield from batch
+    
+    def batches(self, size: int = 10000) -> Iterator[List[tuple]]:
+        """Itera sobre o conjunto em lotes de até size tuplas"""
+        if self._conn is None:
+            items = list(self._memory)
+            for start in range(0, len(items), size):
+                yield items[start:start + size]
+            return
+        
+        self._spill()
+        cursor = self._conn.execute("SELECT key FROM keys")
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield [tuple(json.loads(row[0])) for row in rows]
+    
+    def close(self):
+        """Descarta o conjunto e remove o arquivo temporário"""
+        self._memory.clear()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            try:
+                os.remove(self._db_path)
+            except OSError:
+                pass
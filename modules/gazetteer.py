@@ -0,0 +1,181 @@
+"""
+Gazetteer de municípios: centroide por código IBGE e por nome + UF
+"""
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+import pandas as pd
+
+from .address_normalizer import fold_accents
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class MunicipalityGazetteer:
+    """
+    Centroides dos ~5.570 municípios consultados sem rede
+    
+    A tabela (código IBGE, nome, UF, latitude, longitude) fica num SQLite
+    próprio e é importada de um CSV público, como o municipios.csv do
+    projeto kelvins/municipios-brasileiros ou uma exportação do IBGE. Por ser
+    pequena, é carregada inteira em dicionários na inicialização: lookup não
+    toca o disco e pode ser chamado de várias threads.
+    
+    Nomes são comparados sem acentos, maiúsculas, hífens e apóstrofos
+    ("SANTA BARBARA D OESTE" encontra "Santa Bárbara d'Oeste"); o código
+    IBGE é aceito com 7 dígitos ou com os 6 sem o dígito verificador.
+    """
+    
+    # Código IBGE da UF (dois primeiros dígitos do código do município) -> sigla
+    UF_CODES = {
+        '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP', '17': 'TO',
+        '21': 'MA', '22': 'PI', '23': 'CE', '24': 'RN', '25': 'PB', '26': 'PE', '27': 'AL',
+        '28': 'SE', '29': 'BA', '31': 'MG', '32': 'ES', '33': 'RJ', '35': 'SP', '41': 'PR',
+        '42': 'SC', '43': 'RS', '50': 'MS', '51': 'MT', '52': 'GO', '53': 'DF'
+    }
+    
+    # Nomes aceitos para cada campo no arquivo importado (comparados em minúsculas)
+    COLUMN_ALIASES = {
+        'cd_ibge': ['codigo_ibge', 'cd_ibge', 'cod_ibge', 'ibge', 'cd_municipio', 'cd_mun', 'codigo'],
+        'nome': ['nome', 'nm_municipio', 'municipio', 'nome_municipio', 'nm_mun', 'cidade'],
+        'uf': ['uf', 'sigla_uf', 'nm_uf', 'estado'],
+        'latitude': ['latitude', 'lat'],
+        'longitude': ['longitude', 'lon', 'lng']
+    }
+    
+    def __init__(self, db_path: str = "municipios.db"):
+        """
+        Inicializa o gazetteer e carrega a tabela em memória
+        
+        Args:
+            db_path: Caminho do banco SQLite (criado vazio se não existir)
+        """
+        self.db_path = Path(db_path)
+        self._by_code: Dict[str, Tuple[float, float]] = {}
+        self._by_name: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._by_name_any_uf: Dict[str, Optional[Tuple[float, float]]] = {}
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS municipios (
+                    cd_ibge TEXT PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    uf TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL
+                )
+            """)
+        self._load()
+    
+    @staticmethod
+    def name_key(name: str) -> str:
+        """Forma do nome usada na comparação (sem acentos, pontuação e maiúsculas)"""
+        text = fold_accents(str(name or '')).casefold()
+        return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+    
+    @staticmethod
+    def _clean_code(code) -> str:
+        """Dígitos do código IBGE ('3550308.0' -> '3550308')"""
+        text = re.sub(r'\.0+$', '', str(code or '').strip())
+        return re.sub(r'\D', '', text)
+    
+    def _load(self):
+        """Carrega a tabela nos dicionários de consulta"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT cd_ibge, nome, uf, latitude, longitude FROM municipios").fetchall()
+        
+        by_code, by_name, by_name_any_uf = {}, {}, {}
+        for code, name, uf, lat, lon in rows:
+            coords = (lat, lon)
+            by_code[code] = coords
+            by_code[code[:6]] = coords
+            key = self.name_key(name)
+            by_name[(key, uf)] = coords
+            # Nome sem UF só resolve quando é único no país
+            by_name_any_uf[key] = coords if key not in by_name_any_uf else None
+        
+        self._by_code, self._by_name, self._by_name_any_uf = by_code, by_name, by_name_any_uf
+        logger.info(f"Gazetteer de municípios: {len(rows)} municípios carregados de {self.db_path}")
+    
+    def __len__(self) -> int:
+        return len(self._by_name)
+    
+    def lookup(self, name: str = "", uf: str = "", code: str = "") -> Optional[Tuple[float, float]]:
+        """
+        Centroide do município
+        
+        Args:
+            name: Nome do município (com ou sem acentos)
+            uf: Sigla da UF
+            code: Código IBGE (CD_MUNICIPIO), usado antes do nome quando presente
+            
+        Returns:
+            Tupla (latitude, longitude) ou None se o município não estiver na tabela
+        """
+        code = self._clean_code(code)
+        if code in self._by_code:
+            return self._by_code[code]
+        
+        key = self.name_key(name)
+        if not key:
+            return None
+        uf = str(uf or '').strip().upper()
+        if uf:
+            return self._by_name.get((key, uf))
+        return self._by_name_any_uf.get(key)
+    
+    @classmethod
+    def _map_columns(cls, columns) -> Dict[str, str]:
+        """Mapeia as colunas do arquivo para os campos da tabela ({coluna: campo})"""
+        by_name = {str(col).strip().lower(): col for col in columns}
+        mapping = {}
+        for field, aliases in cls.COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in by_name and by_name[alias] not in mapping:
+                    mapping[by_name[alias]] = field
+                    break
+        return mapping
+    
+    def import_csv(self, file_path: str, encoding: str = 'utf-8', sep: Optional[str] = None) -> int:
+        """
+        Importa (ou atualiza) municípios de um CSV
+        
+        O arquivo precisa de código IBGE, nome, latitude e longitude; sem
+        coluna de UF, a sigla vem dos dois primeiros dígitos do código.
+        
+        Args:
+            file_path: Caminho do CSV
+            encoding: Encoding do arquivo
+            sep: Delimitador (detectado pelo pandas se None)
+            
+        Returns:
+            Quantidade de municípios gravados
+        """
+        df = pd.read_csv(file_path, sep=sep, engine='python' if sep is None else 'c',
+                         encoding=encoding, dtype=str, keep_default_na=False)
+        mapping = self._map_columns(df.columns)
+        missing = {'cd_ibge', 'nome', 'latitude', 'longitude'} - set(mapping.values())
+        if missing:
+            raise ValueError(f"Colunas ausentes em {Path(file_path).name}: {sorted(missing)}")
+        df = df[list(mapping)].rename(columns=mapping)
+        
+        df['cd_ibge'] = df['cd_ibge'].map(self._clean_code)
+        if 'uf' not in df.columns:
+            df['uf'] = df['cd_ibge'].str[:2].map(self.UF_CODES)
+        df['uf'] = df['uf'].str.strip().str.upper()
+        for col in ('latitude', 'longitude'):
+            df[col] = pd.to_numeric(df[col].str.replace(',', '.', regex=False), errors='coerce')
+        df = df.dropna(subset=['uf', 'latitude', 'longitude'])
+        df = df[df['cd_ibge'].str.len().eq(7) & df['nome'].str.strip().ne('')]
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO municipios (cd_ibge, nome, uf, latitude, longitude) VALUES (?, ?, ?, ?, ?)",
+                df[['cd_ibge', 'nome', 'uf', 'latitude', 'longitude']].itertuples(index=False, name=None)
+            )
+        self._load()
+        logger.info(f"{len(df)} municípios importados de {file_path}")
+        return len(df)
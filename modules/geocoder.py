@@ -1,15 +1,21 @@
 """
 Geocoder para buscar latitude e longitude usando Nominatim (OpenStreetMap)
 """
+import asyncio
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import subprocess
-import json as json_lib
-import time
+import threading
 from typing import Optional, Tuple, Dict
 import logging
 
+from .cache_manager import CacheManager
+from .rate_limiter import TokenBucket
+from .retry_policy import RetryPolicy, RetryExhaustedError, DeadlineExceededError
+from .concurrency_limiter import AdaptiveConcurrencyLimiter
+from .lookup_budget import LookupBudget
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .single_flight import SingleFlight
+from .transport import HTTPTransport
+
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logger.setLevel(logging.INFO)
@@ -18,67 +24,131 @@ class Geocoder:
     """Busca coordenadas usando Nominatim (OpenStreetMap)"""
     
     BASE_URL = "https://nominatim.openstreetmap.org/search"
-    TIMEOUT = 20  # Aumentado para 20s
+    TIMEOUT = 15  # Timeout de cada tentativa
     RETRY_ATTEMPTS = 3
-    RETRY_DELAY = 3  # Nominatim é mais restritivo
+    RETRY_DELAY = 3  # Backoff base; Nominatim é mais restritivo
+    DEADLINE = 45  # Tempo máximo de uma consulta, somando tentativas e backoff
+    CACHE_KIND = 'geocode'  # Tipo das chaves nas tabelas de pendentes e do cache negativo
     
-    def __init__(self, rate_limit_delay: float = 1.5, app_name: str = "GeoGrafi"):
+    def __init__(self, rate_limit_delay: float = 1.5, app_name: str = "GeoGrafi",
+                 cache_manager: Optional[CacheManager] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_rate: Optional[float] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[HTTPTransport] = None):
         """
         Inicializa o geocoder
         
         Args:
             rate_limit_delay: Delay mínimo entre requisições (Nominatim: 1.5s recomendado)
             app_name: Nome da aplicação para User-Agent
+            cache_manager: Cache SQLite consultado antes da API (opcional)
+            rate_limiter: Limitador compartilhado (criado a partir de rate_limit_delay se None)
+            max_rate: Teto da taxa adaptativa em req/s. Padrão: a taxa de rate_limit_delay,
+                pois a política do Nominatim público não permite subir; informe um valor
+                maior para instâncias próprias
+            concurrency_limiter: Limite adaptativo de requisições simultâneas (opcional)
+            retry_policy: Política de retry do Nominatim (padrão a partir de RETRY_ATTEMPTS,
+                RETRY_DELAY, TIMEOUT e DEADLINE)
+            circuit_breaker: Disjuntor do Nominatim (um por host se None)
+            transport: Transporte HTTP compartilhado (um próprio se None). Se o
+                host do Nominatim já estiver registrado nele, os limites, o retry e
+                o disjuntor registrados valem no lugar dos argumentos acima
         """
         self.rate_limit_delay = rate_limit_delay
-        self.last_request_time = 0
+        self._cache_lock = threading.Lock()
         self.app_name = app_name
         self.cache = {}
+        self.cache_manager = cache_manager
+        self._prefetched = {}
+        self.inflight = SingleFlight()
         self.headers = {
             'User-Agent': f'{app_name}/1.0 (GeoGrafi Address Geocoding Application)',
             'Accept': 'application/json',
             'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
         }
         
-        # Cria session com retry automático
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(
-            max_retries=retry_strategy,
-            pool_connections=10,
-            pool_maxsize=20
+        # Pool de conexões, rate limit, concorrência, retry e disjuntor ficam no transporte
+        self.transport = transport or HTTPTransport()
+        self.upstream = self.transport.register(
+            self.BASE_URL,
+            rate_limiter=rate_limiter or TokenBucket.from_interval(rate_limit_delay),
+            max_rate=max_rate,
+            concurrency_limiter=concurrency_limiter or AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=8),
+            retry_policy=retry_policy or RetryPolicy(
+                max_attempts=self.RETRY_ATTEMPTS, base_delay=self.RETRY_DELAY,
+                timeout=self.TIMEOUT, deadline=self.DEADLINE
+            ),
+            circuit_breaker=circuit_breaker,
+            headers=self.headers
         )
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        self.session.headers.update(self.headers)
-    
-    def _apply_rate_limit(self):
-        """Aplica rate limiting"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_request_time = time.time()
-    
-    def _get_via_curl(self, url: str) -> Optional[list]:
-        """Fallback usando curl via subprocess"""
-        try:
-            cmd = [
-                'curl', '-s', '--connect-timeout', '10', '--max-time', '30',
-                '-H', f'User-Agent: {self.app_name}/1.0',
-                '-H', 'Accept: application/json',
-                url
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=35)
-            if result.returncode == 0 and result.stdout:
-                return json_lib.loads(result.stdout)
-        except Exception as e:
-            logger.warning(f"Curl fallback falhou: {e}")
-        return None
+        self.rate_limiter = self.upstream.rate_limiter
+        self.rate_controller = self.upstream.rate_controller
+        self.concurrency_limiter = self.upstream.concurrency_limiter
+        self.retry_policy = self.upstream.retry_policy
+        self.circuit_breaker = self.upstream.circuit_breaker
+    
+    def _request(self, params: Dict, description: str = "") -> requests.Response:
+        """
+        GET no Nominatim pelo transporte (rate limit, concorrência, retry e disjuntor do host)
+        
+        Returns:
+            Resposta final (status não retentável)
+            
+        Raises:
+            CircuitOpenError: Circuito aberto; a consulta não foi feita
+            RetryExhaustedError: Timeouts ou 429/5xx até a política desistir
+        """
+        return self.transport.get(self.BASE_URL, params=params, description=description or str(params))
+    
+    @staticmethod
+    def build_cep_query(cep: str, city: str = "", state: str = "BR") -> str:
+        """Monta a query de busca por CEP enviada ao Nominatim"""
+        cep_clean = ''.join(filter(str.isdigit, str(cep)))
+        if city:
+            return f"{cep_clean}, {city}, {state}"
+        return f"{cep_clean}, {state}"
+    
+    @staticmethod
+    def build_address_query(street: str, number: str = "", neighborhood: str = "",
+                            city: str = "", state: str = "BR") -> str:
+        """Monta a query de busca por endereço enviada ao Nominatim"""
+        parts = [street]
+        if number:
+            parts.append(str(number))
+        if neighborhood:
+            parts.append(neighborhood)
+        if city:
+            parts.append(city)
+        if state:
+            parts.append(state)
+        return ", ".join(parts)
+    
+    def prefetch(self, queries) -> Dict[str, Tuple[float, float]]:
+        """
+        Consulta várias queries no cache SQLite de uma só vez
+        
+        O resultado (inclusive as ausências) fica guardado para que
+        _search não repita a consulta ao SQLite chave a chave; queries do
+        cache negativo ficam marcadas com False.
+        
+        Args:
+            queries: Queries montadas com build_address_query/build_cep_query
+            
+        Returns:
+            Dict {query: (latitude, longitude)} com as encontradas no cache
+        """
+        pending = {q for q in queries if q and len(q.strip()) >= 3}
+        if not self.cache_manager or not pending:
+            return {}
+        
+        found = self.cache_manager.get_coordinates_bulk(pending)
+        missing = self.cache_manager.get_negative_bulk(self.CACHE_KIND, pending - found.keys())
+        with self._cache_lock:
+            for query in pending:
+                self._prefetched[query] = False if query in missing else found.get(query)
+        return found
     
     def search_by_cep(self, cep: str, city: str = "", state: str = "BR") -> Optional[Tuple[float, float]]:
         """
@@ -96,18 +166,7 @@ class Geocoder:
         
         # Cria chave de cache
         cache_key = f"cep:{cep_clean}:{city}:{state}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
-        # Monta query
-        if city:
-            query = f"{cep_clean}, {city}, {state}"
-        else:
-            query = f"{cep_clean}, {state}"
-        
-        result = self._search(query)
-        self.cache[cache_key] = result
-        return result
+        return self._lookup(cache_key, self.build_cep_query(cep_clean, city, state))
     
     def search_by_address(self, street: str, number: str = "", neighborhood: str = "", 
                          city: str = "", state: str = "BR") -> Optional[Tuple[float, float]]:
@@ -124,34 +183,85 @@ class Geocoder:
         Returns:
             Tupla (latitude, longitude) ou None
         """
-        # Constrói query
-        parts = [street]
-        if number:
-            parts.append(str(number))
-        if neighborhood:
-            parts.append(neighborhood)
-        if city:
-            parts.append(city)
-        if state:
-            parts.append(state)
-        
-        query = ", ".join(parts)
-        
-        # Cria chave de cache
-        cache_key = f"address:{query}"
+        query = self.build_address_query(street, number, neighborhood, city, state)
+        # Geocodes de logradouro alimentam o centroide do bairro no cache
+        bairro = (neighborhood, city, state) if street and neighborhood and city and state else None
+        return self._lookup(f"address:{query}", query, bairro)
+    
+    def _lookup(self, cache_key: str, query: str,
+                bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
+        """Consulta query (cache em memória, SQLite e Nominatim) e memoriza o resultado"""
         if cache_key in self.cache:
             return self.cache[cache_key]
         
-        result = self._search(query)
-        self.cache[cache_key] = result
+        try:
+            result = self._search(query, bairro)
+        except (CircuitOpenError, RetryExhaustedError):
+            # Query já na fila de pendentes (_fetch): a linha fica como parcial
+            budget = LookupBudget.current()
+            if budget is not None:
+                budget.defer()
+            return None
+        
+        budget = LookupBudget.current()
+        if result is None and budget is not None and budget.cut:
+            # A consulta pode ter sido adiada: a chave fica livre para o refinamento
+            return None
+        with self._cache_lock:
+            self.cache[cache_key] = result
         return result
     
-    def _search(self, query: str) -> Optional[Tuple[float, float]]:
+    def _defer(self, query: str, error: Exception, bairro: Optional[Tuple[str, str, str]] = None):
+        """Guarda a query (e o bairro) na fila de pendentes do cache para ser refeita por drain_pending"""
+        if self.cache_manager:
+            self.cache_manager.add_pending_async(self.CACHE_KIND, query, str(error), bairro)
+    
+    def drain_pending(self, limit: Optional[int] = None) -> int:
+        """
+        Refaz as queries adiadas (circuito aberto ou falha transitória)
+        
+        Não roda com o circuito aberto. No meio-aberto, a primeira chave que
+        vai à rede é a consulta de teste: se responder, o circuito fecha e a
+        fila continua; se falhar, ele reabre e a drenagem para. As coordenadas
+        encontradas vão para o cache SQLite e, nas buscas por logradouro, para
+        o centroide do bairro guardado com a pendência. Queries que
+        falham de novo continuam na fila com o novo motivo.
+        
+        Args:
+            limit: Máximo de queries refeitas nesta chamada (None = todas)
+            
+        Returns:
+            Quantidade de queries retiradas da fila
+        """
+        if not self.cache_manager or self.circuit_breaker.state == CircuitBreaker.OPEN:
+            return 0
+        
+        self.cache_manager.flush()
+        done = []
+        try:
+            for query, bairro in self.cache_manager.get_pending_entries(self.CACHE_KIND, limit):
+                try:
+                    self._search(query, tuple(bairro) if bairro else None)
+                except CircuitOpenError:
+                    break
+                except RetryExhaustedError:
+                    continue
+                done.append(query)
+        finally:
+            self.cache_manager.remove_pending(self.CACHE_KIND, done)
+        
+        if done:
+            logger.info(f"{len(done)} consulta(s) de geocoding pendente(s) refeita(s)")
+        return len(done)
+    
+    def _search(self, query: str, bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
         """
         Realiza busca genérica no Nominatim
         
         Args:
             query: String de busca
+            bairro: (bairro, município, UF) de uma busca por logradouro, cujo
+                resultado vindo da rede entra no centroide do bairro
             
         Returns:
             Tupla (latitude, longitude) ou None
@@ -159,70 +269,271 @@ class Geocoder:
         if not query or len(query.strip()) < 3:
             return None
         
-        # Tenta várias vezes com retry
-        for attempt in range(self.RETRY_ATTEMPTS):
-            try:
-                self._apply_rate_limit()
-                
-                params = {
-                    'q': query,
-                    'format': 'json',
-                    'limit': 1
-                }
-                
-                # Usa session para melhor performance
-                try:
-                    response = self.session.get(
-                        self.BASE_URL,
-                        params=params,
-                        timeout=(10, 30),  # (connect timeout, read timeout)
-                        allow_redirects=True
-                    )
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as conn_err:
-                    # Fallback para requests direto
-                    logger.warning(f"Session falhou, tentando requests direto: {type(conn_err).__name__}")
-                    response = requests.get(
-                        self.BASE_URL,
-                        params=params,
-                        headers=self.headers,
-                        timeout=(10, 30),
-                        allow_redirects=True
-                    )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and len(data) > 0:
-                        result = (float(data[0]['lat']), float(data[0]['lon']))
-                        logger.info(f"Encontrado: {query} -> {result}")
-                        return result
-                    else:
-                        logger.warning(f"Nenhum resultado para: {query}")
-                        return None
-                else:
-                    logger.warning(f"Status {response.status_code} para: {query}")
-                    if attempt < self.RETRY_ATTEMPTS - 1:
-                        time.sleep(self.RETRY_DELAY)
-                        continue
-                    
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Erro ao buscar {query}: {str(e)[:100]}")
-                
-                # Tenta curl como último recurso na primeira tentativa
-                if attempt == 0:
-                    logger.info(f"🔄 Tentando curl fallback para: {query}")
-                    # Monta URL completa com parâmetros
-                    from urllib.parse import urlencode
-                    params_str = urlencode({'q': query, 'format': 'json', 'limit': 1})
-                    full_url = f"{self.BASE_URL}?{params_str}"
-                    
-                    data = self._get_via_curl(full_url)
-                    if data and len(data) > 0:
-                        result = (float(data[0]['lat']), float(data[0]['lon']))
-                        logger.info(f"✅ Coordenadas obtidas via curl: {result}")
-                        return result
-                
-                if attempt < self.RETRY_ATTEMPTS - 1:
-                    time.sleep(self.RETRY_DELAY)
-                    continue
+        # Verifica cache SQLite antes de ir para a rede
+        if self.cache_manager:
+            with self._cache_lock:
+                prefetched = query in self._prefetched
+                cached = self._prefetched.pop(query, None)
+            if not prefetched:
+                cached = self.cache_manager.get_coordinates(query)
+                if not cached and self.cache_manager.is_negative(self.CACHE_KIND, query):
+                    cached = False
+            if cached is False:
+                # "Nenhum resultado" ainda dentro da validade do cache negativo
+                return None
+            if cached:
+                return cached
+        
+        # Sem orçamento de tempo/consultas (da linha ou do chunk) a consulta é adiada
+        budget = LookupBudget.current()
+        if budget is not None and not budget.spend():
+            logger.info(f"Orçamento de consultas esgotado; adiando: {query}")
+            return None
+        
+        # Chamadas simultâneas à mesma query aguardam a mesma requisição
+        return self.inflight.do(query, self._fetch, query, bairro)
+    
+    def _fetch(self, query: str, bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
+        """Consulta o Nominatim e guarda o resultado no cache SQLite (ou a query na fila de pendentes)"""
+        try:
+            result = self._search_remote(query)
+        except DeadlineExceededError:
+            # Prazo da linha esgotado antes da tentativa: adiada sem ir para a fila
+            raise
+        except (CircuitOpenError, RetryExhaustedError) as e:
+            self._defer(query, e, bairro)
+            raise
+        if result and self.cache_manager:
+            self.cache_manager.save_coordinates_async(query, result[0], result[1])
+            if bairro:
+                self.cache_manager.add_bairro_point_async(*bairro, result[0], result[1])
+        return result
+    
+    def _search_remote(self, query: str) -> Optional[Tuple[float, float]]:
+        """Consulta o Nominatim seguindo a política de retry"""
+        response = self._request({'q': query, 'format': 'json', 'limit': 1}, query)
+        if response.status_code != 200:
+            logger.warning(f"Status {response.status_code} para: {query}")
+            return None
+        
+        try:
+            data = response.json()
+            if data and len(data) > 0:
+                result = (float(data[0]['lat']), float(data[0]['lon']))
+                logger.info(f"Encontrado: {query} -> {result}")
+                return result
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Resposta inválida do Nominatim para {query}: {str(e)[:100]}")
+            return None
+        
+        logger.warning(f"Nenhum resultado para: {query}")
+        if self.cache_manager:
+            self.cache_manager.add_negative_async(self.CACHE_KIND, query)
+        return None
+
+
+class AsyncGeocoder:
+    """
+    Busca coordenadas no Nominatim com asyncio/aiohttp
+    
+    Mesma semântica de Geocoder.search_by_address/search_by_cep, mas todas as
+    tarefas aguardam tokens de um único TokenBucket com asyncio.sleep, então
+    o event loop continua livre (consultas ao ViaCEP, leitura do CSV...)
+    enquanto as requisições ao Nominatim esperam a vez. Com o mesmo transporte
+    de um Geocoder síncrono os dois respeitam um só limite.
+    """
+    
+    BASE_URL = Geocoder.BASE_URL
+    TIMEOUT = Geocoder.TIMEOUT
+    RETRY_ATTEMPTS = Geocoder.RETRY_ATTEMPTS
+    RETRY_DELAY = Geocoder.RETRY_DELAY
+    DEADLINE = Geocoder.DEADLINE
+    CACHE_KIND = Geocoder.CACHE_KIND
+    
+    build_cep_query = staticmethod(Geocoder.build_cep_query)
+    build_address_query = staticmethod(Geocoder.build_address_query)
+    
+    def __init__(self, rate_limit_delay: float = 1.5, app_name: str = "GeoGrafi",
+                 cache_manager: Optional[CacheManager] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_rate: Optional[float] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[HTTPTransport] = None):
+        """
+        Inicializa o geocoder assíncrono
+        
+        Args:
+            rate_limit_delay: Delay mínimo entre requisições (Nominatim: 1.5s recomendado)
+            app_name: Nome da aplicação para User-Agent
+            cache_manager: Cache SQLite consultado antes da API (opcional)
+            rate_limiter: Limitador compartilhado (criado a partir de rate_limit_delay se None)
+            max_rate: Teto da taxa adaptativa em req/s (padrão: a taxa de rate_limit_delay)
+            concurrency_limiter: Limite adaptativo de requisições simultâneas (opcional)
+            retry_policy: Política de retry do Nominatim (padrão a partir de RETRY_ATTEMPTS,
+                RETRY_DELAY, TIMEOUT e DEADLINE)
+            circuit_breaker: Disjuntor do Nominatim (pode ser o mesmo do Geocoder)
+            transport: Transporte HTTP compartilhado (um próprio se None); com o
+                mesmo transporte do Geocoder os dois dividem o estado do host
+        """
+        self.rate_limit_delay = rate_limit_delay
+        self.app_name = app_name
+        self.cache = {}
+        self.cache_manager = cache_manager
+        self.inflight = SingleFlight()
+        self.headers = {
+            'User-Agent': f'{app_name}/1.0 (GeoGrafi Address Geocoding Application)',
+            'Accept': 'application/json',
+            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
+        }
+        self._owns_transport = transport is None
+        self.transport = transport or HTTPTransport()
+        self.upstream = self.transport.register(
+            self.BASE_URL,
+            rate_limiter=rate_limiter or TokenBucket.from_interval(rate_limit_delay),
+            max_rate=max_rate,
+            concurrency_limiter=concurrency_limiter or AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=8),
+            retry_policy=retry_policy or RetryPolicy(
+                max_attempts=self.RETRY_ATTEMPTS, base_delay=self.RETRY_DELAY,
+                timeout=self.TIMEOUT, deadline=self.DEADLINE
+            ),
+            circuit_breaker=circuit_breaker,
+            headers=self.headers
+        )
+        self.rate_limiter = self.upstream.rate_limiter
+        self.rate_controller = self.upstream.rate_controller
+        self.concurrency_limiter = self.upstream.concurrency_limiter
+        self.retry_policy = self.upstream.retry_policy
+        self.circuit_breaker = self.upstream.circuit_breaker
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Fecha a ClientSession do transporte (se for próprio) e aguarda gravações pendentes no cache"""
+        if self._owns_transport:
+            await self.transport.close_async()
+        if self.cache_manager:
+            await asyncio.to_thread(self.cache_manager.flush)
+    
+    async def search_by_cep(self, cep: str, city: str = "", state: str = "BR") -> Optional[Tuple[float, float]]:
+        """
+        Busca coordenadas usando CEP
+        
+        Args:
+            cep: CEP (com ou sem formatação)
+            city: Cidade (opcional)
+            state: Estado/País
+            
+        Returns:
+            Tupla (latitude, longitude) ou None
+        """
+        cep_clean = ''.join(filter(str.isdigit, str(cep)))
+        
+        cache_key = f"cep:{cep_clean}:{city}:{state}"
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+        
+        return await self._lookup(cache_key, self.build_cep_query(cep_clean, city, state))
+    
+    async def search_by_address(self, street: str, number: str = "", neighborhood: str = "",
+                                city: str = "", state: str = "BR") -> Optional[Tuple[float, float]]:
+        """
+        Busca coordenadas usando endereço completo
+        
+        Args:
+            street: Rua/Logradouro
+            number: Número
+            neighborhood: Bairro
+            city: Cidade
+            state: Estado
+            
+        Returns:
+            Tupla (latitude, longitude) ou None
+        """
+        query = self.build_address_query(street, number, neighborhood, city, state)
+        bairro = (neighborhood, city, state) if street and neighborhood and city and state else None
+        
+        return await self._lookup(f"address:{query}", query, bairro)
+    
+    async def _lookup(self, cache_key: str, query: str,
+                      bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
+        """Consulta query (cache em memória, SQLite e Nominatim) e memoriza o resultado"""
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+        
+        try:
+            result = await self._search(query, bairro)
+        except (CircuitOpenError, RetryExhaustedError):
+            budget = LookupBudget.current()
+            if budget is not None:
+                budget.defer()
+            return None
+        
+        budget = LookupBudget.current()
+        if result is None and budget is not None and budget.cut:
+            return None
+        self.cache[cache_key] = result
+        return result
+    
+    async def _search(self, query: str,
+                      bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
+        """Consulta o cache SQLite e, se necessário, o Nominatim"""
+        if not query or len(query.strip()) < 3:
+            return None
+        
+        if self.cache_manager:
+            cached = await asyncio.to_thread(self.cache_manager.get_coordinates, query)
+            if cached:
+                return cached
+            if await asyncio.to_thread(self.cache_manager.is_negative, self.CACHE_KIND, query):
+                return None
+        
+        budget = LookupBudget.current()
+        if budget is not None and not budget.spend():
+            logger.info(f"Orçamento de consultas esgotado; adiando: {query}")
+            return None
+        
+        return await self.inflight.do_async(query, self._fetch, query, bairro)
+    
+    async def _fetch(self, query: str, bairro: Optional[Tuple[str, str, str]] = None) -> Optional[Tuple[float, float]]:
+        """Consulta o Nominatim (uma tarefa por query via inflight) e guarda o resultado ou a pendência"""
+        try:
+            result = await self._search_remote(query)
+        except DeadlineExceededError:
+            # Prazo da linha esgotado antes da tentativa: adiada sem ir para a fila
+            raise
+        except (CircuitOpenError, RetryExhaustedError) as e:
+            if self.cache_manager:
+                self.cache_manager.add_pending_async(self.CACHE_KIND, query, str(e), bairro)
+            raise
+        if result and self.cache_manager:
+            self.cache_manager.save_coordinates_async(query, result[0], result[1])
+            if bairro:
+                self.cache_manager.add_bairro_point_async(*bairro, result[0], result[1])
+        return result
+    
+    async def _search_remote(self, query: str) -> Optional[Tuple[float, float]]:
+        """Consulta o Nominatim pelo transporte (backoff com asyncio.sleep)"""
+        params = {'q': query, 'format': 'json', 'limit': 1}
+        status, data = await self.transport.get_async(self.BASE_URL, params=params, description=query)
+        if status != 200:
+            logger.warning(f"Status {status} para: {query}")
+            return None
+        
+        try:
+            if data and len(data) > 0:
+                result = (float(data[0]['lat']), float(data[0]['lon']))
+                logger.info(f"Encontrado: {query} -> {result}")
+                return result
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Resposta inválida do Nominatim para {query}: {str(e)[:100]}")
+            return None
         
+        logger.warning(f"Nenhum resultado para: {query}")
+        if self.cache_manager:
+            self.cache_manager.add_negative_async(self.CACHE_KIND, query)
         return None
@@ -0,0 +1,105 @@
+"""
+Orçamento de tempo e de consultas à rede por linha e por chunk
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+_current_budget = contextvars.ContextVar('geografi_lookup_budget', default=None)
+
+class LookupBudget:
+    """
+    Limite de tempo e de consultas remotas para resolver uma linha ou um chunk
+    
+    Um orçamento de linha pode ter como pai o orçamento do chunk: cada
+    consulta é debitada nos dois e a linha se esgota quando qualquer um deles
+    acaba. O orçamento ativo (activate) fica num ContextVar, então o Geocoder
+    consulta spend() antes de ir à rede e a RetryPolicy limita o prazo das
+    tentativas ao tempo restante, sem que o orçamento precise ser repassado
+    por todas as chamadas. Vale por thread e por tarefa asyncio.
+    """
+    
+    def __init__(self, seconds: Optional[float] = None, calls: Optional[int] = None,
+                 parent: Optional["LookupBudget"] = None):
+        """
+        Inicializa o orçamento
+        
+        Args:
+            seconds: Tempo máximo em segundos a partir da criação (None = sem limite)
+            calls: Consultas remotas permitidas (None = sem limite)
+            parent: Orçamento que também é debitado (ex.: o do chunk)
+        """
+        self.seconds = seconds
+        self.calls = calls
+        self.parent = parent
+        self.used_calls = 0
+        self.deferred = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def current() -> Optional["LookupBudget"]:
+        """Orçamento ativo no contexto atual (None se não houver)"""
+        return _current_budget.get()
+    
+    @contextmanager
+    def activate(self):
+        """Torna este o orçamento ativo durante o bloco"""
+        token = _current_budget.set(self)
+        try:
+            yield self
+        finally:
+            _current_budget.reset(token)
+    
+    def remaining_time(self) -> Optional[float]:
+        """Segundos restantes, considerando o pai (None = sem limite de tempo)"""
+        remaining = None
+        if self.seconds is not None:
+            remaining = self.seconds - (time.monotonic() - self._start)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining_time()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+    
+    def _own_exhausted(self) -> bool:
+        if self.seconds is not None and time.monotonic() - self._start >= self.seconds:
+            return True
+        return self.calls is not None and self.used_calls >= self.calls
+    
+    @property
+    def exhausted(self) -> bool:
+        """Indica se o tempo ou as consultas deste orçamento (ou do pai) acabaram"""
+        return self._own_exhausted() or (self.parent is not None and self.parent.exhausted)
+    
+    @property
+    def cut(self) -> bool:
+        """Indica se alguma consulta foi adiada ou o orçamento acabou (resultado possivelmente parcial)"""
+        return self.deferred > 0 or self.exhausted
+    
+    def defer(self):
+        """Registra uma consulta adiada por outro motivo (ex.: circuito aberto)"""
+        with self._lock:
+            self.deferred += 1
+    
+    def spend(self) -> bool:
+        """
+        Debita uma consulta remota
+        
+        Returns:
+            True se a consulta pode ser feita; False se o orçamento acabou
+            (a consulta deve ser adiada)
+        """
+        with self._lock:
+            if self._own_exhausted() or (self.parent is not None and not self.parent.spend()):
+                self.deferred += 1
+                return False
+            self.used_calls += 1
+            return True
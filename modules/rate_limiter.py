@@ -0,0 +1,461 @@
+"""
+Limitadores de taxa compartilhados entre threads e tarefas asyncio
+"""
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class TokenBucket:
+    """
+    Token bucket com reserva de horário
+    
+    Cada chamada retira um token sob um lock curto; se o balde estiver vazio
+    o saldo fica negativo e a chamada recebe o tempo que precisa esperar.
+    Assim várias threads e tarefas asyncio compartilham o mesmo balde e as
+    requisições saem espaçadas exatamente pela taxa configurada, sem que a
+    espera aconteça dentro do lock (nem bloqueie o event loop, no caso
+    assíncrono). Uma pausa (pause) descarta a fila de reservas e quem estava
+    esperando refaz a reserva depois dela.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Inicializa o balde
+        
+        Args:
+            rate: Tokens por segundo (<= 0 desativa o limite)
+            capacity: Quantidade máxima de tokens acumulados (rajada permitida)
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._resume_at = 0.0
+        self._epoch = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_interval(cls, interval: float, capacity: float = 1.0) -> "TokenBucket":
+        """Cria um balde a partir do intervalo mínimo entre requisições (em segundos)"""
+        return cls(1.0 / interval if interval > 0 else 0.0, capacity)
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Reserva tokens e retorna quantos segundos o chamador deve esperar
+        
+        Args:
+            tokens: Quantidade de tokens consumidos pela requisição
+            
+        Returns:
+            Tempo de espera em segundos (0 se havia token disponível)
+        """
+        if self.rate <= 0:
+            return max(0.0, self._resume_at - time.monotonic())
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    def increase_rate(self, step: float, max_rate: float) -> float:
+        """Soma step à taxa, sem passar de max_rate; retorna a nova taxa"""
+        return self._adjust_rate(lambda rate: min(max_rate, rate + step) if rate < max_rate else rate)
+    
+    def decrease_rate(self, factor: float, min_rate: float) -> float:
+        """Multiplica a taxa por factor, sem cair abaixo de min_rate; retorna a nova taxa"""
+        return self._adjust_rate(lambda rate: max(min_rate, rate * factor) if rate > min_rate else rate)
+    
+    def _adjust_rate(self, adjust: Callable[[float], float]) -> float:
+        """Aplica adjust à taxa atual de forma atômica (sem limite de taxa, nada muda)"""
+        with self._lock:
+            if self.rate > 0:
+                self.rate = adjust(self.rate)
+            return self.rate
+    
+    def pause(self, seconds: float):
+        """
+        Adia a próxima reserva em seconds (ex.: Retry-After)
+        
+        A fila de reservas já feitas é descartada: quem está esperando
+        refaz a reserva ao acordar, já na taxa atual.
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._resume_at = max(self._resume_at, now + seconds)
+            if self.rate > 0:
+                self._last = now
+                self._tokens = min(self.capacity, 1.0 - seconds * self.rate)
+            self._epoch += 1
+    
+    async def _reserve_async(self, tokens: float) -> float:
+        return self.reserve(tokens)
+    
+    def acquire(self, tokens: float = 1.0):
+        """Reserva tokens e dorme (time.sleep) até o horário reservado"""
+        while True:
+            epoch = self._epoch
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+            if self._epoch == epoch:
+                return
+    
+    async def acquire_async(self, tokens: float = 1.0):
+        """Reserva tokens e aguarda com asyncio.sleep, sem bloquear o event loop"""
+        while True:
+            epoch = self._epoch
+            wait = await self._reserve_async(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+            if self._epoch == epoch:
+                return
+
+
+class SharedRateLimiter(TokenBucket):
+    """
+    Limitador por host compartilhado entre threads, processos e sessões
+    
+    O próximo horário livre de cada host fica numa linha de um banco SQLite
+    (GCRA: "theoretical arrival time"). Cada reserva lê e avança essa linha
+    numa transação BEGIN IMMEDIATE, que serializa processos diferentes na
+    mesma máquina; a espera acontece fora da transação. Como o estado está
+    em disco, reiniciar a aplicação não zera o limite.
+    
+    A taxa atual (ajustada pelo AdaptiveRateController) fica na mesma linha
+    e é lida dentro da transação da reserva: um 429 visto por um processo
+    reduz a taxa de todos. increase_rate e decrease_rate leem e gravam a
+    taxa numa única transação, então ajustes simultâneos de processos
+    diferentes não se sobrescrevem. Uma taxa sem reservas há mais de
+    RATE_TTL segundos é descartada em favor da taxa configurada.
+    """
+    
+    DEFAULT_DB = Path(tempfile.gettempdir()) / "geografi_rate_limits.db"
+    
+    # Segundos sem reservas depois dos quais a taxa compartilhada volta à configurada
+    RATE_TTL = 300.0
+    
+    def __init__(self, host: str, rate: float, capacity: float = 1.0,
+                 db_path: Optional[str] = None):
+        """
+        Inicializa o limitador
+        
+        Args:
+            host: Host do upstream (ex.: nominatim.openstreetmap.org)
+            rate: Requisições por segundo permitidas para o host (<= 0 desativa)
+            capacity: Rajada permitida (em requisições)
+            db_path: Banco de estado compartilhado (padrão: diretório temporário do sistema)
+        """
+        self.host = host
+        self.db_path = Path(db_path) if db_path else self.DEFAULT_DB
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._shared = False
+        super().__init__(rate, capacity)
+        self.configured_rate = rate
+        self._init_db()
+        self._shared = True
+    
+    @classmethod
+    def for_url(cls, url: str, interval: float, capacity: float = 1.0,
+                db_path: Optional[str] = None) -> "SharedRateLimiter":
+        """Cria o limitador do host de url com intervalo mínimo entre requisições"""
+        rate = 1.0 / interval if interval > 0 else 0.0
+        return cls(urlparse(url).netloc, rate, capacity, db_path)
+    
+    @property
+    def rate(self) -> float:
+        """Taxa atual do host (a última lida ou gravada no estado compartilhado)"""
+        return self._rate
+    
+    @rate.setter
+    def rate(self, value: float):
+        # Valor absoluto; ajustes relativos à taxa atual usam increase_rate/decrease_rate
+        self._rate = value
+        if self._shared and value > 0:
+            self._store_rate(value)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão persistente da thread atual (autocommit; transações explícitas)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Fecha todas as conexões abertas"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _init_db(self):
+        """Cria a tabela de estado dos hosts (e a coluna de taxa em bancos antigos)"""
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                host TEXT PRIMARY KEY,
+                next_slot REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                rate REAL
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(rate_limits)")}
+        if 'rate' not in columns:
+            conn.execute("ALTER TABLE rate_limits ADD COLUMN rate REAL")
+    
+    def _store_rate(self, rate: float):
+        """Grava a taxa ajustada no estado compartilhado do host"""
+        try:
+            now = time.time()
+            self._connect().execute(
+                """
+                INSERT INTO rate_limits (host, next_slot, updated_at, rate) VALUES (?, ?, ?, ?)
+                ON CONFLICT(host) DO UPDATE SET rate = excluded.rate, updated_at = excluded.updated_at
+                """,
+                (self.host, now, now, rate)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Não foi possível gravar a taxa compartilhada de {self.host}: {e}")
+    
+    def _shared_rate(self, row: Optional[tuple], now: float) -> float:
+        """Taxa vigente a partir da linha do host (a configurada se expirou)"""
+        if row and row[2]:
+            return row[2] if now - row[1] < self.RATE_TTL else self.configured_rate
+        return self._rate
+    
+    def _adjust_rate(self, adjust: Callable[[float], float]) -> float:
+        """
+        Aplica adjust à taxa compartilhada do host numa única transação
+        
+        A taxa é lida e gravada dentro de um BEGIN IMMEDIATE, como na
+        reserva; se o valor não muda, nada é gravado.
+        """
+        if self._rate <= 0:
+            return self._rate
+        
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT next_slot, updated_at, rate FROM rate_limits WHERE host = ?", (self.host,)
+            ).fetchone()
+            current = self._shared_rate(row, now)
+            rate = adjust(current)
+            if rate != current:
+                conn.execute(
+                    """
+                    INSERT INTO rate_limits (host, next_slot, updated_at, rate) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(host) DO UPDATE SET rate = excluded.rate, updated_at = excluded.updated_at
+                    """,
+                    (self.host, now, now, rate)
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.warning(f"Não foi possível ajustar a taxa compartilhada de {self.host}: {e}")
+            rate = adjust(self._rate)
+        self._rate = rate
+        return rate
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Reserva tokens no estado compartilhado do host
+        
+        Returns:
+            Tempo de espera em segundos (0 se havia token disponível)
+        """
+        if self._rate <= 0:
+            return super().reserve(tokens)
+        
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT next_slot, updated_at, rate FROM rate_limits WHERE host = ?", (self.host,)
+            ).fetchone()
+            rate = self._rate = self._shared_rate(row, now)
+            next_slot = max(row[0] if row else now, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (host, next_slot, updated_at, rate) VALUES (?, ?, ?, ?)",
+                (self.host, next_slot + tokens / rate, now, rate)
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.warning(f"Limitador compartilhado indisponível para {self.host}, usando local: {e}")
+            return super().reserve(tokens)
+        return max(0.0, next_slot - now - (self.capacity - 1) / rate)
+    
+    def pause(self, seconds: float):
+        """
+        Adia a próxima reserva do host (para todos os processos) em pelo menos seconds
+        
+        As reservas deste processo que estão esperando são refeitas ao acordar;
+        as de outros processos são mantidas, por isso o horário só avança.
+        """
+        if self._rate <= 0:
+            return super().pause(seconds)
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._epoch += 1
+        try:
+            now = time.time()
+            self._connect().execute(
+                """
+                INSERT INTO rate_limits (host, next_slot, updated_at, rate) VALUES (?, ?, ?, ?)
+                ON CONFLICT(host) DO UPDATE SET
+                    next_slot = MAX(next_slot, excluded.next_slot),
+                    updated_at = excluded.updated_at
+                """,
+                (self.host, now + seconds, now, self._rate)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Não foi possível pausar o limitador de {self.host}: {e}")
+            super().pause(seconds)
+    
+    async def _reserve_async(self, tokens: float) -> float:
+        # A transação no SQLite pode esperar pelo lock: roda fora do event loop
+        return await asyncio.to_thread(self.reserve, tokens)
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Converte o cabeçalho Retry-After em segundos
+    
+    Aceita tanto o formato em segundos ("120") quanto a data HTTP
+    ("Wed, 21 Oct 2015 07:28:00 GMT"). Retorna None se ausente ou inválido.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateController:
+    """
+    Controle AIMD da taxa de um limitador
+    
+    Enquanto as respostas são 200 a taxa sobe de forma aditiva (increase_step
+    requisições/s por sucesso) até max_rate; os sucessos são somados e
+    aplicados num único ajuste a cada increase_interval segundos, para não
+    gravar o estado compartilhado a cada resposta. A cada 429/503 a taxa é
+    multiplicada por decrease_factor (sem cair abaixo de min_rate) e, se o
+    servidor enviou Retry-After, o limitador é pausado por esse tempo. Os
+    ajustes usam increase_rate/decrease_rate do limitador, atômicos também
+    entre processos. A taxa efetiva fica em effective_rate para ser
+    reportada nas estatísticas.
+    """
+    
+    THROTTLE_STATUS = {429, 503}
+    
+    # Intervalo mínimo em segundos entre dois aumentos aditivos
+    INCREASE_INTERVAL = 1.0
+    
+    def __init__(self, limiter: TokenBucket, max_rate: Optional[float] = None,
+                 min_rate: Optional[float] = None, increase_step: Optional[float] = None,
+                 decrease_factor: float = 0.5, increase_interval: Optional[float] = None):
+        """
+        Inicializa o controlador
+        
+        Args:
+            limiter: Limitador cuja taxa será ajustada
+            max_rate: Teto em requisições/s (padrão: a taxa inicial do limitador)
+            min_rate: Piso em requisições/s (padrão: 1/10 da taxa inicial)
+            increase_step: Acréscimo por resposta bem-sucedida (padrão: 5% da taxa inicial)
+            decrease_factor: Fator multiplicativo aplicado a cada 429/503
+            increase_interval: Segundos entre aumentos aditivos (padrão INCREASE_INTERVAL)
+        """
+        self.limiter = limiter
+        initial = limiter.rate
+        self.max_rate = max_rate if max_rate is not None else initial
+        self.min_rate = min_rate if min_rate is not None else initial / 10
+        self.increase_step = increase_step if increase_step is not None else initial * 0.05
+        self.decrease_factor = decrease_factor
+        self.increase_interval = self.INCREASE_INTERVAL if increase_interval is None else increase_interval
+        self.throttled = 0
+        self._successes = 0
+        self._last_increase = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def effective_rate(self) -> float:
+        """Taxa atual em requisições/s (0 = sem limite)"""
+        return self.limiter.rate
+    
+    def on_success(self):
+        """Registra uma resposta bem-sucedida (aumento aditivo)"""
+        if self.limiter.rate <= 0:
+            return
+        with self._lock:
+            self._successes += 1
+            now = time.monotonic()
+            if now - self._last_increase < self.increase_interval:
+                return
+            step = self.increase_step * self._successes
+            self._successes = 0
+            self._last_increase = now
+        self.limiter.increase_rate(step, self.max_rate)
+    
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """Registra um 429/503 (redução multiplicativa e pausa de Retry-After)"""
+        with self._lock:
+            self.throttled += 1
+            # Sucessos anteriores ao 429 não contam para o próximo aumento
+            self._successes = 0
+            self._last_increase = time.monotonic()
+            rate = self.limiter.decrease_rate(self.decrease_factor, self.min_rate)
+        # Sem Retry-After, pausa um intervalo na nova taxa para descartar a fila antiga
+        pause = retry_after or (1.0 / rate if rate > 0 else 0.0)
+        self.limiter.pause(pause)
+        action = f"taxa reduzida para {rate:.2f}/s" if rate > 0 else "sem limite de taxa configurado"
+        logger.warning(f"Upstream limitou requisições; {action}"
+                       + (f", aguardando Retry-After de {retry_after:.1f}s" if retry_after else ""))
+    
+    def observe(self, status: int, retry_after=None):
+        """Ajusta a taxa a partir do status HTTP e do cabeçalho Retry-After"""
+        if status in self.THROTTLE_STATUS:
+            self.on_throttle(parse_retry_after(retry_after))
+        elif 200 <= status < 300:
+            self.on_success()
@@ -0,0 +1,204 @@
+"""
+Política única de retry para as APIs externas
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+import logging
+
+import aiohttp
+import requests
+
+from .lookup_budget import LookupBudget
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+T = TypeVar('T')
+
+class RetryableError(Exception):
+    """Resposta que deve ser tentada de novo (ex.: HTTP 429/5xx)"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RetryExhaustedError(Exception):
+    """Consulta que desistiu com erro transitório (timeout, conexão, 429/5xx) depois das tentativas/prazo/orçamento"""
+    
+    def __init__(self, description: str, reason: str):
+        super().__init__(f"{description}: {reason}")
+        self.reason = reason
+
+
+class DeadlineExceededError(RetryExhaustedError):
+    """Consulta desistida sem nenhuma tentativa porque o prazo (ou o orçamento de tempo da linha) acabou"""
+
+
+class RetryPolicy:
+    """
+    Retry de um upstream com orçamento, backoff exponencial com jitter e prazo
+    
+    Substitui as camadas empilhadas (Retry do urllib3, requests direto, curl
+    e o laço de RETRY_ATTEMPTS): cada consulta faz no máximo max_attempts
+    tentativas e nunca passa de deadline segundos, contando o backoff. Além
+    disso, os retries de todas as consultas do upstream dividem um orçamento
+    (budget_ratio retries por consulta, mais uma reserva de min_retries), de
+    modo que uma queda do serviço não multiplica a carga nem o tempo do chunk.
+    """
+    
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    
+    # Menor timeout com que uma tentativa ainda vale a pena (o requests recusa 0)
+    MIN_ATTEMPT_TIMEOUT = 0.05
+    RETRYABLE_EXCEPTIONS = (
+        RetryableError,
+        requests.exceptions.RequestException,
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+    )
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 timeout: float = 10.0, deadline: float = 30.0,
+                 budget_ratio: float = 0.2, min_retries: int = 10):
+        """
+        Inicializa a política
+        
+        Args:
+            max_attempts: Tentativas por consulta (incluindo a primeira)
+            base_delay: Backoff base em segundos (dobra a cada tentativa)
+            max_delay: Teto do backoff de uma tentativa
+            timeout: Timeout de cada requisição em segundos
+            deadline: Tempo total máximo de uma consulta (tentativas + backoff)
+            budget_ratio: Retries ganhos no orçamento a cada consulta
+            min_retries: Retries disponíveis no início e saldo máximo acumulável
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.deadline = deadline
+        self.budget_ratio = budget_ratio
+        self.min_retries = min_retries
+        self._budget = float(min_retries)
+        self._lock = threading.Lock()
+    
+    def check_status(self, status: int, retry_after: Optional[float] = None):
+        """Levanta RetryableError se o status HTTP deve ser tentado de novo"""
+        if status in self.RETRY_STATUS:
+            raise RetryableError(f"HTTP {status}", retry_after)
+    
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da tentativa attempt + 1 ("full jitter")"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def _deposit(self):
+        with self._lock:
+            self._budget = min(max(self.min_retries, 1), self._budget + self.budget_ratio)
+    
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._budget >= 1:
+                self._budget -= 1
+                return True
+            return False
+    
+    def _deadline(self) -> float:
+        """Prazo da consulta: deadline ou o tempo restante do orçamento ativo, o menor"""
+        budget = LookupBudget.current()
+        remaining = budget.remaining_time() if budget is not None else None
+        limit = self.deadline if remaining is None else max(0.0, min(self.deadline, remaining))
+        return time.monotonic() + limit
+    
+    def _next_delay(self, attempt: int, error: Exception, deadline: float) -> Optional[float]:
+        """Espera até a próxima tentativa ou None se a consulta deve desistir"""
+        if attempt >= self.max_attempts - 1:
+            return None
+        delay = max(self.backoff(attempt), getattr(error, 'retry_after', None) or 0.0)
+        if time.monotonic() + delay >= deadline:
+            return None
+        if not self._withdraw():
+            logger.info("Orçamento de retries esgotado; desistindo sem nova tentativa")
+            return None
+        return delay
+    
+    def _attempt_timeout(self, deadline: float, description: str, reason: Optional[str]) -> Callable[[], float]:
+        """
+        Função que devolve o timeout de uma tentativa no momento da chamada
+        
+        O timeout é calculado só quando a tentativa vai de fato à rede (depois
+        do rate limit, que pode bloquear); sem tempo útil até o prazo, a
+        consulta desiste com DeadlineExceededError (nenhuma tentativa feita) ou
+        RetryExhaustedError (com o motivo da última falha).
+        """
+        def timeout() -> float:
+            remaining = deadline - time.monotonic()
+            if remaining < self.MIN_ATTEMPT_TIMEOUT:
+                if reason is None:
+                    raise DeadlineExceededError(description, "prazo esgotado antes da tentativa")
+                raise RetryExhaustedError(description, reason)
+            return min(self.timeout, remaining)
+        return timeout
+    
+    def call(self, func: Callable[[Callable[[], float]], T], description: str = "") -> T:
+        """
+        Executa func(timeout) com retry
+        
+        Args:
+            func: Faz uma tentativa; chama timeout() logo antes da requisição
+                para obter o timeout (levanta RetryExhaustedError se o prazo
+                acabou) e levanta uma das RETRYABLE_EXCEPTIONS para pedir nova
+                tentativa
+            description: Identificação da consulta nos logs
+            
+        Returns:
+            Retorno de func
+            
+        Raises:
+            RetryExhaustedError: Tentativas, prazo ou orçamento acabaram com
+                erro transitório (reason guarda o último erro)
+            DeadlineExceededError: O prazo acabou antes da primeira tentativa
+        """
+        self._deposit()
+        deadline = self._deadline()
+        reason = None
+        for attempt in range(self.max_attempts):
+            timeout = self._attempt_timeout(deadline, description, reason)
+            timeout()
+            try:
+                return func(timeout)
+            except self.RETRYABLE_EXCEPTIONS as e:
+                reason = f"{type(e).__name__}: {str(e)[:100]}"
+                logger.warning(f"Tentativa {attempt + 1}/{self.max_attempts} - {description}: {reason}")
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        
+        logger.error(f"{description} falhou após {attempt + 1} tentativa(s)")
+        raise RetryExhaustedError(description, reason)
+    
+    async def call_async(self, func: Callable[[Callable[[], float]], Awaitable[T]], description: str = "") -> T:
+        """Versão assíncrona de call (backoff com asyncio.sleep)"""
+        self._deposit()
+        deadline = self._deadline()
+        reason = None
+        for attempt in range(self.max_attempts):
+            timeout = self._attempt_timeout(deadline, description, reason)
+            timeout()
+            try:
+                return await func(timeout)
+            except self.RETRYABLE_EXCEPTIONS as e:
+                reason = f"{type(e).__name__}: {str(e)[:100]}"
+                logger.warning(f"Tentativa {attempt + 1}/{self.max_attempts} - {description}: {reason}")
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        
+        logger.error(f"{description} falhou após {attempt + 1} tentativa(s)")
+        raise RetryExhaustedError(description, reason)
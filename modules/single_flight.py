@@ -0,0 +1,86 @@
+"""
+Coalescência de consultas idênticas em andamento (single-flight)
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Garante uma única consulta em voo por chave
+    
+    Os caches em memória só são preenchidos quando a resposta chega, então
+    threads (ou tarefas asyncio) que pedem o mesmo CEP/endereço ao mesmo
+    tempo fariam requisições repetidas. Com do/do_async, a primeira chamada
+    de uma chave executa a consulta e as seguintes aguardam o mesmo futuro,
+    recebendo o mesmo resultado ou a mesma exceção. A chave é liberada assim
+    que a consulta termina: chamadas posteriores dependem do cache.
+    """
+    
+    def __init__(self):
+        self.shared = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Hashable, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Executa func(*args, **kwargs) uma única vez por key em andamento
+        
+        Returns:
+            Retorno de func (o mesmo para todas as chamadas coalescidas)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+    
+    async def do_async(self, key: Hashable, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Versão assíncrona de do (as tarefas seguintes aguardam a primeira)"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não lida quando ninguém mais aguardava
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[key]
@@ -0,0 +1,257 @@
+"""
+Transporte HTTP compartilhado pelos clientes das APIs externas
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limiter import TokenBucket, AdaptiveRateController, parse_retry_after
+from .retry_policy import RetryPolicy
+from .concurrency_limiter import AdaptiveConcurrencyLimiter
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+
+class Upstream:
+    """
+    Estado de um host no transporte
+    
+    Reúne o que vale para todas as requisições ao host, venha de qual cliente
+    vier: limitador de taxa com ajuste AIMD, limite adaptativo de
+    concorrência, política de retry, disjuntor, cabeçalhos e métricas.
+    """
+    
+    def __init__(self, host: str, rate_limiter: TokenBucket, rate_controller: AdaptiveRateController,
+                 concurrency_limiter: AdaptiveConcurrencyLimiter, retry_policy: RetryPolicy,
+                 circuit_breaker: CircuitBreaker, headers: Dict[str, str]):
+        self.host = host
+        self.rate_limiter = rate_limiter
+        self.rate_controller = rate_controller
+        self.concurrency_limiter = concurrency_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.headers = headers
+        self.requests = 0
+        self.failures = 0
+        self._latency_total = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float, ok: bool):
+        """Registra uma tentativa (ok=False para erro de rede, 429 ou 5xx)"""
+        with self._lock:
+            self.requests += 1
+            self._latency_total += latency
+            if not ok:
+                self.failures += 1
+    
+    def metrics(self) -> Dict:
+        """Tentativas, falhas, latência média, taxa efetiva, 429/503, concorrência e circuito do host"""
+        with self._lock:
+            requests_sent, failures, latency_total = self.requests, self.failures, self._latency_total
+        return {
+            'requests': requests_sent,
+            'failures': failures,
+            'latency_ms': round(latency_total / requests_sent * 1000, 1) if requests_sent else 0.0,
+            'rate': round(self.rate_controller.effective_rate, 3),
+            'throttled': self.rate_controller.throttled,
+            'concurrency': self.concurrency_limiter.current_limit,
+            'circuit': self.circuit_breaker.state
+        }
+
+
+class HTTPTransport:
+    """
+    Transporte HTTP único para ViaCEP, Nominatim e a busca de CEP por endereço
+    
+    Uma requests.Session com pools keep-alive por host (até pool_maxsize
+    conexões por host) e, para asyncio, uma aiohttp.ClientSession com o mesmo
+    limite: toda consulta reaproveita conexões já abertas, sem novo handshake
+    TLS nem processo externo. Cada host é registrado uma vez (register) com
+    seus limites, retry e disjuntor; get e get_async aplicam tudo isso a cada
+    tentativa e acumulam as métricas do host.
+    """
+    
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32):
+        """
+        Inicializa o transporte
+        
+        Args:
+            pool_connections: Hosts com pool de conexões mantido
+            pool_maxsize: Conexões keep-alive por host
+        """
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._upstreams: Dict[str, Upstream] = {}
+        self._lock = threading.Lock()
+        self._async_session = None
+        self._async_loop = None
+    
+    def register(self, url: str, rate_limiter: TokenBucket, max_rate: Optional[float] = None,
+                 concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Upstream:
+        """
+        Registra o host de url
+        
+        Args:
+            url: Qualquer URL do host
+            rate_limiter: Limitador de taxa do host
+            max_rate: Teto da taxa adaptativa em req/s (None = a taxa inicial)
+            concurrency_limiter: Limite adaptativo de requisições simultâneas
+            retry_policy: Política de retry do host
+            circuit_breaker: Disjuntor do host (um novo se None)
+            headers: Cabeçalhos enviados em toda requisição ao host
+            
+        Returns:
+            Upstream do host. Se ele já estava registrado, o existente é
+            devolvido e os demais argumentos são ignorados: clientes do mesmo
+            host (ex.: síncrono e assíncrono) dividem taxa, concorrência e disjuntor
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            upstream = self._upstreams.get(host)
+            if upstream is None:
+                upstream = self._upstreams[host] = Upstream(
+                    host,
+                    rate_limiter,
+                    AdaptiveRateController(rate_limiter, max_rate=max_rate),
+                    concurrency_limiter or AdaptiveConcurrencyLimiter(),
+                    retry_policy or RetryPolicy(),
+                    circuit_breaker or CircuitBreaker(host),
+                    headers or {}
+                )
+            return upstream
+    
+    def upstream_for(self, url: str) -> Upstream:
+        """Upstream registrado para o host de url"""
+        host = urlparse(url).netloc
+        upstream = self._upstreams.get(host)
+        if upstream is None:
+            raise ValueError(f"Host não registrado no transporte: {host}")
+        return upstream
+    
+    def metrics(self) -> Dict[str, Dict]:
+        """Métricas de cada host registrado"""
+        return {host: upstream.metrics() for host, upstream in list(self._upstreams.items())}
+    
+    def get(self, url: str, params: Optional[Dict] = None, description: str = "") -> requests.Response:
+        """
+        GET pelo upstream do host de url
+        
+        Cada tentativa respeita o rate limit e ocupa uma vaga do limitador de
+        concorrência; 429/5xx e erros de conexão são tentados de novo dentro
+        do prazo e do orçamento da política, tudo através do disjuntor.
+        
+        Returns:
+            Resposta final (status não retentável)
+            
+        Raises:
+            CircuitOpenError: Circuito aberto; a consulta não foi feita
+            RetryExhaustedError: Timeouts ou 429/5xx até a política desistir
+        """
+        upstream = self.upstream_for(url)
+        
+        def attempt(timeout: Callable[[], float]) -> requests.Response:
+            upstream.rate_limiter.acquire()
+            with upstream.concurrency_limiter.slot() as sample:
+                request_timeout = self._slot_timeout(timeout, sample)
+                start = time.monotonic()
+                ok = False
+                try:
+                    response = self.session.get(url, params=params, headers=upstream.headers, timeout=request_timeout)
+                    sample.ok = not upstream.concurrency_limiter.is_overload(response.status_code)
+                    ok = response.status_code not in upstream.retry_policy.RETRY_STATUS
+                finally:
+                    upstream.record(time.monotonic() - start, ok)
+            retry_after = response.headers.get('Retry-After')
+            upstream.rate_controller.observe(response.status_code, retry_after)
+            upstream.retry_policy.check_status(response.status_code, parse_retry_after(retry_after))
+            return response
+        
+        return upstream.circuit_breaker.call(upstream.retry_policy.call, attempt, description or url)
+    
+    @staticmethod
+    def _slot_timeout(timeout: Callable[[], float], sample) -> float:
+        """
+        Timeout da tentativa, calculado já com a vaga de concorrência ocupada
+        
+        As esperas do rate limit e da vaga contam no prazo da consulta. Se o
+        prazo acabou nelas, a vaga é devolvida sem amostra nem métrica (a
+        requisição não foi enviada) e o erro da RetryPolicy segue adiante.
+        """
+        try:
+            return timeout()
+        except BaseException:
+            sample.sent = False
+            raise
+    
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        """ClientSession do event loop atual (recriada se o loop mudou)"""
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_maxsize)
+            )
+            self._async_loop = loop
+        return self._async_session
+    
+    async def get_async(self, url: str, params: Optional[Dict] = None,
+                        description: str = "") -> Tuple[int, Any]:
+        """
+        Versão assíncrona de get (backoff com asyncio.sleep)
+        
+        Returns:
+            (status, JSON da resposta) da resposta final; o JSON é None se o
+            status não for 200 ou o corpo não for JSON
+        """
+        upstream = self.upstream_for(url)
+        session = self._get_async_session()
+        
+        async def attempt(timeout: Callable[[], float]) -> Tuple[int, Any]:
+            await upstream.rate_limiter.acquire_async()
+            async with upstream.concurrency_limiter.slot_async() as sample:
+                request_timeout = self._slot_timeout(timeout, sample)
+                start = time.monotonic()
+                ok = False
+                try:
+                    async with session.get(url, params=params, headers=upstream.headers,
+                                           timeout=aiohttp.ClientTimeout(total=request_timeout)) as response:
+                        status = response.status
+                        sample.ok = not upstream.concurrency_limiter.is_overload(status)
+                        ok = status not in upstream.retry_policy.RETRY_STATUS
+                        retry_after = response.headers.get('Retry-After')
+                        upstream.rate_controller.observe(status, retry_after)
+                        upstream.retry_policy.check_status(status, parse_retry_after(retry_after))
+                        try:
+                            data = await response.json(content_type=None) if status == 200 else None
+                        except ValueError:
+                            data = None
+                        return status, data
+                finally:
+                    upstream.record(time.monotonic() - start, ok)
+        
+        return await upstream.circuit_breaker.call_async(upstream.retry_policy.call_async, attempt, description or url)
+    
+    def close(self):
+        """Fecha a requests.Session (a ClientSession é fechada por close_async)"""
+        self.session.close()
+    
+    async def close_async(self):
+        """Fecha a ClientSession do asyncio"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._async_loop = None
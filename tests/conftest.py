@@ -0,0 +1,134 @@
+"""
+Fixtures compartilhadas: APIs ViaCEP/Nominatim simuladas e processador isolado
+"""
+import hashlib
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+
+import pandas as pd
+import pytest
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.csv_processor import CSVProcessor
+
+VIACEP = {
+    '01310100': dict(cep='01310-100', logradouro='Avenida Paulista', bairro='Bela Vista', localidade='São Paulo', uf='SP'),
+    '01502001': dict(cep='01502-001', logradouro='Rua Iguatemi', bairro='Liberdade', localidade='São Paulo', uf='SP'),
+    '05422000': dict(cep='05422-000', logradouro='Avenida Rebouças', bairro='Pinheiros', localidade='São Paulo', uf='SP'),
+    '20040020': dict(cep='20040-020', logradouro='Av. Rio Branco', bairro='Centro', localidade='Rio de Janeiro', uf='RJ'),
+}
+
+
+def fake_coordinates(query: str) -> tuple:
+    """Coordenadas determinísticas que o Nominatim simulado devolve para a query"""
+    h = int(hashlib.md5(query.encode()).hexdigest(), 16)
+    return -23 - (h % 1000) / 1000, -46 - (h % 997) / 1000
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, data):
+        self.status_code = status_code
+        self.headers = {}
+        self._data = data
+    
+    def json(self):
+        return self._data
+
+
+class FakeAPI:
+    """
+    ViaCEP e Nominatim em memória no lugar de requests.Session.request
+    
+    Com down=True toda requisição levanta ConnectionError (API fora do ar).
+    """
+    
+    def __init__(self):
+        self.calls = []
+        self.down = False
+    
+    def request(self, session, method, url, params=None, **kwargs):
+        parsed = urlparse(url)
+        if self.down:
+            self.calls.append(('down', url))
+            raise requests.exceptions.ConnectionError("API fora do ar")
+        
+        if 'viacep' in parsed.netloc:
+            parts = [unquote(part) for part in parsed.path.split('/') if part]
+            self.calls.append(('viacep', '/'.join(parts[1:-1])))
+            if len(parts) == 3:
+                data = VIACEP.get(parts[1])
+                return FakeResponse(200, data if data else {'erro': True})
+            # Busca de CEP por endereço (UF/cidade/logradouro)
+            found = [
+                {'cep': data['cep']} for data in VIACEP.values()
+                if data['uf'] == parts[1] and data['localidade'] == parts[2] and parts[3] in data['logradouro']
+            ]
+            return FakeResponse(200, found)
+        
+        query = (params or {}).get('q', '')
+        self.calls.append(('nominatim', query))
+        lat, lon = fake_coordinates(query)
+        return FakeResponse(200, [{'lat': str(lat), 'lon': str(lon)}])
+    
+    def count(self, api: str) -> int:
+        return sum(1 for call in self.calls if call[0] == api)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """Substitui a rede pelas APIs simuladas e desliga as esperas do rate limiting"""
+    api = FakeAPI()
+    monkeypatch.setattr(requests.Session, 'request', lambda session, method, url, **kwargs: api.request(session, method, url, **kwargs))
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    return api
+
+
+@pytest.fixture
+def make_processor(tmp_path, fake_api):
+    """Cria processadores que compartilham o cache e o limitador de taxa do teste"""
+    def make(**kwargs):
+        kwargs.setdefault('chunk_size', 3)
+        kwargs.setdefault('max_workers', 1)
+        kwargs.setdefault('cache_db', str(tmp_path / 'cache.db'))
+        kwargs.setdefault('rate_limit_db', str(tmp_path / 'rate_limit.db'))
+        return CSVProcessor(**kwargs)
+    return make
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Grava linhas (lista de dicts) num CSV do diretório temporário"""
+    def write(rows, name='entrada.csv'):
+        path = tmp_path / name
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return str(path)
+    return write
+
+
+@asynccontextmanager
+async def serve(routes):
+    """
+    Servidor aiohttp local para os clientes assíncronos
+    
+    Args:
+        routes: Lista de (caminho, handler) registrados como GET
+        
+    Yields:
+        URL base do servidor (sem barra no final)
+    """
+    app = web.Application()
+    for path, handler in routes:
+        app.router.add_get(path, handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield str(server.make_url('')).rstrip('/')
+    finally:
+        await server.close()
@@ -0,0 +1,116 @@
+"""
+AsyncCEPValidator: consultas concorrentes ao ViaCEP com aiohttp
+"""
+import asyncio
+import time
+
+from aiohttp import web
+
+from modules.cache_manager import CacheManager
+from modules.cep_validator import AsyncCEPValidator
+from modules.lookup_budget import LookupBudget
+from modules.retry_policy import RetryPolicy
+from conftest import VIACEP, serve
+
+
+class ViaCEPServer:
+    """ViaCEP local que registra as chamadas e o pico de requisições simultâneas"""
+    
+    def __init__(self, delay: float = 0.0, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def handle(self, request):
+        cep = request.match_info['cep']
+        self.calls.append(cep)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if cep in self.failing:
+                return web.Response(status=503)
+            return web.json_response(VIACEP.get(cep) or {'erro': True})
+        finally:
+            self.in_flight -= 1
+    
+    def routes(self):
+        return [('/ws/{cep}/json/', self.handle)]
+
+
+def make_validator(monkeypatch, base_url, **kwargs):
+    monkeypatch.setattr(AsyncCEPValidator, 'BASE_URL', f"{base_url}/ws")
+    kwargs.setdefault('retry_policy', RetryPolicy(max_attempts=2, base_delay=0, deadline=5))
+    return AsyncCEPValidator(**kwargs)
+
+
+def test_consultas_simultaneas_limitadas_por_max_concurrency(monkeypatch):
+    server = ViaCEPServer(delay=0.05)
+    ceps = [f"{n:08d}" for n in range(1, 13)]
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_validator(monkeypatch, base_url, max_concurrency=4) as validator:
+                start = time.monotonic()
+                results = await validator.search_many(ceps)
+                return results, time.monotonic() - start
+    
+    results, elapsed = asyncio.run(main())
+    
+    assert sorted(server.calls) == ceps
+    assert results == dict.fromkeys(ceps)
+    assert 1 < server.max_in_flight <= 4
+    # Em sequência seriam 12 x 50 ms
+    assert elapsed < 12 * 0.05 * 0.75
+
+
+def test_repetidos_consultados_uma_vez_e_inexistente_no_cache_negativo(monkeypatch, tmp_path):
+    server = ViaCEPServer()
+    cache = CacheManager(str(tmp_path / 'cache.db'))
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_validator(monkeypatch, base_url, cache_manager=cache) as validator:
+                first = await validator.search_many(['01310-100', '01310100', '99999999', 'abc'])
+            # Outra instância encontra tudo no cache SQLite
+            async with make_validator(monkeypatch, base_url, cache_manager=cache) as validator:
+                second = await validator.search_many(['01310100', '99999999'])
+                single = await validator.search_cep('01310-100')
+            return first, second, single
+    
+    try:
+        first, second, single = asyncio.run(main())
+    finally:
+        cache.close()
+    
+    assert first == {'01310100': VIACEP['01310100'], '99999999': None}
+    assert second == first
+    assert single == VIACEP['01310100']
+    assert sorted(server.calls) == ['01310100', '99999999']
+
+
+def test_falha_transitoria_devolve_none_e_vai_para_pendentes(monkeypatch, tmp_path):
+    server = ViaCEPServer(failing={'01310100'})
+    cache = CacheManager(str(tmp_path / 'cache.db'))
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_validator(monkeypatch, base_url, cache_manager=cache) as validator:
+                with LookupBudget().activate() as budget:
+                    result = await validator.search_cep('01310100')
+                return result, validator.cache, budget
+    
+    try:
+        result, memory, budget = asyncio.run(main())
+        # Mesmo contrato de CEPValidator.search_cep: None e consulta adiada no orçamento
+        assert result is None
+        assert budget.deferred == 1
+        # Não memoriza a falha: o CEP fica na fila para ser consultado de novo
+        assert '01310100' not in memory
+        assert cache.get_pending('cep') == ['01310100']
+        assert not cache.is_negative('cep', '01310100')
+        assert server.calls == ['01310100', '01310100']
+    finally:
+        cache.close()
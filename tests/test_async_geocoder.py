@@ -0,0 +1,119 @@
+"""
+AsyncGeocoder: Nominatim com aiohttp e token bucket compartilhado
+"""
+import asyncio
+import time
+
+from aiohttp import web
+
+from modules.cache_manager import CacheManager
+from modules.geocoder import AsyncGeocoder
+from modules.rate_limiter import TokenBucket
+from modules.retry_policy import RetryPolicy
+from conftest import fake_coordinates, serve
+
+INTERVAL = 0.05
+
+
+class NominatimServer:
+    """Nominatim local: queries com 'Inexistente' não têm resultado"""
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+    
+    async def handle(self, request):
+        query = request.query['q']
+        self.calls.append((time.monotonic(), query))
+        await asyncio.sleep(self.delay)
+        if 'Inexistente' in query:
+            return web.json_response([])
+        lat, lon = fake_coordinates(query)
+        return web.json_response([{'lat': str(lat), 'lon': str(lon)}])
+    
+    def routes(self):
+        return [('/search', self.handle)]
+    
+    @property
+    def queries(self):
+        return [query for _, query in self.calls]
+
+
+def make_geocoder(monkeypatch, base_url, **kwargs):
+    monkeypatch.setattr(AsyncGeocoder, 'BASE_URL', f"{base_url}/search")
+    kwargs.setdefault('rate_limit_delay', 0)
+    kwargs.setdefault('retry_policy', RetryPolicy(max_attempts=2, base_delay=0, deadline=5))
+    return AsyncGeocoder(**kwargs)
+
+
+def test_token_bucket_compartilhado_espaca_as_requisicoes(monkeypatch):
+    server = NominatimServer()
+    bucket = TokenBucket.from_interval(INTERVAL)
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_geocoder(monkeypatch, base_url, rate_limiter=bucket) as first, \
+                    make_geocoder(monkeypatch, base_url, rate_limiter=bucket) as second:
+                return await asyncio.gather(*(
+                    geocoder.search_by_address(f"Rua {n}", "", "", "São Paulo", "SP")
+                    for n, geocoder in enumerate([first, second] * 3)
+                ))
+    
+    results = asyncio.run(main())
+    
+    assert all(results)
+    stamps = sorted(stamp for stamp, _ in server.calls)
+    assert len(stamps) == 6
+    # As duas instâncias retiram tokens do mesmo balde
+    assert min(b - a for a, b in zip(stamps, stamps[1:])) > INTERVAL * 0.8
+
+
+def test_queries_identicas_em_andamento_vao_a_rede_uma_vez(monkeypatch):
+    server = NominatimServer(delay=0.05)
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_geocoder(monkeypatch, base_url) as geocoder:
+                return await asyncio.gather(*(
+                    geocoder.search_by_address("Avenida Paulista", "", "Bela Vista", "São Paulo", "SP")
+                    for _ in range(5)
+                ))
+    
+    results = asyncio.run(main())
+    
+    expected = fake_coordinates("Avenida Paulista, Bela Vista, São Paulo, SP")
+    assert results == [expected] * 5
+    assert server.queries == ["Avenida Paulista, Bela Vista, São Paulo, SP"]
+
+
+def test_resultados_e_ausencias_persistidos_no_cache(monkeypatch, tmp_path):
+    server = NominatimServer()
+    cache = CacheManager(str(tmp_path / 'cache.db'), bairro_min_points=1)
+    
+    async def main():
+        async with serve(server.routes()) as base_url:
+            async with make_geocoder(monkeypatch, base_url, cache_manager=cache) as geocoder:
+                found = await geocoder.search_by_address("Avenida Paulista", "", "Bela Vista", "São Paulo", "SP")
+                missing = await geocoder.search_by_address("Rua Inexistente", "", "", "São Paulo", "SP")
+                by_cep = await geocoder.search_by_cep("01310-100", "São Paulo", "SP")
+            async with make_geocoder(monkeypatch, base_url, cache_manager=cache) as geocoder:
+                again = (
+                    await geocoder.search_by_address("Avenida Paulista", "", "Bela Vista", "São Paulo", "SP"),
+                    await geocoder.search_by_address("Rua Inexistente", "", "", "São Paulo", "SP"),
+                    await geocoder.search_by_cep("01310100", "São Paulo", "SP"),
+                )
+            return (found, missing, by_cep), again
+    
+    try:
+        first, again = asyncio.run(main())
+        found, missing, by_cep = first
+        
+        assert found == fake_coordinates("Avenida Paulista, Bela Vista, São Paulo, SP")
+        assert missing is None
+        assert by_cep == fake_coordinates("01310100, São Paulo, SP")
+        assert again == first
+        assert len(server.calls) == 3
+        # Geocode de logradouro alimenta o centroide do bairro
+        assert cache.get_bairro_centroid("Bela Vista", "São Paulo", "SP") == found
+    finally:
+        cache.close()
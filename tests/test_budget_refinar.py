@@ -0,0 +1,52 @@
+"""
+Orçamento de consultas esgotado marca a linha em FL_REFINAR
+"""
+import pandas as pd
+
+from modules.lookup_budget import LookupBudget
+
+ROWS = [
+    {'CD_CEP': '01310100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '01502001', 'NM_LOGRADOURO': 'R. Iguatemi', 'NM_BAIRRO': 'Liberdade', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP',
+     'DS_LATITUDE': -23.5, 'DS_LONGITUDE': -46.6},
+]
+
+
+def test_orcamento_esgotado_marca_refinar(make_processor, write_csv, fake_api):
+    df = make_processor(row_call_budget=0).process_file(write_csv(ROWS))['dataframe']
+    
+    # O ViaCEP não entra no orçamento: o CEP é validado mesmo assim
+    assert df['CD_CEP_CORRETO'].tolist() == ['01310100', '01502001']
+    assert fake_api.count('nominatim') == 0
+    assert pd.isna(df.loc[0, 'DS_LATITUDE'])
+    assert df.loc[0, 'FL_REFINAR'] == True
+    # Linha que já tinha coordenadas não depende do orçamento
+    assert df.loc[1, 'FL_REFINAR'] == False
+    assert df.loc[1, 'DS_PRECISAO'] == 'original'
+
+
+def test_orcamento_suficiente_nao_marca_refinar(make_processor, write_csv, fake_api):
+    df = make_processor(row_call_budget=5).process_file(write_csv(ROWS))['dataframe']
+    
+    assert df['FL_REFINAR'].tolist() == [False, False]
+    assert df.loc[0, 'DS_PRECISAO'] == 'cep'
+
+
+
+def test_orcamento_da_linha_debita_o_do_chunk():
+    chunk = LookupBudget(calls=3)
+    first, second = LookupBudget(calls=2, parent=chunk), LookupBudget(calls=2, parent=chunk)
+    
+    assert [first.spend(), first.spend(), first.spend()] == [True, True, False]
+    # O chunk só tinha mais uma consulta: a segunda linha é cortada mesmo com saldo próprio
+    assert [second.spend(), second.spend()] == [True, False]
+    assert first.cut and second.cut and chunk.exhausted
+
+
+def test_orcamento_de_tempo_limita_o_prazo_restante():
+    budget = LookupBudget(seconds=0)
+    
+    assert budget.remaining_time() <= 0
+    assert budget.spend() is False
+    assert budget.cut
+    assert LookupBudget().remaining_time() is None
@@ -0,0 +1,202 @@
+"""
+Migração de um cache.db criado pela versão original (esquema sem user_version)
+"""
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from modules.address_normalizer import address_key
+from modules.cache_manager import CacheManager
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Esquema e chaves (hash() do Python) gravados pela versão original
+BASELINE_SCHEMA = """
+    CREATE TABLE cep_cache (
+        cep TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE geocode_cache (
+        address_hash TEXT PRIMARY KEY,
+        address TEXT,
+        latitude REAL,
+        longitude REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE processing_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT,
+        total_rows INTEGER,
+        processed_rows INTEGER,
+        fixed_ceps INTEGER,
+        found_coords INTEGER,
+        errors INTEGER,
+        status TEXT,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP
+    );
+"""
+
+CEPS = {
+    '01310100': {'cep': '01310-100', 'logradouro': 'Avenida Paulista', 'bairro': 'Bela Vista', 'localidade': 'São Paulo', 'uf': 'SP'},
+    '01310000': {'cep': '01310-000', 'logradouro': '', 'bairro': '', 'localidade': 'São Paulo', 'uf': 'SP'},
+}
+
+GEOCODES = [
+    ('Avenida Paulista, Bela Vista, São Paulo, SP', -23.561, -46.656),
+    ('Rua Treze de Maio, Bela Vista, São Paulo, SP', -23.559, -46.646),
+    ('Rua Rui Barbosa, Bela Vista, São Paulo, SP', -23.557, -46.645),
+    ('01502001, São Paulo, SP', -23.561, -46.633),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = tmp_path / 'cache.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO cep_cache (cep, data) VALUES (?, ?)",
+        [(cep, json.dumps(data)) for cep, data in CEPS.items()]
+    )
+    conn.executemany(
+        "INSERT INTO geocode_cache (address_hash, address, latitude, longitude) VALUES (?, ?, ?, ?)",
+        [(hash(address), address, lat, lon) for address, lat, lon in GEOCODES]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_migra_ate_a_versao_atual(baseline_db):
+    cache = CacheManager(str(baseline_db))
+    try:
+        version = cache._connect().execute("PRAGMA user_version").fetchone()[0]
+        assert version == CacheManager.SCHEMA_VERSION
+        assert cache.get_cep('01310100') == CEPS['01310100']
+    finally:
+        cache.close()
+
+
+def test_geocodes_antigos_encontrados_pela_chave_canonica(baseline_db):
+    cache = CacheManager(str(baseline_db))
+    try:
+        for address, lat, lon in GEOCODES:
+            assert cache.get_coordinates(address) == (lat, lon)
+        # A chave canônica ignora abreviações e acentos
+        assert cache.get_coordinates('Av. Paulista, Bela Vista, Sao Paulo, SP') == (-23.561, -46.656)
+    finally:
+        cache.close()
+
+
+def test_coordenadas_de_cep_preenchidas_para_interpolacao(baseline_db):
+    cache = CacheManager(str(baseline_db))
+    try:
+        coords = {cep: (lat, lon) for cep, lat, lon in cache.load_cep_coordinates()}
+        # CEP de logradouro (cep_cache + geocode do endereço) e query de CEP;
+        # o CEP geral sem logradouro fica de fora
+        assert coords == {'01310100': (-23.561, -46.656), '01502001': (-23.561, -46.633)}
+    finally:
+        cache.close()
+
+
+def test_reabrir_nao_repete_as_migracoes(baseline_db):
+    CacheManager(str(baseline_db)).close()
+    cache = CacheManager(str(baseline_db))
+    try:
+        assert cache.get_stats()['geocode_cache_entries'] == len(GEOCODES)
+        assert cache.get_coordinates(GEOCODES[0][0]) == GEOCODES[0][1:]
+        assert cache._connect().execute("SELECT points FROM bairro_centroids").fetchall() == [(3,)]
+        assert len(cache.load_cep_coordinates()) == 2
+    finally:
+        cache.close()
+
+
+def test_centroide_do_bairro_preenchido_com_geocodes_antigos(baseline_db):
+    cache = CacheManager(str(baseline_db))
+    try:
+        lat, lon = cache.get_bairro_centroid('Bela Vista', 'São Paulo', 'SP')
+        assert lat == pytest.approx((-23.561 - 23.559 - 23.557) / 3)
+        assert lon == pytest.approx((-46.656 - 46.646 - 46.645) / 3)
+    finally:
+        cache.close()
+
+
+def test_backfill_do_centroide_e_idempotente(baseline_db):
+    cache = CacheManager(str(baseline_db))
+    try:
+        conn = cache._connect()
+        before = conn.execute("SELECT lat_sum, lon_sum, points FROM bairro_centroids").fetchall()
+        cache._backfill_bairro_centroids(conn)
+        conn.commit()
+        assert conn.execute("SELECT lat_sum, lon_sum, points FROM bairro_centroids").fetchall() == before
+    finally:
+        cache.close()
+
+
+def open_cache(db_path: str, barrier):
+    barrier.wait()
+    CacheManager(db_path).close()
+
+
+def test_processos_simultaneos_migram_uma_unica_vez(baseline_db):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(4)
+    processes = [context.Process(target=open_cache, args=(str(baseline_db), barrier)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    
+    conn = sqlite3.connect(baseline_db)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == CacheManager.SCHEMA_VERSION
+        assert conn.execute("SELECT points FROM bairro_centroids").fetchall() == [(3,)]
+        assert conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0] == len(GEOCODES)
+    finally:
+        conn.close()
+
+
+def test_migracao_interrompida_nao_avanca_a_versao(baseline_db, monkeypatch):
+    def fail(self, conn):
+        raise RuntimeError("interrompida")
+    
+    monkeypatch.setattr(CacheManager, '_backfill_cep_coordinates', fail)
+    with pytest.raises(RuntimeError):
+        CacheManager(str(baseline_db))
+    monkeypatch.undo()
+    
+    conn = sqlite3.connect(baseline_db)
+    try:
+        # Nada da migração parcial ficou gravado: a próxima abertura refaz tudo
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'bairro_centroids'").fetchone() is None
+    finally:
+        conn.close()
+    cache = CacheManager(str(baseline_db))
+    try:
+        assert cache.get_coordinates(GEOCODES[0][0]) == GEOCODES[0][1:]
+        assert cache._connect().execute("SELECT points FROM bairro_centroids").fetchall() == [(3,)]
+    finally:
+        cache.close()
+
+
+def test_chave_canonica_estavel_entre_processos():
+    # hash() muda com PYTHONHASHSEED; a chave do cache não pode mudar
+    script = "from modules.address_normalizer import address_key; print(address_key('Av. Paulista, São Paulo, SP'))"
+    keys = {
+        subprocess.run(
+            [sys.executable, '-c', script], cwd=ROOT, env={**os.environ, 'PYTHONHASHSEED': seed},
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        for seed in ('1', '2')
+    }
+    assert keys == {address_key('Avenida Paulista, Sao Paulo, SP')}
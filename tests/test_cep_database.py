@@ -0,0 +1,92 @@
+"""
+CEPDatabase: importação em streaming retomável e consultas no formato do ViaCEP
+"""
+import pytest
+
+from modules.cep_database import CEPDatabase
+
+HEADER = 'CEP;LOGRADOURO;BAIRRO;CIDADE;UF'
+LINES = [
+    '01310-100;Avenida Paulista;Bela Vista;São Paulo;SP',
+    '1502001;Rua Iguatemi;Liberdade;São Paulo;SP',          # zero à esquerda perdido no dump
+    '05422000;Avenida Rebouças;Pinheiros;São Paulo;SP;extra',  # campo a mais: linha ignorada
+    '',
+    '20040020;"Av. Rio Branco\nlado par";Centro;Rio de Janeiro;RJ',
+    'sem cep;Rua Qualquer;Centro;São Paulo;SP',
+    '30140071;Avenida Afonso Pena;Centro;Belo Horizonte;MG',
+]
+IMPORTED = {'01310100', '01502001', '20040020', '30140071'}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt(rows_done):
+    raise Interrupted()
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'ceps.csv'
+    path.write_text('\n'.join([HEADER] + LINES) + '\n', encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = CEPDatabase(str(tmp_path / 'ceps.db'))
+    yield database
+    database.close()
+
+
+def test_importa_no_formato_do_viacep(database, csv_path):
+    assert database.import_csv(str(csv_path)) == len(IMPORTED)
+    
+    assert database.get('01310100') == {
+        'cep': '01310-100', 'logradouro': 'Avenida Paulista', 'complemento': '', 'bairro': 'Bela Vista',
+        'localidade': 'São Paulo', 'uf': 'SP', 'ibge': ''
+    }
+    assert database.get('20040020')['logradouro'] == 'Av. Rio Branco\nlado par'
+    assert set(database.get_bulk(['01502001', '05422000', '99999999', 'abc'])) == {'01502001'}
+    assert database.count() == len(IMPORTED)
+    # Arquivo sem mudanças: nada a reimportar
+    assert database.import_csv(str(csv_path)) == 0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3])
+def test_retoma_do_primeiro_registro_nao_gravado(database, csv_path, chunk_size):
+    progress = []
+    
+    def interrupt_second_chunk(rows_done):
+        progress.append(rows_done)
+        if len(progress) == 2:
+            raise Interrupted()
+    
+    with pytest.raises(Interrupted):
+        database.import_csv(str(csv_path), chunk_size=chunk_size, progress_callback=interrupt_second_chunk)
+    first = database.count()
+    
+    resumed = database.import_csv(str(csv_path), chunk_size=chunk_size, progress_callback=progress.append)
+    
+    # Nenhum registro relido: linhas ignoradas, em branco ou com quebra entre
+    # aspas não deslocam a retomada
+    assert first + resumed == len(IMPORTED)
+    assert set(database.get_bulk(IMPORTED)) == IMPORTED
+    assert progress[-1] == len([line for line in LINES if line])
+
+
+def test_arquivo_alterado_recomeca_do_inicio(database, csv_path):
+    with pytest.raises(Interrupted):
+        database.import_csv(str(csv_path), chunk_size=2, progress_callback=interrupt)
+    csv_path.write_text(HEADER + '\n' + LINES[0] + '\n', encoding='utf-8')
+    
+    assert database.import_csv(str(csv_path)) == 1
+
+
+def test_arquivo_sem_coluna_de_cep(database, tmp_path):
+    path = tmp_path / 'sem_cep.csv'
+    path.write_text('LOGRADOURO;UF\nRua A;SP\n', encoding='utf-8')
+    
+    with pytest.raises(ValueError, match="Coluna de CEP"):
+        database.import_csv(str(path))
@@ -0,0 +1,75 @@
+"""
+Interpolação de coordenadas por CEPs vizinhos (CEPInterpolator) e sua vez no fallback
+"""
+import pandas as pd
+import pytest
+
+from modules.cep_interpolator import CEPInterpolator
+from modules.csv_processor import CSVProcessor
+from conftest import fake_coordinates
+
+
+@pytest.fixture
+def interpolator():
+    index = CEPInterpolator()
+    index.add_many([
+        ('01310100', -23.561, -46.656),
+        ('01310105', -23.562, -46.655),
+        ('01310180', -23.563, -46.654),
+        ('01311000', -23.566, -46.650),
+        ('20040020', -22.903, -43.177),
+    ])
+    return index
+
+
+def test_cep_indexado_devolve_as_proprias_coordenadas(interpolator):
+    assert interpolator.estimate('01310100') == (-23.561, -46.656)
+
+
+def test_cep_vizinho_fica_entre_os_pontos_do_prefixo(interpolator):
+    lat, lon = interpolator.estimate('01310150')
+    assert -23.563 < lat < -23.561
+    assert -46.656 < lon < -46.654
+
+
+def test_sem_prefixo_comum_suficiente_nao_estima(interpolator):
+    assert interpolator.estimate('01312000') is None
+    # Só o setor (5 dígitos) é comum a 01310999 e aos CEPs indexados
+    assert interpolator.estimate('01310999', min_prefix=6) is None
+    assert interpolator.estimate('01310999') is not None
+
+
+def test_add_atualiza_e_informa_mudanca(interpolator):
+    assert interpolator.add('01310100', -23.561, -46.656) is False
+    assert interpolator.add('01310100', -23.560, -46.655) is True
+    assert interpolator.estimate('01310100') == (-23.560, -46.655)
+    assert len(interpolator) == 5
+
+
+FALLBACK_ROW = {
+    'CD_CEP': '01310150', 'NM_LOGRADOURO': 'Rua Nova', 'NM_BAIRRO': 'Bela Vista',
+    'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP',
+}
+
+
+def test_fallback_prefere_endereco_a_interpolacao(make_processor, fake_api):
+    processor = make_processor()
+    processor.cep_interpolator.add_many([('01310100', -23.561, -46.656), ('01310180', -23.563, -46.654)])
+    
+    coords, precision = processor._get_coordinates_with_fallback(pd.Series(FALLBACK_ROW))
+    
+    assert precision == 'endereco'
+    assert coords == fake_coordinates('Rua Nova, Bela Vista, São Paulo, SP')
+
+
+def test_fallback_interpola_quando_endereco_e_bairro_falham(make_processor, fake_api):
+    fake_api.down = True
+    processor = make_processor()
+    processor.cep_interpolator.add_many([('01310100', -23.561, -46.656), ('01310180', -23.563, -46.654)])
+    
+    coords, precision = processor._get_coordinates_with_fallback(pd.Series(FALLBACK_ROW))
+    
+    assert precision == 'interpolado'
+    assert coords == processor.cep_interpolator.estimate('01310150', CSVProcessor.INTERPOLATION_STREET_PREFIX)
+    # Endereço completo, logradouro e bairro foram tentados antes
+    assert fake_api.count('down') > 0
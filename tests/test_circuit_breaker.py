@@ -0,0 +1,116 @@
+"""
+CircuitBreaker: transições fechado -> aberto -> meio-aberto -> fechado/aberto
+"""
+import time
+
+import pytest
+
+from modules.circuit_breaker import CircuitBreaker, CircuitOpenError
+from modules.retry_policy import RetryExhaustedError, DeadlineExceededError
+
+
+class Clock:
+    """time.monotonic controlado pelo teste"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return clock
+
+
+def fail():
+    raise RetryExhaustedError("consulta", "HTTP 503")
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RetryExhaustedError):
+            breaker.call(fail)
+
+
+def test_abre_apos_falhas_seguidas_e_recusa_sem_chamar(clock):
+    breaker = CircuitBreaker('viacep', failure_threshold=3, reset_timeout=10)
+    calls = []
+    
+    trip(breaker)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 'consulta')
+    assert calls == []
+
+
+def test_sucesso_zera_a_contagem_de_falhas(clock):
+    breaker = CircuitBreaker('viacep', failure_threshold=2, reset_timeout=10)
+    
+    with pytest.raises(RetryExhaustedError):
+        breaker.call(fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    with pytest.raises(RetryExhaustedError):
+        breaker.call(fail)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_meio_aberto_libera_uma_consulta_de_teste_que_fecha_o_circuito(clock):
+    breaker = CircuitBreaker('nominatim', failure_threshold=1, reset_timeout=10)
+    trip(breaker)
+    
+    clock.now += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    
+    def probe():
+        # Enquanto o teste está em andamento, as demais consultas são recusadas
+        with pytest.raises(CircuitOpenError, match="meio-aberto"):
+            breaker.call(lambda: 'outra')
+        return 'ok'
+    
+    assert breaker.call(probe) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_teste_que_falha_reabre_com_o_dobro_da_espera(clock):
+    breaker = CircuitBreaker('nominatim', failure_threshold=1, reset_timeout=10, max_reset_timeout=30)
+    trip(breaker)
+    
+    for wait in (10, 20, 30, 30):
+        clock.now += wait - 1
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 1
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(RetryExhaustedError):
+            breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+    
+    assert breaker.opened == 5
+
+
+def test_prazo_da_linha_e_outros_erros_nao_contam_como_falha(clock):
+    breaker = CircuitBreaker('viacep', failure_threshold=1, reset_timeout=10)
+    
+    def deadline():
+        raise DeadlineExceededError("consulta", "prazo esgotado antes da tentativa")
+    
+    with pytest.raises(DeadlineExceededError):
+        breaker.call(deadline)
+    with pytest.raises(KeyError):
+        breaker.call(lambda: {}['x'])
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    # No meio-aberto, um erro que não é do upstream só devolve a vaga de teste
+    trip(breaker)
+    clock.now += 10
+    with pytest.raises(DeadlineExceededError):
+        breaker.call(deadline)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,128 @@
+"""
+API fora do ar: circuito aberto -> fila de pendentes -> refinamento
+"""
+import time
+
+import pytest
+
+from modules.circuit_breaker import CircuitBreaker
+from modules.lookup_budget import LookupBudget
+
+FAILURE_THRESHOLD = 2
+RESET_TIMEOUT = 60.0
+
+ROWS = [
+    {'CD_CEP': '01310100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '20040020', 'NM_LOGRADOURO': 'Av Rio Branco', 'NM_BAIRRO': 'Centro', 'NM_MUNICIPIO': 'Rio de Janeiro', 'NM_UF': 'RJ'},
+    {'CD_CEP': '01502001', 'NM_LOGRADOURO': 'R. Iguatemi', 'NM_BAIRRO': 'Liberdade', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '05422000', 'NM_LOGRADOURO': 'Avenida Rebouças', 'NM_BAIRRO': 'Pinheiros', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '01310100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+]
+
+
+@pytest.fixture
+def make_breaker_processor(make_processor):
+    """Processador com disjuntores que abrem após FAILURE_THRESHOLD falhas seguidas"""
+    def make():
+        processor = make_processor(chunk_size=2)
+        for client, name in ((processor.cep_validator, 'viacep'), (processor.geocoder, 'nominatim')):
+            client.upstream.circuit_breaker = client.circuit_breaker = CircuitBreaker(name, FAILURE_THRESHOLD, RESET_TIMEOUT)
+        return processor
+    return make
+
+
+def reset_elapsed(monkeypatch):
+    """Avança time.monotonic além da espera do circuito (próxima consulta é a de teste)"""
+    monotonic = time.monotonic
+    monkeypatch.setattr(time, 'monotonic', lambda: monotonic() + RESET_TIMEOUT)
+
+
+def test_circuito_aberto_adia_consultas_e_marca_linhas(make_breaker_processor, write_csv, fake_api, tmp_path):
+    fake_api.down = True
+    processor = make_breaker_processor()
+    
+    result = processor.process_file(write_csv(ROWS), output_path=str(tmp_path / 'saida.csv'))
+    df = result['dataframe']
+    
+    assert processor.cep_validator.circuit_breaker.opened >= 1
+    assert df['FL_REFINAR'].tolist() == [True] * len(ROWS)
+    assert df['DS_LATITUDE'].isna().all()
+    assert processor.cache_manager.count_pending('cep') > 0
+    assert processor.cache_manager.count_pending('geocode') > 0
+    # Aberto o circuito, as demais consultas nem chegam à rede
+    attempts = processor.cep_validator.RETRY_ATTEMPTS + processor.geocoder.RETRY_ATTEMPTS
+    assert fake_api.count('down') == FAILURE_THRESHOLD * attempts
+
+
+def test_search_cep_com_falha_devolve_none_e_adia(make_breaker_processor, fake_api):
+    fake_api.down = True
+    validator = make_breaker_processor().cep_validator
+    
+    with LookupBudget().activate() as budget:
+        assert validator.search_cep('01310-100') is None
+    validator.cache_manager.flush()
+    
+    assert budget.deferred == 1
+    assert validator.cache_manager.get_pending('cep') == ['01310100']
+    # A ausência não é memorizada: com a API de volta o CEP é consultado
+    fake_api.down = False
+    assert validator.search_cep('01310100')['logradouro'] == 'Avenida Paulista'
+
+
+def test_drenagem_refaz_geocode_com_o_bairro_da_pendencia(make_breaker_processor, fake_api, monkeypatch):
+    fake_api.down = True
+    processor = make_breaker_processor()
+    geocoder, cache = processor.geocoder, processor.cache_manager
+    cache.bairro_min_points = 1
+    
+    assert geocoder.search_by_address('Avenida Paulista', '', 'Bela Vista', 'São Paulo', 'SP') is None
+    cache.flush()
+    assert cache.get_pending_entries('geocode') == [
+        ('Avenida Paulista, Bela Vista, São Paulo, SP', ['Bela Vista', 'São Paulo', 'SP'])
+    ]
+    
+    fake_api.down = False
+    reset_elapsed(monkeypatch)
+    assert geocoder.drain_pending() == 1
+    cache.flush()
+    
+    assert cache.count_pending() == 0
+    assert cache.get_bairro_centroid('Bela Vista', 'São Paulo', 'SP') == cache.get_coordinates(
+        'Avenida Paulista, Bela Vista, São Paulo, SP'
+    )
+
+
+def test_refine_file_drena_pendentes_e_completa_linhas(make_breaker_processor, write_csv, fake_api,
+                                                      tmp_path, monkeypatch):
+    output = str(tmp_path / 'saida.csv')
+    fake_api.down = True
+    processor = make_breaker_processor()
+    processor.process_file(write_csv(ROWS), output_path=output)
+    
+    # API de volta e espera do circuito vencida: a drenagem faz a consulta de teste
+    fake_api.down = False
+    reset_elapsed(monkeypatch)
+    assert processor.cep_validator.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+    fake_api.calls.clear()
+    result = processor.refine_file(output, output_path=str(tmp_path / 'refinado.csv'))
+    df = result['dataframe']
+    
+    assert processor.cache_manager.count_pending() == 0
+    assert processor.cep_validator.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert processor.geocoder.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert df['FL_REFINAR'].tolist() == [False] * len(ROWS)
+    assert df['DS_LATITUDE'].notna().all()
+    assert df['CD_CEP_CORRETO'].tolist() == [row['CD_CEP'] for row in ROWS]
+    assert result['stats']['refined_rows'] == len(ROWS)
+    # CEP repetido: consultado uma única vez (drenagem da fila + cache)
+    assert fake_api.calls.count(('viacep', '01310100')) == 1
+
+
+def test_refine_file_completa_linha_cortada_pelo_orcamento(make_processor, write_csv, fake_api, tmp_path):
+    output = str(tmp_path / 'saida.csv')
+    make_processor(row_call_budget=0).process_file(write_csv(ROWS[:1]), output_path=output)
+    
+    df = make_processor().refine_file(output)['dataframe']
+    
+    assert df['FL_REFINAR'].tolist() == [False]
+    assert df['DS_LATITUDE'].notna().all()
@@ -0,0 +1,52 @@
+"""
+Limpeza vetorizada de CEPs (_clean_ceps / _cep_status)
+"""
+import pandas as pd
+
+from modules.csv_processor import CSVProcessor
+
+
+def clean(values):
+    return CSVProcessor._clean_ceps(pd.Series(values, dtype=object)).tolist()
+
+
+def test_restaura_zero_a_esquerda_de_cep_lido_como_numero():
+    assert clean(['1310100', '1310100.0', '1502001.00']) == ['01310100', '01310100', '01502001']
+
+
+def test_remove_pontuacao_sem_alterar_cep_com_8_digitos():
+    assert clean(['01310-100', '01.310-100', ' 05422000 ']) == ['01310100', '01310100', '05422000']
+
+
+def test_nao_completa_ceps_curtos_ou_longos_demais():
+    # Só 7 dígitos indicam o zero perdido; o resto continua inválido
+    assert clean(['131010', '013101000', '', 'sem cep']) == ['131010', '013101000', '', '']
+
+
+def test_cep_status_marca_apenas_8_digitos():
+    ceps = CSVProcessor._clean_ceps(pd.Series(['1310100', '131010', '01310-100', ''], dtype=object))
+    assert CSVProcessor._cep_status(ceps).tolist() == [True, False, True, False]
+
+
+def test_cep_numerico_no_csv_e_validado_com_zero(make_processor, write_csv, fake_api):
+    path = write_csv([
+        {'CD_CEP': 1310100, 'NM_LOGRADOURO': 'Av. Paulista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    ])
+    df = make_processor().process_file(path)['dataframe']
+    
+    assert df.loc[0, 'CD_CEP_CORRETO'] == '01310100'
+    assert ('viacep', '01310100') in fake_api.calls
+
+
+def test_arquivo_de_saida_mantem_o_zero_a_esquerda(make_processor, write_csv, fake_api, tmp_path):
+    output = str(tmp_path / 'saida.csv')
+    path = write_csv([
+        {'CD_CEP': '01502001', 'NM_LOGRADOURO': 'R. Iguatemi', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    ])
+    make_processor().process_file(path, output_path=output)
+    
+    # O refinamento lê a saída como texto: o CEP volta igual ao gravado
+    df = make_processor().refine_file(output)['dataframe']
+    
+    assert df['CD_CEP'].tolist() == ['01502001']
+    assert df['CD_CEP_CORRETO'].tolist() == ['01502001']
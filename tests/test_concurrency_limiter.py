@@ -0,0 +1,93 @@
+"""
+Limite adaptativo de requisições simultâneas (AdaptiveConcurrencyLimiter)
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+def saturate(limiter: AdaptiveConcurrencyLimiter, rtt: float, samples: int):
+    """Mantém todas as vagas ocupadas: cada resposta (latência rtt) libera a vaga de uma nova requisição"""
+    for _ in range(limiter.current_limit):
+        limiter.acquire()
+    for _ in range(samples):
+        limiter.release(rtt)
+        while limiter.in_flight < limiter.current_limit:
+            limiter.acquire()
+    while limiter.in_flight:
+        limiter.release()
+
+
+def test_limite_cresce_com_latencia_estavel():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+    
+    saturate(limiter, 0.01, 200)
+    
+    assert limiter.current_limit > 4
+    assert limiter.in_flight == 0
+
+
+def test_limite_encolhe_quando_a_latencia_sobe():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=32)
+    saturate(limiter, 0.01, 50)
+    before = limiter.limit
+    
+    saturate(limiter, 0.2, 100)
+    
+    assert limiter.limit < before
+
+
+def test_erro_reduz_o_limite_em_10_por_cento():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+    
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            raise RuntimeError("falha")
+    with limiter.slot() as sample:
+        sample.ok = False
+    
+    assert limiter.limit == pytest.approx(10 * 0.9 * 0.9)
+    assert limiter.in_flight == 0
+
+
+def test_threads_nunca_passam_do_limite():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3)
+    peak = []
+    lock = threading.Lock()
+    
+    def work():
+        with limiter.slot():
+            with lock:
+                peak.append(limiter.in_flight)
+            time.sleep(0.01)
+    
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert max(peak) == 3
+    assert limiter.in_flight == 0
+
+
+def test_vagas_assincronas_em_ordem_de_chegada():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    order = []
+    
+    async def work(n: int):
+        async with limiter.slot_async():
+            order.append(n)
+            await asyncio.sleep(0.005)
+    
+    async def main():
+        await asyncio.gather(*(work(n) for n in range(6)))
+    
+    asyncio.run(main())
+    
+    assert order == list(range(6))
+    assert limiter.in_flight == 0
@@ -0,0 +1,75 @@
+"""
+MunicipalityGazetteer: centroides de municípios por código IBGE ou nome
+"""
+import pytest
+
+from modules.gazetteer import MunicipalityGazetteer
+
+# Sem coluna de UF (vem do código) e com vírgula decimal, como em exportações do IBGE
+MUNICIPIOS_CSV = """codigo_ibge;nome;latitude;longitude
+3550308;São Paulo;-23,5329;-46,6395
+3545803;Santa Bárbara d'Oeste;-22,7553;-47,4143
+3530805;Mogi Mirim;-22,4332;-46,9532
+4302204;Bom Jesus;-28,6697;-50,4295
+2201903;Bom Jesus;-9,0712;-44,3590
+330455;Rio de Janeiro;-22,9129;-43,2003
+3509502;Campinas;;
+"""
+
+SAO_PAULO = (-23.5329, -46.6395)
+SANTA_BARBARA = (-22.7553, -47.4143)
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = tmp_path / 'municipios.csv'
+    path.write_text(MUNICIPIOS_CSV, encoding='utf-8')
+    gazetteer = MunicipalityGazetteer(str(tmp_path / 'municipios.db'))
+    gazetteer.import_csv(str(path))
+    return gazetteer
+
+
+def test_importa_so_linhas_validas_e_deriva_a_uf_do_codigo(gazetteer, tmp_path):
+    # Código com 6 dígitos e município sem coordenadas ficam de fora
+    assert len(gazetteer) == 5
+    assert gazetteer.lookup('Bom Jesus', 'RS') == (-28.6697, -50.4295)
+    assert gazetteer.lookup('Bom Jesus', 'PI') == (-9.0712, -44.359)
+    assert gazetteer.lookup('Campinas', 'SP') is None
+    # A tabela persiste no SQLite
+    assert len(MunicipalityGazetteer(str(tmp_path / 'municipios.db'))) == 5
+
+
+@pytest.mark.parametrize('name', [
+    "Santa Bárbara d'Oeste", 'SANTA BARBARA D OESTE', 'santa barbara d’oeste', 'Santa-Bárbara-d-Oeste',
+])
+def test_nome_sem_acentos_hifens_e_apostrofos(gazetteer, name):
+    assert gazetteer.lookup(name, 'SP') == SANTA_BARBARA
+
+
+def test_hifen_no_nome_pesquisado(gazetteer):
+    assert gazetteer.lookup('MOGI-MIRIM', 'sp') == (-22.4332, -46.9532)
+
+
+@pytest.mark.parametrize('code', ['3550308', '355030', '3550308.0', ' 3550308 '])
+def test_codigo_ibge_com_7_ou_6_digitos(gazetteer, code):
+    # O código vem antes do nome (aqui inválido)
+    assert gazetteer.lookup('Cidade X', 'SP', code=code) == SAO_PAULO
+
+
+def test_codigo_desconhecido_cai_no_nome(gazetteer):
+    assert gazetteer.lookup('São Paulo', 'SP', code='9999999') == SAO_PAULO
+
+
+def test_nome_sem_uf_so_quando_unico_no_pais(gazetteer):
+    assert gazetteer.lookup('Sao Paulo') == SAO_PAULO
+    assert gazetteer.lookup('Bom Jesus') is None
+    assert gazetteer.lookup('São Paulo', 'RJ') is None
+    assert gazetteer.lookup('') is None
+
+
+def test_arquivo_sem_coordenadas(tmp_path):
+    path = tmp_path / 'sem_coordenadas.csv'
+    path.write_text("codigo_ibge,nome,uf\n3550308,São Paulo,SP\n", encoding='utf-8')
+    
+    with pytest.raises(ValueError, match="latitude"):
+        MunicipalityGazetteer(str(tmp_path / 'municipios.db')).import_csv(str(path))
@@ -0,0 +1,58 @@
+"""
+Plano global (duas passadas) com o mesmo resultado do plano por chunk
+"""
+import pandas as pd
+import pytest
+
+from modules.gazetteer import MunicipalityGazetteer
+
+ROWS = [
+    {'CD_MUNICIPIO': '3550308', 'CD_CEP': '01310-100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista',
+     'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_MUNICIPIO': '3304557', 'CD_CEP': '20040020', 'NM_LOGRADOURO': 'Av Rio Branco', 'NM_BAIRRO': 'Centro',
+     'NM_MUNICIPIO': 'Rio de Janeiro', 'NM_UF': 'RJ'},
+    # Só o código IBGE diferencia as duas linhas (nome do município inválido)
+    {'CD_MUNICIPIO': '3550308', 'CD_CEP': '', 'NM_LOGRADOURO': '', 'NM_BAIRRO': '', 'NM_MUNICIPIO': 'Cidade X', 'NM_UF': 'SP'},
+    {'CD_MUNICIPIO': '3509502', 'CD_CEP': '', 'NM_LOGRADOURO': '', 'NM_BAIRRO': '', 'NM_MUNICIPIO': 'Cidade X', 'NM_UF': 'SP'},
+]
+
+MUNICIPIOS = [
+    {'codigo_ibge': '3550308', 'nome': 'São Paulo', 'uf': 'SP', 'latitude': -23.55, 'longitude': -46.63},
+    {'codigo_ibge': '3509502', 'nome': 'Campinas', 'uf': 'SP', 'latitude': -22.90, 'longitude': -47.06},
+    {'codigo_ibge': '3304557', 'nome': 'Rio de Janeiro', 'uf': 'RJ', 'latitude': -22.91, 'longitude': -43.17},
+]
+
+OUTPUT_COLUMNS = ['CD_CEP_CORRETO', 'NM_LOGRADOURO_CORRETO', 'DS_LATITUDE', 'DS_LONGITUDE', 'DS_PRECISAO', 'FL_REFINAR']
+
+
+@pytest.fixture
+def gazetteer_db(tmp_path):
+    csv_path = tmp_path / 'municipios.csv'
+    pd.DataFrame(MUNICIPIOS).to_csv(csv_path, index=False)
+    db_path = str(tmp_path / 'municipios.db')
+    MunicipalityGazetteer(db_path).import_csv(str(csv_path))
+    return db_path
+
+
+def run(make_processor, fake_api, tmp_path, path, plan, gazetteer_db):
+    fake_api.calls.clear()
+    processor = make_processor(cache_db=str(tmp_path / f'cache_{plan}.db'), gazetteer_db=gazetteer_db)
+    df = processor.process_file(path, plan=plan)['dataframe']
+    return df[OUTPUT_COLUMNS].astype(object).where(df[OUTPUT_COLUMNS].notna(), None), sorted(fake_api.calls)
+
+
+def test_plano_global_igual_ao_plano_por_chunk(make_processor, write_csv, fake_api, tmp_path, gazetteer_db):
+    path = write_csv(ROWS)
+    
+    chunk_df, chunk_calls = run(make_processor, fake_api, tmp_path, path, 'chunk', gazetteer_db)
+    global_df, global_calls = run(make_processor, fake_api, tmp_path, path, 'global', gazetteer_db)
+    
+    pd.testing.assert_frame_equal(global_df, chunk_df)
+    assert chunk_df['DS_LATITUDE'].tolist()[2:] == [-23.55, -22.90]
+    # O código IBGE entra na chave da primeira passada: nenhuma busca extra da cidade pelo nome
+    assert global_calls == chunk_calls
+
+
+def test_plano_desconhecido(make_processor, write_csv):
+    with pytest.raises(ValueError):
+        make_processor().process_file(write_csv(ROWS), plan='linha')
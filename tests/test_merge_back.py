@@ -0,0 +1,82 @@
+"""
+Resolução por chave distinta + merge de volta às linhas (motor por colunas)
+
+A saída deve ser a mesma do processamento original linha a linha: cada
+linha recebe o resultado das suas próprias chaves, não importa em que chunk
+está nem quantas vezes a chave se repete.
+"""
+import pandas as pd
+import pytest
+
+from modules.csv_processor import CSVProcessor
+from modules.address_normalizer import normalize_address
+from conftest import VIACEP, fake_coordinates
+
+ROWS = [
+    {'CD_CEP': '01310-100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '20040020', 'NM_LOGRADOURO': 'Av Rio Branco', 'NM_BAIRRO': 'Centro', 'NM_MUNICIPIO': 'Rio de Janeiro', 'NM_UF': 'RJ'},
+    {'CD_CEP': '01310-100', 'NM_LOGRADOURO': 'Avenida Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    # CEP inexistente: corrigido pela busca por endereço no ViaCEP
+    {'CD_CEP': '05422999', 'NM_LOGRADOURO': 'Avenida Rebouças', 'NM_BAIRRO': 'Pinheiros', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '01502001', 'NM_LOGRADOURO': 'R. Iguatemi', 'NM_BAIRRO': 'Liberdade', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP',
+     'DS_LATITUDE': -23.5, 'DS_LONGITUDE': -46.6},
+    {'CD_CEP': '05422999', 'NM_LOGRADOURO': 'Avenida Rebouças', 'NM_BAIRRO': 'Pinheiros', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '01310-100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+]
+
+OUTPUT_COLUMNS = [
+    'CD_CEP_CORRETO', 'NM_LOGRADOURO_CORRETO', 'NM_BAIRRO_CORRETO', 'NM_MUNICIPIO_CORRETO',
+    'NM_UF_CORRETO', 'DS_LATITUDE', 'DS_LONGITUDE',
+]
+
+
+def expected_row(row: dict) -> dict:
+    """Saída do processamento original (linha a linha) para uma linha de ROWS"""
+    cep = ''.join(filter(str.isdigit, row['CD_CEP']))
+    if cep not in VIACEP:
+        cep = next(key for key, data in VIACEP.items() if row['NM_LOGRADOURO'] in data['logradouro'])
+    data = VIACEP[cep]
+    query = f"{data['logradouro']}, {data['bairro']}, {data['localidade']}, {data['uf']}"
+    lat, lon = (row['DS_LATITUDE'], row['DS_LONGITUDE']) if 'DS_LATITUDE' in row else fake_coordinates(query)
+    return {
+        'CD_CEP_CORRETO': cep,
+        'NM_LOGRADOURO_CORRETO': normalize_address(data['logradouro']),
+        'NM_BAIRRO_CORRETO': normalize_address(data['bairro']),
+        'NM_MUNICIPIO_CORRETO': data['localidade'],
+        'NM_UF_CORRETO': data['uf'],
+        'DS_LATITUDE': lat,
+        'DS_LONGITUDE': lon,
+    }
+
+
+def output(df: pd.DataFrame) -> list:
+    return df[OUTPUT_COLUMNS].astype(object).to_dict('records')
+
+
+def test_merge_back_preserva_indice_e_repete_chave():
+    keys = pd.DataFrame({'CD_CEP': ['b', 'a', 'b', 'c']}, index=[10, 11, 12, 13])
+    table = pd.DataFrame({'CD_CEP': ['a', 'b'], 'encontrado': [True, False]})
+    
+    merged = CSVProcessor._merge_back(keys, table, on=['CD_CEP'])
+    
+    assert merged.index.tolist() == [10, 11, 12, 13]
+    assert merged['encontrado'].tolist()[:3] == [False, True, False]
+    assert pd.isna(merged.loc[13, 'encontrado'])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_saida_igual_ao_processamento_linha_a_linha(make_processor, write_csv, chunk_size):
+    path = write_csv(ROWS)
+    
+    df = make_processor(chunk_size=chunk_size).process_file(path)['dataframe']
+    
+    assert output(df) == [expected_row(row) for row in ROWS]
+
+
+def test_chave_repetida_vai_a_rede_uma_unica_vez(make_processor, write_csv, fake_api):
+    path = write_csv(ROWS)
+    
+    make_processor(chunk_size=100).process_file(path)
+    
+    assert fake_api.calls.count(('viacep', '01310100')) == 1
+    assert fake_api.calls.count(('viacep', 'SP/São Paulo/Avenida Rebouças')) == 1
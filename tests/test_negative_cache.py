@@ -0,0 +1,89 @@
+"""
+Cache negativo: "não encontrado" persistido com validade própria
+"""
+import pytest
+
+from modules.cache_manager import CacheManager
+
+
+def backdate(cache: CacheManager, days: float):
+    """Envelhece todas as entradas do cache negativo em days dias"""
+    conn = cache._connect()
+    with conn:
+        conn.execute("UPDATE negative_cache SET created_at = datetime(created_at, ?)", (f"-{int(days * 86400)} seconds",))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheManager(str(tmp_path / 'cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_negativo_vale_ate_o_fim_da_validade(cache):
+    cache.save_negative_bulk([('cep', '99999999'), ('geocode', 'Rua Inexistente, Centro, São Paulo, SP')])
+    
+    backdate(cache, CacheManager.NEGATIVE_TTL_DAYS - 1)
+    assert cache.is_negative('cep', '99999999')
+    assert cache.get_negative_bulk('cep', ['99999999', '01310100']) == {'99999999'}
+    
+    backdate(cache, 2)
+    assert not cache.is_negative('cep', '99999999')
+    assert cache.get_negative_bulk('cep', ['99999999']) == set()
+    assert cache.get_stats()['negative_cache_entries'] == 0
+
+
+def test_validade_configuravel(cache, tmp_path):
+    cache.save_negative_bulk([('cep', '99999999')])
+    backdate(cache, 10)
+    
+    longer = CacheManager(str(tmp_path / 'cache.db'), negative_ttl_days=30)
+    try:
+        assert longer.is_negative('cep', '99999999')
+        assert not cache.is_negative('cep', '99999999')
+    finally:
+        longer.close()
+
+
+def test_nova_resposta_renova_a_validade(cache):
+    cache.save_negative_bulk([('cep', '99999999')])
+    backdate(cache, 30)
+    
+    cache.save_negative_bulk([('cep', '99999999')])
+    
+    assert cache.is_negative('cep', '99999999')
+
+
+def test_geocode_negativo_usa_a_chave_canonica(cache):
+    cache.save_negative_bulk([('geocode', 'Avenida Paulista, 9999, São Paulo, SP')])
+    
+    assert cache.is_negative('geocode', 'Av. Paulista, 9999, Sao Paulo, SP')
+    assert not cache.is_negative('cep', 'Avenida Paulista, 9999, São Paulo, SP')
+
+
+def test_limpeza_remove_so_negativos_vencidos(cache):
+    cache.save_negative_bulk([('cep', '99999999'), ('cep', '88888888')])
+    conn = cache._connect()
+    with conn:
+        conn.execute(
+            "UPDATE negative_cache SET created_at = datetime('now', '-30 days') WHERE key = '99999999'"
+        )
+    
+    cache.clear_old_cache()
+    
+    assert conn.execute("SELECT key FROM negative_cache").fetchall() == [('88888888',)]
+
+
+def test_cep_inexistente_nao_volta_a_rede_dentro_da_validade(make_processor, fake_api):
+    first = make_processor()
+    first.cep_validator.search_cep('99999999')
+    first.cache_manager.flush()
+    
+    # Outro processador (cache em memória vazio) respeita o negativo persistido
+    processor = make_processor()
+    assert processor.cep_validator.search_cep('99999999') is None
+    assert fake_api.calls.count(('viacep', '99999999')) == 1
+    
+    backdate(processor.cache_manager, CacheManager.NEGATIVE_TTL_DAYS + 1)
+    assert make_processor().cep_validator.search_cep('99999999') is None
+    assert fake_api.calls.count(('viacep', '99999999')) == 2
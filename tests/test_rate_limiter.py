@@ -0,0 +1,147 @@
+"""
+Limitadores de taxa: estado compartilhado entre processos e controle AIMD
+"""
+import multiprocessing
+import time
+
+import pytest
+
+from modules.rate_limiter import AdaptiveRateController, SharedRateLimiter, TokenBucket
+
+HOST = 'nominatim.openstreetmap.org'
+INTERVAL = 0.05
+
+
+def acquire_many(db_path: str, count: int, stamps):
+    limiter = SharedRateLimiter(HOST, 1 / INTERVAL, db_path=db_path)
+    for _ in range(count):
+        limiter.acquire()
+        stamps.append(time.time())
+    limiter.close()
+
+
+def increase_many(db_path: str, count: int):
+    limiter = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    for _ in range(count):
+        limiter.increase_rate(1.0, 1000.0)
+    limiter.close()
+
+
+def run_processes(target, args_list):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=target, args=args) for args in args_list]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+
+def test_dois_processos_respeitam_o_mesmo_intervalo(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.db')
+    with multiprocessing.get_context('spawn').Manager() as manager:
+        stamps = manager.list()
+        run_processes(acquire_many, [(db_path, 5, stamps), (db_path, 5, stamps)])
+        stamps = sorted(stamps)
+    
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert len(stamps) == 10
+    # Tolerância para o relógio e o escalonamento dos processos
+    assert min(gaps) > INTERVAL * 0.8
+
+
+def test_ajustes_simultaneos_de_processos_nao_se_perdem(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.db')
+    
+    run_processes(increase_many, [(db_path, 20), (db_path, 20), (db_path, 20)])
+    
+    limiter = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    try:
+        assert limiter.increase_rate(0.0, 1000.0) == pytest.approx(10.0 + 3 * 20)
+    finally:
+        limiter.close()
+
+
+def test_ajuste_parte_da_taxa_gravada_por_outro_processo(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.db')
+    first = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    second = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    try:
+        assert first.decrease_rate(0.5, 1.0) == 5.0
+        # second ainda tem 10/s em memória; o aumento parte dos 5/s gravados
+        assert second.rate == 10.0
+        assert second.increase_rate(1.0, 20.0) == 6.0
+        assert first.increase_rate(0.0, 20.0) == 6.0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_ajuste_sem_mudanca_nao_grava(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.db')
+    limiter = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    try:
+        limiter.decrease_rate(0.5, 5.0)
+        conn = limiter._connect()
+        before = conn.execute("SELECT rate, updated_at FROM rate_limits").fetchone()
+        
+        assert limiter.decrease_rate(0.5, 5.0) == 5.0
+        assert limiter.increase_rate(1.0, 5.0) == 5.0
+        assert conn.execute("SELECT rate, updated_at FROM rate_limits").fetchone() == before
+    finally:
+        limiter.close()
+
+
+def test_sucessos_sao_somados_num_unico_aumento_por_janela(tmp_path):
+    limiter = SharedRateLimiter(HOST, 10.0, db_path=str(tmp_path / 'rate_limit.db'))
+    controller = AdaptiveRateController(limiter, max_rate=100.0, increase_step=1.0, increase_interval=60.0)
+    increases = []
+    original = limiter.increase_rate
+    limiter.increase_rate = lambda step, max_rate: increases.append(step) or original(step, max_rate)
+    try:
+        for _ in range(50):
+            controller.observe(200)
+        assert increases == []
+        assert limiter.rate == 10.0
+        
+        controller._last_increase -= 60.0
+        controller.observe(200)
+        assert increases == [51.0]
+        assert limiter.rate == 61.0
+    finally:
+        limiter.close()
+
+
+def test_sucesso_em_outro_processo_nao_desfaz_o_429(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.db')
+    first = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    second = SharedRateLimiter(HOST, 10.0, db_path=db_path)
+    throttled = AdaptiveRateController(first, increase_step=1.0, increase_interval=0.0)
+    succeeded = AdaptiveRateController(second, increase_step=1.0, increase_interval=0.0)
+    try:
+        throttled.observe(429, retry_after='0')
+        assert first.rate == 5.0
+        
+        succeeded.observe(200)
+        assert second.rate == 6.0
+        assert throttled.effective_rate == 5.0
+        assert first.increase_rate(0.0, 10.0) == 6.0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_429_descarta_sucessos_acumulados_e_respeita_o_piso():
+    bucket = TokenBucket(8.0)
+    controller = AdaptiveRateController(bucket, min_rate=3.0, increase_step=1.0, increase_interval=60.0)
+    
+    for _ in range(5):
+        controller.observe(200)
+    controller.observe(503)
+    controller.observe(429)
+    assert bucket.rate == 3.0
+    assert controller.throttled == 2
+    
+    controller._last_increase -= 60.0
+    controller.observe(200)
+    assert bucket.rate == 4.0
@@ -0,0 +1,92 @@
+"""
+RetryPolicy: tentativas, prazo, Retry-After e orçamento de retries
+"""
+import threading
+
+import pytest
+
+from modules.concurrency_limiter import AdaptiveConcurrencyLimiter
+from modules.rate_limiter import TokenBucket
+from modules.retry_policy import RetryPolicy, RetryableError, RetryExhaustedError, DeadlineExceededError
+from modules.transport import HTTPTransport
+
+
+class Flaky:
+    """Tentativa que falha com erro transitório failures vezes antes de responder"""
+    
+    def __init__(self, failures: int, retry_after: float = None):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = 0
+    
+    def __call__(self, timeout):
+        timeout()
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RetryableError("HTTP 503", self.retry_after)
+        return 'ok'
+
+
+def test_tenta_de_novo_ate_responder(fake_api):
+    func = Flaky(failures=2)
+    
+    assert RetryPolicy(max_attempts=3, base_delay=0).call(func) == 'ok'
+    assert func.calls == 3
+
+
+def test_desiste_apos_max_attempts(fake_api):
+    func = Flaky(failures=10)
+    
+    with pytest.raises(RetryExhaustedError, match="HTTP 503"):
+        RetryPolicy(max_attempts=3, base_delay=0).call(func)
+    assert func.calls == 3
+
+
+def test_prazo_esgotado_antes_da_primeira_tentativa(fake_api):
+    func = Flaky(failures=0)
+    
+    with pytest.raises(DeadlineExceededError):
+        RetryPolicy(deadline=0).call(func)
+    assert func.calls == 0
+
+
+def test_retry_after_alem_do_prazo_nao_espera(fake_api):
+    func = Flaky(failures=10, retry_after=60)
+    
+    with pytest.raises(RetryExhaustedError):
+        RetryPolicy(max_attempts=5, base_delay=0, deadline=5).call(func)
+    assert func.calls == 1
+
+
+def test_orcamento_de_retries_compartilhado_entre_consultas(fake_api):
+    policy = RetryPolicy(max_attempts=3, base_delay=0, budget_ratio=0, min_retries=2)
+    first, second = Flaky(failures=10), Flaky(failures=10)
+    
+    with pytest.raises(RetryExhaustedError):
+        policy.call(first)
+    with pytest.raises(RetryExhaustedError):
+        policy.call(second)
+    
+    # A primeira consulta gasta os 2 retries do orçamento; a segunda não tenta de novo
+    assert (first.calls, second.calls) == (3, 1)
+
+
+def test_espera_pela_vaga_de_concorrencia_conta_no_prazo(fake_api):
+    transport = HTTPTransport()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    upstream = transport.register(
+        'https://nominatim.openstreetmap.org', TokenBucket(rate=0), concurrency_limiter=limiter,
+        retry_policy=RetryPolicy(max_attempts=1, deadline=0.2)
+    )
+    # Outra requisição ocupa a única vaga por mais tempo que o prazo
+    limiter.acquire()
+    threading.Timer(0.4, limiter.release).start()
+    
+    with pytest.raises(DeadlineExceededError):
+        transport.get('https://nominatim.openstreetmap.org/search', params={'q': 'Avenida Paulista'})
+    
+    # Nada foi enviado, a vaga voltou e a tentativa não entrou nas métricas
+    assert fake_api.calls == []
+    assert limiter.in_flight == 0
+    assert upstream.requests == 0
+    transport.close()
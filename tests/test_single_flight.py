@@ -0,0 +1,98 @@
+"""
+SingleFlight: consultas idênticas em andamento viram uma só
+"""
+import asyncio
+import threading
+
+import pytest
+
+from modules.single_flight import SingleFlight
+
+
+def test_threads_com_a_mesma_chave_recebem_o_mesmo_resultado():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    
+    def lookup(key):
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return {'cep': key}
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('01310100', lookup, '01310100')))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do('01310100', lookup, '01310100')))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    while flight.shared < len(followers):
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    
+    assert calls == ['01310100']
+    assert results == [{'cep': '01310100'}] * 5
+    # A chave é liberada ao terminar: a próxima chamada consulta de novo
+    assert flight.do('01310100', lookup, '01310100') == {'cep': '01310100'}
+    assert len(calls) == 2
+
+
+def test_excecao_do_lider_chega_a_todas_as_chamadas():
+    flight = SingleFlight()
+    calls = []
+    
+    async def lookup(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("ViaCEP fora do ar")
+    
+    async def main():
+        return await asyncio.gather(
+            *(flight.do_async('01310100', lookup, '01310100') for _ in range(3)), return_exceptions=True
+        )
+    
+    results = asyncio.run(main())
+    
+    assert calls == ['01310100']
+    assert [str(result) for result in results] == ["ViaCEP fora do ar"] * 3
+    assert flight.shared == 2
+
+
+def test_chaves_diferentes_nao_se_misturam():
+    flight = SingleFlight()
+    
+    async def lookup(key):
+        await asyncio.sleep(0.01)
+        return key.upper()
+    
+    async def main():
+        return await asyncio.gather(*(flight.do_async(key, lookup, key) for key in ('a', 'b', 'a')))
+    
+    assert asyncio.run(main()) == ['A', 'B', 'A']
+    assert flight.shared == 1
+
+
+def test_cancelar_o_lider_nao_prende_a_chave():
+    flight = SingleFlight()
+    
+    async def slow(key):
+        await asyncio.sleep(10)
+    
+    async def fast(key):
+        return key
+    
+    async def main():
+        leader = asyncio.create_task(flight.do_async('x', slow, 'x'))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await flight.do_async('x', fast, 'x')
+    
+    assert asyncio.run(main()) == 'x'
@@ -0,0 +1,66 @@
+"""
+HTTPTransport: um pool e um estado (taxa, retry, disjuntor, métricas) por host
+"""
+import pytest
+
+from modules.cep_validator import CEPValidator, AsyncCEPValidator
+from modules.rate_limiter import TokenBucket
+from modules.retry_policy import RetryPolicy, RetryExhaustedError
+from modules.transport import HTTPTransport
+from conftest import VIACEP
+
+ROWS = [
+    {'CD_CEP': '01310100', 'NM_LOGRADOURO': 'Av. Paulista', 'NM_BAIRRO': 'Bela Vista', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+    {'CD_CEP': '05422999', 'NM_LOGRADOURO': 'Avenida Rebouças', 'NM_BAIRRO': 'Pinheiros', 'NM_MUNICIPIO': 'São Paulo', 'NM_UF': 'SP'},
+]
+
+
+def test_host_registrado_uma_vez_e_compartilhado():
+    transport = HTTPTransport()
+    first = transport.register('https://viacep.com.br/ws/01310100/json/', TokenBucket(rate=5))
+    second = transport.register('https://viacep.com.br/ws', TokenBucket(rate=50), retry_policy=RetryPolicy(max_attempts=9))
+    
+    assert second is first
+    assert first.rate_limiter.rate == 5
+    assert transport.upstream_for('https://viacep.com.br/outro') is first
+    with pytest.raises(ValueError):
+        transport.upstream_for('https://nominatim.openstreetmap.org/search')
+    transport.close()
+
+
+def test_validadores_sincrono_e_assincrono_dividem_o_estado_do_host():
+    transport = HTTPTransport()
+    sync = CEPValidator(transport=transport)
+    async_validator = AsyncCEPValidator(transport=transport)
+    
+    assert async_validator.upstream is sync.upstream
+    assert async_validator.circuit_breaker is sync.circuit_breaker
+    assert async_validator.rate_limiter is sync.rate_limiter
+    transport.close()
+
+
+def test_processador_usa_um_transporte_com_metricas_por_host(make_processor, write_csv, fake_api):
+    processor = make_processor()
+    processor.process_file(write_csv(ROWS))
+    
+    metrics = processor.transport.metrics()
+    
+    # ViaCEP por CEP e por endereço e Nominatim no mesmo transporte (mesma Session)
+    assert processor.cep_validator.transport is processor.geocoder.transport is processor.transport
+    assert metrics['viacep.com.br']['requests'] == fake_api.count('viacep')
+    assert metrics['nominatim.openstreetmap.org']['requests'] == fake_api.count('nominatim')
+    assert metrics['viacep.com.br']['failures'] == 0
+    assert metrics['viacep.com.br']['circuit'] == 'fechado'
+
+
+def test_falhas_de_rede_entram_nas_metricas(fake_api):
+    fake_api.down = True
+    transport = HTTPTransport()
+    transport.register('https://viacep.com.br', TokenBucket(rate=0), retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+    
+    with pytest.raises(RetryExhaustedError):
+        transport.get(f"https://viacep.com.br/ws/{next(iter(VIACEP))}/json/")
+    
+    metrics = transport.metrics()['viacep.com.br']
+    assert (metrics['requests'], metrics['failures']) == (2, 2)
+    transport.close()